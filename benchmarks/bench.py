@@ -0,0 +1,425 @@
+#!/usr/bin/env python
+"""Benchmark suite for propagation, the IGRF model, and attitude math.
+
+Each case is timed across a range of sizes, and the table reports how its time scales between neighbouring sizes,
+as the exponent k of time ∝ size^k. Results can be saved as JSON and compared against a previous run.
+
+Run from the repository root:
+
+    python -m benchmarks.bench --quick
+    python -m benchmarks.bench --json results.json --compare baseline.json
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from datetime import datetime
+from typing import Callable, Dict, List, Sequence, Tuple
+import argparse
+import functools
+import json
+import platform
+import subprocess
+import time
+import numpy as np
+
+# Custom packages
+from pyCubeSat.Orbit import EarthOrbit, EarthOrbitBatch, access_windows, eclipses
+from pyCubeSat.PMACS.IGRF import FieldGrid, igrf_field
+from pyCubeSat.math import QuaternionArray, Rotation
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat')
+
+# Registered cases, see case
+CASES = []
+
+
+def case(group: str,
+         name: str,
+         param: str,
+         sizes: Sequence[float],
+         quick: Sequence[float],
+         reference: str | None = None):
+    """Registers a benchmark case.
+
+    The decorated function takes a size and returns the callable to time, so setup is excluded from the timing.
+
+    Args:
+        group (str): the area benchmarked.
+        name (str): the case name, unique within the group.
+        param (str): what the size is, e.g. "points".
+        sizes (Sequence[float]): the sizes of a full run.
+        quick (Sequence[float]): the sizes of a quick run.
+        reference (str | None): the name of an earlier case in the group doing the same work, which the case's
+            speedup is reported against. Defaults to None.
+    """
+    def register(setup: Callable[[float], Callable[[], object]]):
+        CASES.append({'group': group, 'name': name, 'param': param, 'sizes': tuple(sizes), 'quick': tuple(quick),
+                      'reference': reference, 'setup': setup})
+        return setup
+    return register
+
+
+# Propagation
+@case("orbit", "EarthOrbit", "res", (100, 1000, 10000, 100000), (100, 1000))
+def _orbit_init(res: float) -> Callable[[], object]:
+    return lambda: EarthOrbit(res=int(res))
+
+
+@case("orbit", "getGroundTrack", "res", (100, 1000, 10000), (100, 1000))
+def _ground_track_res(res: float) -> Callable[[], object]:
+    orbit = EarthOrbit(res=int(res))
+    return lambda: orbit.getGroundTrack(1)
+
+
+@case("orbit", "getGroundTrack", "days", (1, 7, 30, 90), (1, 7))
+def _ground_track_days(days: float) -> Callable[[], object]:
+    orbit = EarthOrbit()
+    return lambda: orbit.getGroundTrack(days, step=60)
+
+
+@case("orbit", "eclipses", "days", (1, 7, 30, 90), (1, 7))
+def _eclipses(days: float) -> Callable[[], object]:
+    orbit = EarthOrbit()
+    return lambda: eclipses(orbit, days, epoch=datetime(2024, 1, 1))
+
+
+@case("orbit", "access_windows", "stations", (1, 10, 100, 1000), (1, 10))
+def _access_windows(n: float) -> Callable[[], object]:
+    orbit = EarthOrbit()
+    rng = np.random.default_rng(0)
+    lat, lon = rng.uniform(-70, 70, int(n)), rng.uniform(-180, 180, int(n))
+    return lambda: access_windows(orbit, 7, lat, lon, mask=10)
+
+
+def _constellation(n: int, dtype: np.dtype = np.float64) -> EarthOrbitBatch:
+    rng = np.random.default_rng(0)
+    return EarthOrbitBatch(rng.uniform(400, 800, n), rng.uniform(0, 0.02, n), rng.uniform(0, 98, n),
+                           rng.uniform(0, 360, n), rng.uniform(0, 360, n), dtype=dtype)
+
+
+@case("orbit", "batch", "sats", (10, 100, 1000), (10, 100))
+def _batch(n: float) -> Callable[[], object]:
+    batch, t = _constellation(int(n)), np.arange(0, 86400, 60.0)
+    return lambda: batch.propagate(t)
+
+
+@case("orbit", "batch_float32", "sats", (10, 100, 1000), (10, 100))
+def _batch_float32(n: float) -> Callable[[], object]:
+    batch, t = _constellation(int(n), np.float32), np.arange(0, 86400, 60.0)
+    return lambda: batch.propagate(t)
+
+
+@case("orbit", "batch_loop", "sats", (10, 100, 1000), (10, 100))
+def _batch_loop(n: float) -> Callable[[], object]:
+    batch, t = _constellation(int(n)), np.arange(0, 86400, 60.0)
+    orbits = [batch[k] for k in range(len(batch))]
+    return lambda: [orbit.propagate(t) for orbit in orbits]
+
+
+@case("orbit", "batch", "steps", (10, 100, 1000, 10000), (10, 100))
+def _batch_steps(steps: float) -> Callable[[], object]:
+    batch, t = _constellation(1000), np.linspace(0, 86400, int(steps))
+    return lambda: batch.propagate(t)
+
+
+@case("orbit", "batch_loop", "steps", (10, 100, 1000, 10000), (10, 100))
+def _batch_loop_steps(steps: float) -> Callable[[], object]:
+    batch, t = _constellation(1000), np.linspace(0, 86400, int(steps))
+    orbits = [batch[k] for k in range(len(batch))]
+    return lambda: [orbit.propagate(t) for orbit in orbits]
+
+
+# Geomagnetic field
+def _field_points(n: int, nmax: int) -> Callable[[], object]:
+    rng = np.random.default_rng(0)
+    r = 6771 + rng.uniform(0, 500, n)
+    colat = np.arccos(rng.uniform(-1, 1, n))
+    lon = rng.uniform(-np.pi, np.pi, n)
+    t = np.linspace(0, 30 * 24 * 60 * 60, n)
+    igrf_field(r[:1], colat[:1], lon[:1], t[:1], epoch=datetime(2024, 1, 1), nmax=nmax)
+    return lambda: igrf_field(r, colat, lon, t, epoch=datetime(2024, 1, 1), nmax=nmax)
+
+
+@case("igrf", "igrf_field", "points", (100, 1000, 10000, 100000), (100, 1000))
+def _igrf_points(n: float) -> Callable[[], object]:
+    return _field_points(int(n), 13)
+
+
+@case("igrf", "igrf_field", "N", (1, 4, 8, 13), (4, 13))
+def _igrf_degree(nmax: float) -> Callable[[], object]:
+    return _field_points(10000, int(nmax))
+
+
+@functools.lru_cache(maxsize=None)
+def _field_grid() -> FieldGrid:
+    return FieldGrid(t=2024.0)
+
+
+def _grid_points(n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    return 300 + rng.uniform(0, 400, n), rng.uniform(-90, 90, n), rng.uniform(-180, 180, n)
+
+
+@case("igrf", "igrf_field_epoch", "points", (1, 100, 10000, 100000), (1, 1000))
+def _igrf_epoch(n: float) -> Callable[[], object]:
+    alt, lat, lon = _grid_points(int(n))
+    r, colat, lon = alt + FieldGrid.R, np.radians(90 - lat), np.radians(lon)
+    return lambda: igrf_field(r, colat, lon, 2024.0)
+
+
+@case("igrf", "FieldGrid_linear", "points", (1, 100, 10000, 100000), (1, 1000), reference="igrf_field_epoch")
+def _grid_linear(n: float) -> Callable[[], object]:
+    grid, (alt, lat, lon) = _field_grid(), _grid_points(int(n))
+    return lambda: grid(alt, lat, lon)
+
+
+@case("igrf", "FieldGrid_cubic", "points", (1, 100, 10000, 100000), (1, 1000), reference="igrf_field_epoch")
+def _grid_cubic(n: float) -> Callable[[], object]:
+    grid, (alt, lat, lon) = _field_grid(), _grid_points(int(n))
+    grid(alt[:1], lat[:1], lon[:1], "cubic")
+    return lambda: grid(alt, lat, lon, "cubic")
+
+
+# Attitude math
+def _quaternions(n: int) -> QuaternionArray:
+    return QuaternionArray.from_euler(np.random.default_rng(0).uniform(-1, 1, (n, 3)))
+
+
+@case("quaternion", "from_euler", "N", (1000, 10000, 100000, 1000000), (1000, 10000))
+def _from_euler(n: float) -> Callable[[], object]:
+    angles = np.random.default_rng(0).uniform(-1, 1, (int(n), 3))
+    return lambda: QuaternionArray.from_euler(angles)
+
+
+@case("quaternion", "to_euler", "N", (1000, 10000, 100000, 1000000), (1000, 10000))
+def _to_euler(n: float) -> Callable[[], object]:
+    q = _quaternions(int(n))
+    return lambda: q.to_euler()
+
+
+@case("quaternion", "to_dcm", "N", (1000, 10000, 100000, 1000000), (1000, 10000))
+def _to_dcm(n: float) -> Callable[[], object]:
+    q = _quaternions(int(n))
+    out = np.empty((int(n), 3, 3))
+    return lambda: q.to_dcm(out=out)
+
+
+@case("quaternion", "from_dcm", "N", (1000, 10000, 100000, 1000000), (1000, 10000))
+def _from_dcm(n: float) -> Callable[[], object]:
+    R = _quaternions(int(n)).to_dcm()
+    return lambda: QuaternionArray.from_dcm(R)
+
+
+@case("quaternion", "multiply", "N", (1000, 10000, 100000, 1000000), (1000, 10000))
+def _multiply(n: float) -> Callable[[], object]:
+    p, q = _quaternions(int(n)), _quaternions(int(n)).conjugate()
+    out = QuaternionArray.identity(int(n))
+    return lambda: p.multiply(q, out=out)
+
+
+@case("quaternion", "rotate", "N", (1000, 10000, 100000, 1000000), (1000, 10000))
+def _rotate(n: float) -> Callable[[], object]:
+    q = _quaternions(int(n))
+    v = np.random.default_rng(1).normal(size=(int(n), 3))
+    out = np.empty_like(v)
+    return lambda: q.rotate(v, out=out)
+
+
+# Frame transforms
+@case("frames", "eci_to_ecef", "N", (1000, 10000, 100000, 1000000), (1000, 10000))
+def _eci_to_ecef(n: float) -> Callable[[], object]:
+    t = np.arange(int(n)) * 10.0
+    v = np.random.default_rng(0).normal(size=(int(n), 3))
+    return lambda: Rotation.apply(Rotation(t, datetime(2024, 1, 1)).eci_to_ecef, v)
+
+
+@case("frames", "ecef_to_ned", "N", (1000, 10000, 100000, 1000000), (1000, 10000))
+def _ecef_to_ned(n: float) -> Callable[[], object]:
+    rng = np.random.default_rng(0)
+    lat, lon = rng.uniform(-90, 90, int(n)), rng.uniform(-180, 180, int(n))
+    v = rng.normal(size=(int(n), 3))
+    return lambda: Rotation.apply(Rotation.ecef_to_ned(lat, lon), v)
+
+
+@case("frames", "eci_to_lvlh", "N", (1000, 10000, 100000, 1000000), (1000, 10000))
+def _eci_to_lvlh(n: float) -> Callable[[], object]:
+    pos, vel = EarthOrbit().propagate(np.arange(int(n)) * 10.0)
+    return lambda: Rotation.apply(Rotation.eci_to_lvlh(pos, vel), vel)
+
+
+def measure(func: Callable[[], object], repeat: int = 5, min_time: float = 0.05) -> Dict[str, float]:
+    """Times a callable, looping it until each repeat takes at least min_time.
+
+    Args:
+        func (Callable[[], object]): the callable.
+        repeat (int): the number of repeats. Defaults to 5.
+        min_time (float): the least time per repeat (sec). Defaults to 0.05.
+
+    Returns:
+        Dict[str, float]: the "best" and "median" time per call (sec), and the "loops" per repeat.
+    """
+    # Find the number of loops, as timeit does
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - start >= min_time:
+            break
+        loops *= 10 if time.perf_counter() - start < min_time/10 else 2
+
+    # Time the repeats
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        times.append((time.perf_counter() - start)/loops)
+    return {'best': min(times), 'median': float(np.median(times)), 'loops': loops}
+
+
+def run(pattern: str | None = None,
+        quick: bool = False,
+        repeat: int = 5,
+        min_time: float = 0.05,
+        progress: Callable[[Dict], None] | None = None) -> List[Dict]:
+    """Runs the benchmark cases.
+
+    Args:
+        pattern (str | None): only run cases whose "group.name" contains it. Defaults to None, all of them.
+        quick (bool): whether to use the small sizes. Defaults to False.
+        repeat (int): the number of repeats. Defaults to 5.
+        min_time (float): the least time per repeat (sec). Defaults to 0.05.
+        progress (Callable[[Dict], None] | None): called with each result. Defaults to None.
+
+    Returns:
+        List[Dict]: the "group", "name", "param", "size", "best" and "median" time per call (sec), "loops",
+            scaling exponent "slope" from the previous size, and "speedup" over the reference case, of each case and
+            size.
+    """
+    results = []
+    medians = {}
+    logging.disable(logging.INFO)
+    try:
+        for entry in CASES:
+            if pattern is not None and pattern not in f"{entry['group']}.{entry['name']}":
+                continue
+            previous = None
+            for size in entry['quick' if quick else 'sizes']:
+                result = {key: entry[key] for key in ('group', 'name', 'param')}
+                result.update(size=size, **measure(entry['setup'](size), repeat, min_time))
+                result['slope'] = None if previous is None else float(
+                    np.log(result['median']/previous['median'])/np.log(size/previous['size']))
+                reference = medians.get((entry['group'], entry['reference'], entry['param'], size))
+                result['speedup'] = None if reference is None else reference/result['median']
+                medians[(entry['group'], entry['name'], entry['param'], size)] = result['median']
+                results.append(result)
+                previous = result
+                if progress is not None:
+                    progress(result)
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+
+def metadata() -> Dict[str, str]:
+    """Describes the run: the commit, interpreter, numpy version, and machine."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {'commit': commit, 'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.platform()}
+
+
+def table(results: List[Dict]) -> str:
+    """Formats results as a scaling table.
+
+    Args:
+        results (List[Dict]): the results, from run.
+
+    Returns:
+        str: the table, with the time per call, per unit of size, the scaling exponent, and the speedup over the
+            reference case.
+    """
+    lines = [f"{'case':<28}{'param':>8}{'size':>10}{'median':>12}{'best':>12}{'per unit':>12}{'slope':>8}"
+             f"{'speedup':>9}"]
+    for r in results:
+        slope = "" if r['slope'] is None else f"{r['slope']:.2f}"
+        speedup = "" if r.get('speedup') is None else f"{r['speedup']:.1f}x"
+        lines.append(f"{r['group'] + '.' + r['name']:<28}{r['param']:>8}{r['size']:>10g}{_format(r['median']):>12}"
+                     f"{_format(r['best']):>12}{_format(r['median']/r['size']):>12}{slope:>8}{speedup:>9}")
+    return "\n".join(lines)
+
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float = 1.2) -> str:
+    """Compares results against a baseline run, case by case.
+
+    Args:
+        results (List[Dict]): the results, from run.
+        baseline (List[Dict]): the baseline results.
+        threshold (float): the ratio of median times that counts as a regression. Defaults to 1.2.
+
+    Returns:
+        str: the ratio of each case present in both, with regressions flagged.
+    """
+    old = {(r['group'], r['name'], r['param'], r['size']): r for r in baseline}
+    lines = [f"{'case':<28}{'param':>8}{'size':>10}{'before':>12}{'after':>12}{'ratio':>8}"]
+    for r in results:
+        key = (r['group'], r['name'], r['param'], r['size'])
+        if key not in old:
+            continue
+        ratio = r['median']/old[key]['median']
+        flag = "  REGRESSION" if ratio > threshold else "  faster" if ratio < 1/threshold else ""
+        lines.append(f"{r['group'] + '.' + r['name']:<28}{r['param']:>8}{r['size']:>10g}"
+                     f"{_format(old[key]['median']):>12}{_format(r['median']):>12}{ratio:>8.2f}{flag}")
+    return "\n".join(lines)
+
+
+def _format(seconds: float) -> str:
+    """Formats a time with a readable unit."""
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds/scale:.3g} {unit}"
+    return f"{seconds/1e-9:.3g} ns"
+
+
+def main(argv: Sequence[str] | None = None):
+    """Runs the suite from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", "--filter", help="only run cases whose group.name contains this")
+    parser.add_argument("--quick", action="store_true", help="use small sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="repeats per case")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="compare against the results in this file")
+    parser.add_argument("--threshold", type=float, default=1.2, help="ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.quick, args.repeat, progress=lambda r: print(
+        f"{r['group']}.{r['name']} {r['param']}={r['size']:g}: {_format(r['median'])}", flush=True))
+    print()
+    print(table(results))
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({'metadata': metadata(), 'results': results}, file, indent=4)
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        print()
+        print(f"Compared with {baseline['metadata']['commit']}")
+        print(compare(results, baseline['results'], args.threshold))
+
+
+# Run
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,20 @@
 """Orbital determination
 """
 
-# __all__
-from .orbit import Orbit
-from .earth import EarthOrbit, EarthTLE
-__all__ = [Orbit, EarthOrbit, EarthTLE]
\ No newline at end of file
+# __all__, imported on first use
+from pyCubeSat._lazy import lazy
+_exports = {
+    'GroundTrack': ".track",
+    'Orbit': ".orbit",
+    'EarthOrbit': ".earth",
+    'EarthTLE': ".earth",
+    'EarthOrbitBatch': ".batch",
+    'TLECatalog': ".batch",
+    'parse_tle': ".tle",
+    'read_tle': ".tle",
+    'get_orbital_states': ".states",
+    'eclipses': ".eclipse",
+    'access_windows': ".access",
+}
+__getattr__, __dir__ = lazy(__name__, _exports)
+__all__ = list(_exports)
\ No newline at end of file
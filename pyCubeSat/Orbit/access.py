@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+"""Access windows between an orbit and a network of ground stations.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from typing import Tuple
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Custom packages
+from pyCubeSat import instrumentation
+from pyCubeSat.Orbit import Orbit
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat.Orbit')
+
+# Passes over a station
+ACCESS = np.dtype([('station', np.int32), ('rise', float), ('set', float), ('elevation', float)])
+
+# Golden ratio conjugate, for the peak search
+_GOLDEN = (np.sqrt(5) - 1)/2
+
+
+@instrumentation.timed("orbit.access")
+def access_windows(orbit: Orbit,
+                   days: float,
+                   lat: np.ndarray,
+                   lon: np.ndarray,
+                   mask: float | np.ndarray = 0.0,
+                   alt: float | np.ndarray = 0.0,
+                   step: float = 60.0,
+                   tol: float = 1e-3) -> np.ndarray:
+    """Finds when each ground station sees the satellite above its elevation mask.
+
+    Stations sit on the orbit's spherical Earth, matching the ground track. The track is sampled every "step", and
+    each station only looks at the samples within its visibility circle, widened by how far the subsatellite point
+    can move in a step, so the work grows with the number of passes rather than samples times stations. Rises and
+    sets are bracketed on those samples and refined together by bisection. Candidate passes with no sample above
+    the mask are searched for their peak, which catches passes shorter than a step.
+
+    Args:
+        orbit (Orbit): the orbit.
+        days (float): the number of days to search.
+        lat (np.ndarray): station latitudes (deg).
+        lon (np.ndarray): station longitudes (deg).
+        mask (float | np.ndarray): elevation masks, per station or for all (deg). Defaults to 0.
+        alt (float | np.ndarray): station altitudes, per station or for all (km). Defaults to 0.
+        step (float): the time between bracketing samples (sec). Defaults to 60.
+        tol (float): the accuracy of the rise and set times (sec). Defaults to 1e-3.
+
+    Returns:
+        np.ndarray: the passes ordered by rise, with their "station" index, "rise" and "set" times (sec), clipped to
+            [0, days], and "elevation" at the middle of the pass (deg).
+
+    Raises:
+        ValueError: if the span, step, or tolerance is not positive, the station arrays differ in length, or a mask
+            is outside [0, 90).
+    """
+    if days <= 0 or step <= 0 or tol <= 0:
+        raise ValueError("Span, step, and tolerance must be positive")
+    columns = (np.atleast_1d(np.asarray(x, dtype=float)) for x in (lat, lon, mask, alt))
+    lat, lon, mask, alt = np.broadcast_arrays(*columns)
+    if lat.ndim != 1:
+        raise ValueError("Station arrays must be 1D with the same length")
+    if np.any((mask < 0) | (mask >= 90)):
+        raise ValueError("Elevation masks must be in [0, 90)")
+
+    # Log
+    log.info(f"Finding access windows of {len(lat)} stations")
+
+    # Stations on the rotating Earth
+    up = np.stack((np.cos(np.radians(lat)) * np.cos(np.radians(lon)),
+                   np.cos(np.radians(lat)) * np.sin(np.radians(lon)),
+                   np.sin(np.radians(lat))), axis=-1)
+    sites = (orbit.R + alt)[:, np.newaxis] * up
+    sin_mask = np.sin(np.radians(mask))
+
+    # Sample the track, with the fastest the subsatellite point moves
+    duration = days * 24 * 60 * 60
+    t = np.append(np.arange(0, duration, step), duration)
+    pos, vel = orbit.propagate(t)
+    ecef = _ecef(orbit, pos, t)
+    r = np.linalg.norm(pos, axis=-1)
+    rate = np.max(np.linalg.norm(np.cross(pos, vel), axis=-1)/r**2) + abs(orbit.W)
+
+    # Visibility circles, as central angles at the highest altitude
+    reach = np.arccos(np.minimum((orbit.R + alt)/r.max() * np.cos(np.radians(mask)), 1)) - np.radians(mask)
+    reach = np.minimum(np.maximum(reach, 0) + rate * step, np.pi)
+
+    # Samples near each station, grouped into runs padded by a sample on each side
+    tree = cKDTree(ecef/r[:, np.newaxis])
+    near = tree.query_ball_point(up, 2 * np.sin(reach/2), return_sorted=True)
+    station, first, last = _runs(near, len(t))
+    instrumentation.count("orbit.access_runs", len(station))
+    if len(station) == 0:
+        return np.empty(0, dtype=ACCESS)
+
+    # Elevations above the mask on the runs' samples
+    length = last - first + 1
+    run = np.repeat(np.arange(len(station)), length)
+    sample = np.arange(length.sum()) - np.repeat(np.cumsum(length) - length - first, length)
+    j = station[run]
+    height = _elevation(ecef[sample], sites[j], up[j]) - sin_mask[j]
+    above = height > 0
+
+    # Brackets where the elevation crosses the mask within a run, rising or setting
+    cross = np.flatnonzero((above[1:] != above[:-1]) & (run[1:] == run[:-1]))
+    brackets = [(j[cross], t[sample[cross]], t[sample[cross + 1]], above[cross + 1])]
+
+    # Runs never above the mask may still hold a pass between samples, around their highest sample
+    dark = ~np.logical_or.reduceat(above, np.cumsum(length) - length)
+    if dark.any():
+        peak = sample[np.lexsort((height, run))[np.cumsum(length) - 1]][dark]
+        k = station[dark]
+        lo, hi = t[np.maximum(peak - 1, 0)], t[np.minimum(peak + 1, len(t) - 1)]
+        t_peak, value = _peak(orbit, lo, hi, sites[k], up[k], tol)
+        seen = value > sin_mask[k]
+        brackets.append((k[seen], lo[seen], t_peak[seen], np.ones(seen.sum(), dtype=bool)))
+        brackets.append((k[seen], t_peak[seen], hi[seen], np.zeros(seen.sum(), dtype=bool)))
+
+    # Refine every bracket at once
+    k, lo, hi, rising = (np.concatenate(column) for column in zip(*brackets))
+    for _ in range(int(np.ceil(np.log2(step/tol))) if len(k) else 0):
+        mid = (lo + hi)/2
+        same = (_sin_elevation(orbit, mid, sites[k], up[k]) > sin_mask[k]) != rising
+        lo = np.where(same, mid, lo)
+        hi = np.where(same, hi, mid)
+
+    # Passes open at either end of the span rise at its start or set at its end
+    opened = np.flatnonzero(above & (sample == 0))
+    closed = np.flatnonzero(above & (sample == len(t) - 1))
+    k = np.concatenate((k, j[opened], j[closed]))
+    times = np.concatenate(((lo + hi)/2, np.zeros(len(opened)), np.full(len(closed), duration)))
+    rising = np.concatenate((rising, np.ones(len(opened), dtype=bool), np.zeros(len(closed), dtype=bool)))
+
+    # Pair each station's rises and sets in time order
+    order = np.lexsort((~rising, times, k))
+    k, times = k[order], times[order]
+
+    # Build the table, with the elevation halfway through each pass
+    passes = np.empty(len(k)//2, dtype=ACCESS)
+    passes['station'] = k[0::2]
+    passes['rise'] = times[0::2]
+    passes['set'] = times[1::2]
+    middle = (passes['rise'] + passes['set'])/2
+    passes['elevation'] = np.degrees(np.arcsin(_sin_elevation(orbit, middle, sites[passes['station']],
+                                                              up[passes['station']])))
+    return passes[np.lexsort((passes['station'], passes['rise']))]
+
+
+def _runs(near: np.ndarray, num: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Groups each station's nearby samples into runs of consecutive samples, padded by one on each side.
+
+    Args:
+        near (np.ndarray): the sorted sample indices near each station.
+        num (int): the number of samples.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: the station, first sample, and last sample of each run.
+    """
+    station, first, last = [], [], []
+    for j, samples in enumerate(near):
+        if not samples:
+            continue
+        samples = np.asarray(samples)
+        breaks = np.flatnonzero(np.diff(samples) > 1)
+        start = np.maximum(samples[np.r_[0, breaks + 1]] - 1, 0)
+        stop = np.minimum(samples[np.r_[breaks, len(samples) - 1]] + 1, num - 1)
+
+        # Runs that the padding joins are merged
+        apart = start[1:] > stop[:-1]
+        start, stop = start[np.r_[True, apart]], stop[np.r_[apart, True]]
+        station.append(np.full(len(start), j))
+        first.append(start)
+        last.append(stop)
+    if not station:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0, dtype=int)
+    return np.concatenate(station), np.concatenate(first), np.concatenate(last)
+
+
+def _peak(orbit: Orbit,
+          lo: np.ndarray,
+          hi: np.ndarray,
+          sites: np.ndarray,
+          up: np.ndarray,
+          tol: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Searches for the highest elevation of each interval with golden sections.
+
+    Args:
+        orbit (Orbit): the orbit.
+        lo (np.ndarray): starts of the intervals (sec).
+        hi (np.ndarray): ends of the intervals (sec).
+        sites (np.ndarray): positions of the paired stations (km).
+        up (np.ndarray): zenith directions of the paired stations.
+        tol (float): the accuracy of the peak times (sec).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the times of the peaks (sec) and the sine of their elevations.
+    """
+    # Two interior points, shrinking the interval by the golden ratio each step
+    a, b = lo + (1 - _GOLDEN) * (hi - lo), lo + _GOLDEN * (hi - lo)
+    fa, fb = _sin_elevation(orbit, a, sites, up), _sin_elevation(orbit, b, sites, up)
+    for _ in range(int(np.ceil(np.log(max(np.max(hi - lo), tol)/tol)/np.log(1/_GOLDEN)))):
+        # Keep the side of the higher point, which becomes the other interior point
+        left = fa > fb
+        lo, hi = np.where(left, lo, a), np.where(left, b, hi)
+        x = np.where(left, lo + (1 - _GOLDEN) * (hi - lo), lo + _GOLDEN * (hi - lo))
+        fx = _sin_elevation(orbit, x, sites, up)
+        a, b, fa, fb = np.where(left, x, b), np.where(left, a, x), np.where(left, fx, fb), np.where(left, fa, fx)
+    t_peak = (lo + hi)/2
+    return t_peak, _sin_elevation(orbit, t_peak, sites, up)
+
+
+def _ecef(orbit: Orbit, pos: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Rotates inertial positions onto the rotating Earth, as the ground track does."""
+    theta = orbit.theta0 + orbit.W * np.asarray(t, dtype=float)
+    c, s = np.cos(theta), np.sin(theta)
+    return np.stack((c * pos[:, 0] + s * pos[:, 1], c * pos[:, 1] - s * pos[:, 0], pos[:, 2]), axis=-1)
+
+
+def _elevation(ecef: np.ndarray, sites: np.ndarray, up: np.ndarray) -> np.ndarray:
+    """Computes the sine of the satellite's elevation at each station."""
+    rho = ecef - sites
+    return np.einsum('ij,ij->i', rho, up)/np.linalg.norm(rho, axis=-1)
+
+
+def _sin_elevation(orbit: Orbit, t: np.ndarray, sites: np.ndarray, up: np.ndarray) -> np.ndarray:
+    """Propagates an orbit and computes the sine of its elevation at each paired station."""
+    pos, _ = orbit.propagate(t)
+    return _elevation(_ecef(orbit, pos, t), sites, up)
+
+
+# Test
+if __name__ == '__main__':
+    from pyCubeSat.Orbit import EarthOrbit
+    rng = np.random.default_rng(0)
+    passes = access_windows(EarthOrbit(), 1, rng.uniform(-60, 60, 30), rng.uniform(-180, 180, 30), mask=10)
+    print(len(passes), passes[:5])
@@ -0,0 +1,409 @@
+#!/usr/bin/env python
+"""Propagates many Earth orbits or element sets at once.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+import numpy as np
+
+# Custom packages
+from pyCubeSat.Orbit.earth import EarthOrbit, EarthTLE
+from pyCubeSat import instrumentation
+from pyCubeSat.Orbit.propagation import j2_rates, kepler, subsatellite
+from pyCubeSat.Orbit.sgp4 import sgp4, sgp4_init
+from pyCubeSat.math.frames import gmst
+from pyCubeSat.Orbit.tle import FIELDS, parse_tle, read_tle, to_jd
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat.Orbit')
+
+# Size of each working array of a block of (satellite, time) samples (bytes), small enough to stay in cache
+BLOCK_BYTES = 1 << 17
+
+
+def _drifting_sincos(angle0: np.ndarray,
+                     rate: np.ndarray,
+                     t: np.ndarray,
+                     dtype: np.dtype) -> Tuple[np.ndarray, np.ndarray]:
+    """Computes the cosines and sines of secularly drifting angles, for N orbits over a time grid.
+
+    Args:
+        angle0 (np.ndarray): the angles at t = 0 (N, 1) (rad).
+        rate (np.ndarray): their rates (N, 1) (rad/s).
+        t (np.ndarray): the times (sec).
+        dtype (np.dtype): the floating point type of the results.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the cosines and sines, (N, 1) if the angles are fixed or (N, len(t)).
+    """
+    # Fixed angles are computed once per orbit
+    if not np.any(rate):
+        return np.cos(angle0).astype(dtype), np.sin(angle0).astype(dtype)
+
+    # Reduced in double precision, so single precision keeps its accuracy over long spans
+    angle = angle0 + rate * t
+    angle -= np.round(angle/(2 * np.pi)) * (2 * np.pi)
+    angle = angle.astype(dtype, copy=False)
+    return np.cos(angle), np.sin(angle)
+
+
+class EarthOrbitBatch():
+    """Struct-of-arrays set of Earth orbits, propagated together over a shared time grid"""
+    # Set orbital constants
+    MU = EarthOrbit.MU
+    R = EarthOrbit.R
+    RE = EarthOrbit.RE
+    J2 = EarthOrbit.J2
+    W = EarthOrbit.W
+
+    def __init__(self,
+                 Ap: np.ndarray,
+                 e: np.ndarray,
+                 i: np.ndarray,
+                 omega: np.ndarray,
+                 w: np.ndarray,
+                 j2: bool = True,
+                 dtype: np.dtype = np.float64):
+        """Stores the orbital elements of N satellites as contiguous arrays, with the same conventions as EarthOrbit.
+
+        Scalars are broadcast against the other elements.
+
+        Args:
+            Ap (np.ndarray): altitudes of periapsis (km).
+            e (np.ndarray): orbital eccentricities, between 0 and 1.
+            i (np.ndarray): orbital inclinations (deg).
+            omega (np.ndarray): right ascensions of the ascending node (deg).
+            w (np.ndarray): arguments of periapsis (deg).
+            j2 (bool): whether to propagate the secular J2 drift. Defaults to True.
+            dtype (np.dtype): the floating point type of propagation, e.g. np.float32 to halve the memory of the
+                outputs and run the trigonometry in single precision, to within about a meter. Defaults to np.float64.
+        """
+        # Broadcast elements to contiguous arrays
+        Ap, e, i, omega, w = (np.ascontiguousarray(x, dtype=float) for x in np.broadcast_arrays(Ap, e, i, omega, w))
+        self._e = e.ravel()
+        self._i = np.radians(i.ravel())
+        self._omega = np.radians(omega.ravel())
+        self._w = np.radians(w.ravel())
+        self._j2 = j2
+        self._dtype = np.dtype(dtype)
+
+        # Calculate periapsis radius, specific angular momentum, semi-major axis, and period
+        self._rp = Ap.ravel() + self.R
+        self._h = np.sqrt(self._rp * self.MU * (1 + self._e))
+        self._a = (self._h**2/self.MU) * (1/(1 - self._e**2))
+        self._T = ((2 * np.pi)/np.sqrt(self.MU)) * self._a**(3/2)
+
+        # Get secular rates
+        if j2:
+            self._omega_dot, self._w_dot, self._n = j2_rates(self._a, self._e, self._i, self.MU, self.RE, self.J2)
+        else:
+            self._omega_dot = np.zeros(len(self))
+            self._w_dot = np.zeros(len(self))
+            self._n = np.sqrt(self.MU/self._a**3)
+
+    def __len__(self) -> int:
+        return len(self._a)
+
+    def _blocks(self, num: int):
+        """Tiles the satellites and times into blocks that keep every working array within BLOCK_BYTES.
+
+        Args:
+            num (int): the number of times.
+
+        Yields:
+            Tuple[slice, slice]: the satellites and times of each block.
+        """
+        samples = max(BLOCK_BYTES//np.dtype(float).itemsize, 1)
+        per_time = min(max(num, 1), samples)
+        per_sat = max(samples//per_time, 1)
+        for first in range(0, len(self), per_sat):
+            for start in range(0, num, per_time):
+                yield slice(first, first + per_sat), slice(start, start + per_time)
+
+    @instrumentation.timed("orbit.batch_propagate")
+    def _propagate(self, sats: slice, t: np.ndarray, pos: np.ndarray, vel: np.ndarray):
+        """Propagates a block of satellites over a block of times, writing into the output views.
+
+        Args:
+            sats (slice): the satellites.
+            t (np.ndarray): the times (sec).
+            pos (np.ndarray): the position output (n, len(t), 3) (km).
+            vel (np.ndarray): the velocity output (n, len(t), 3) (km/s).
+        """
+        dtype = self._dtype
+        a, e, n = (x[sats, None].astype(dtype) for x in (self._a, self._e, self._n))
+
+        # Mean anomaly reduced in double precision, then solved in the working precision
+        M = self._n[sats, None] * t
+        M -= np.round(M/(2 * np.pi)) * (2 * np.pi)
+        _, sin_E, cos_E = kepler(M.astype(dtype, copy=False), e, reduced=True)
+
+        # Perifocal coordinates
+        b = a * np.sqrt(1 - e * e)
+        xp = a * (cos_E - e)
+        yp = b * sin_E
+        Edot = n/(1 - e * cos_E)
+        vxp = -a * sin_E * Edot
+        vyp = b * cos_E * Edot
+
+        # Perifocal unit vectors P and Q in the inertial frame
+        cO, sO = _drifting_sincos(self._omega[sats, None], self._omega_dot[sats, None], t, dtype)
+        cw, sw = _drifting_sincos(self._w[sats, None], self._w_dot[sats, None], t, dtype)
+        ci, si = (x.astype(dtype) for x in (np.cos(self._i[sats, None]), np.sin(self._i[sats, None])))
+        cOcw, sOsw, sOcw, cOsw = cO * cw, sO * sw, sO * cw, cO * sw
+        P = (cOcw - sOsw * ci, sOcw + cOsw * ci, sw * si)
+        Q = (-cOsw - sOcw * ci, -sOsw + cOcw * ci, cw * si)
+
+        # Rotate straight into the outputs
+        for k in range(3):
+            pos[..., k] = xp * P[k] + yp * Q[k]
+            vel[..., k] = vxp * P[k] + vyp * Q[k]
+
+        # Add the rotation of the node about the pole and of the periapsis about the orbit normal to the velocity
+        if self._j2:
+            x, y, z = pos[..., 0], pos[..., 1], pos[..., 2]
+            omega_dot, w_dot = (r[sats, None].astype(dtype) for r in (self._omega_dot, self._w_dot))
+            hx, hy, hz = w_dot * sO * si, -w_dot * cO * si, w_dot * ci
+            vel[..., 0] += hy * z - (hz + omega_dot) * y
+            vel[..., 1] += (hz + omega_dot) * x - hx * z
+            vel[..., 2] += hx * y - hy * x
+
+    def propagate(self, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Propagates every orbit to inertial position and velocity.
+
+        Args:
+            t (np.ndarray): the shared times since periapsis passage (sec).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: position (km) and velocity (km/s), both (N, len(t), 3).
+        """
+        t = np.asarray(t, dtype=float)
+        pos = np.empty((len(self), len(t), 3), dtype=self._dtype)
+        vel = np.empty_like(pos)
+        for sats, times in self._blocks(len(t)):
+            self._propagate(sats, t[times], pos[sats, times], vel[sats, times])
+        instrumentation.allocation("orbit.batch_states", pos.nbytes + vel.nbytes, 2)
+        return pos, vel
+
+    def getGroundTrack(self, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Computes the ground track of every orbit.
+
+        Args:
+            t (np.ndarray): the shared times since periapsis passage (sec).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: radius (km), latitude, and longitude (deg), each (N, len(t)).
+        """
+        log.info(f"Computing ground tracks of {len(self)} orbits")
+        t = np.asarray(t, dtype=float)
+        r = np.empty((len(self), len(t)), dtype=self._dtype)
+        lat = np.empty_like(r)
+        lon = np.empty_like(r)
+        for sats, times in self._blocks(len(t)):
+            pos = np.empty((len(self._a[sats]), len(t[times]), 3), dtype=self._dtype)
+            self._propagate(sats, t[times], pos, np.empty_like(pos))
+            r[sats, times], lat[sats, times], lon[sats, times] = subsatellite(pos, t[times], self.W)
+        return r, lat, lon
+
+    def __getitem__(self, k: int) -> EarthOrbit:
+        """Returns a single satellite as an EarthOrbit."""
+        return EarthOrbit(Ap=self._rp[k] - self.R, e=self._e[k], i=np.degrees(self._i[k]),
+                          omega=np.degrees(self._omega[k]), w=np.degrees(self._w[k]), j2=self._j2)
+
+    # Properties
+    @property
+    def j2(self) -> bool:
+        """Whether J2 secular perturbations are propagated"""
+        return self._j2
+
+    @property
+    def rp(self) -> np.ndarray:
+        """Orbital periapsis radii (km)"""
+        return self._rp
+
+    @property
+    def ra(self) -> np.ndarray:
+        """Orbital apoapsis radii (km)"""
+        return self._a * (1 + self._e)
+
+    @property
+    def e(self) -> np.ndarray:
+        """Orbital eccentricities"""
+        return self._e
+
+    @property
+    def i(self) -> np.ndarray:
+        """Orbital inclinations (rad)"""
+        return self._i
+
+    @property
+    def omega(self) -> np.ndarray:
+        """Orbital right ascensions of the ascending node (rad)"""
+        return self._omega
+
+    @property
+    def w(self) -> np.ndarray:
+        """Orbital arguments of periapsis (rad)"""
+        return self._w
+
+    @property
+    def h(self) -> np.ndarray:
+        """Orbital specific angular momenta"""
+        return self._h
+
+    @property
+    def a(self) -> np.ndarray:
+        """Orbital semi-major axes (km)"""
+        return self._a
+
+    @property
+    def T(self) -> np.ndarray:
+        """Orbital periods (sec)"""
+        return self._T
+
+
+class TLECatalog():
+    """Struct-of-arrays catalog of two-line element sets, propagated together with SGP4"""
+    # Set orbital constants
+    W = EarthOrbit.W
+
+    def __init__(self, elements: Dict[str, np.ndarray], names: Iterable[str] | None = None):
+        """Stores the element sets and precomputes their SGP4 constants.
+
+        Args:
+            elements (Dict[str, np.ndarray]): arrays of every field from parse_tle.
+            names (Iterable[str] | None): the satellite names. Defaults to None, no names.
+        """
+        self._elements = {key: np.ascontiguousarray(elements[key], dtype=float) for key in FIELDS}
+        self._names = list(names) if names is not None else [''] * len(self._elements['epoch'])
+        e = self._elements
+        self._consts = sgp4_init(e['n'], e['e'], e['i'], e['omega'], e['w'], e['M'], e['bstar'])
+
+    @classmethod
+    def load(cls, path: str | Path | Iterable[str]) -> 'TLECatalog':
+        """Ingests a catalog file in a single streaming pass, skipping malformed element sets.
+
+        Args:
+            path (str | Path | Iterable[str]): the catalog file, or its lines.
+
+        Returns:
+            TLECatalog: the catalog.
+        """
+        columns = {key: [] for key in FIELDS}
+        names = []
+        skipped = 0
+        lines = open(path, 'r') if isinstance(path, (str, Path)) else path
+        try:
+            for name, line1, line2 in read_tle(lines):
+                try:
+                    elements = parse_tle(line1, line2)
+                except ValueError as error:
+                    log.warning(error)
+                    skipped += 1
+                    continue
+                for key in FIELDS:
+                    columns[key].append(elements[key])
+                names.append(name)
+        finally:
+            if lines is not path:
+                lines.close()
+
+        log.info(f"Loaded {len(names)} element sets, skipped {skipped}")
+        return cls({key: np.array(values, dtype=float) for key, values in columns.items()}, names)
+
+    def __len__(self) -> int:
+        return len(self._elements['epoch'])
+
+    def _tsince(self, t: np.ndarray, start: datetime | None) -> np.ndarray:
+        """Times since each element epoch, (N, len(t)) or (N, 1)-broadcastable (sec)."""
+        if start is None:
+            return t[None, :]
+        return t[None, :] + (to_jd(start) - self._elements['epoch'][:, None]) * 24 * 60 * 60
+
+    def _blocks(self, t: np.ndarray, start: datetime | None):
+        """Splits the satellites into blocks that keep the working arrays bounded.
+
+        Args:
+            t (np.ndarray): the shared time grid (sec).
+            start (datetime | None): the date of t = 0, or None for each satellite's own epoch.
+
+        Yields:
+            Tuple[slice, np.ndarray, Dict[str, np.ndarray]]: the satellite slice, its times since epoch, and its
+                constants shaped (n, 1) for broadcasting against t.
+        """
+        per_block = max(BLOCK_BYTES//np.dtype(float).itemsize//max(len(t), 1), 1)
+        tsince = self._tsince(t, start)
+        for begin in range(0, len(self), per_block):
+            sats = slice(begin, begin + per_block)
+            consts = {key: value[sats, None] for key, value in self._consts.items()}
+            yield sats, tsince[sats] if start is not None else tsince, consts
+
+    def propagate(self, t: np.ndarray, start: datetime | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Propagates every element set to TEME position and velocity.
+
+        Args:
+            t (np.ndarray): the shared times (sec).
+            start (datetime | None): the date of t = 0. Defaults to None, each satellite's own epoch.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: position (km) and velocity (km/s), both (N, len(t), 3).
+        """
+        t = np.asarray(t, dtype=float)
+        pos = np.empty((len(self), len(t), 3))
+        vel = np.empty_like(pos)
+        for sats, tsince, consts in self._blocks(t, start):
+            pos[sats], vel[sats] = sgp4(consts, tsince)
+        return pos, vel
+
+    def getGroundTrack(self, t: np.ndarray, start: datetime | None = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Computes the ground track of every element set.
+
+        Args:
+            t (np.ndarray): the shared times (sec).
+            start (datetime | None): the date of t = 0. Defaults to None, each satellite's own epoch.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: radius (km), latitude, and longitude (deg), each (N, len(t)).
+        """
+        log.info(f"Computing ground tracks of {len(self)} element sets")
+        t = np.asarray(t, dtype=float)
+        r = np.empty((len(self), len(t)))
+        lat = np.empty_like(r)
+        lon = np.empty_like(r)
+        theta0 = gmst(self._elements['epoch'] if start is None else to_jd(start))
+        for sats, tsince, consts in self._blocks(t, start):
+            pos, _ = sgp4(consts, tsince)
+            theta = theta0[sats, None] if start is None else theta0
+            r[sats], lat[sats], lon[sats] = subsatellite(pos, t, self.W, theta)
+        return r, lat, lon
+
+    def __getitem__(self, k: int) -> EarthTLE:
+        """Returns a single element set as an EarthTLE."""
+        return EarthTLE(elements={key: self._elements[key][k] for key in FIELDS}, name=self._names[k])
+
+    # Properties
+    @property
+    def names(self) -> list:
+        """Satellite names"""
+        return self._names
+
+    @property
+    def satnum(self) -> np.ndarray:
+        """Satellite catalog numbers"""
+        return self._elements['satnum'].astype(int)
+
+    @property
+    def epoch(self) -> np.ndarray:
+        """Element set epochs (Julian date)"""
+        return self._elements['epoch']
@@ -11,11 +11,18 @@ __maintainer__ = None
 __contact__ = None
 
 # Imports
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, Tuple
 import numpy as np
-import plotly.graph_objects as go
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
 # Custom packages
 from pyCubeSat.Orbit import Orbit
+from pyCubeSat.Orbit import sgp4
+from pyCubeSat.Orbit.tle import parse_tle, to_datetime
+from pyCubeSat.Orbit.track import GroundTrack
+from pyCubeSat.math.frames import gmst
 
 # Logging
 import logging
@@ -26,6 +33,7 @@ class EarthOrbit(Orbit):
     # Set orbital constants
     MU = 398600  # km^3/m^2
     R = 6371  # Volumetric mean radius (km)
+    RE = 6378.137  # Equatorial radius (km)
     J2 = 0.0010836  # Earth's dynamics oblateness
     W = (2 * np.pi)/((365.24/366.24) * 24 * 60 * 60)  # Angular rate of Earth (rad/s)
 
@@ -35,7 +43,8 @@ class EarthOrbit(Orbit):
                  i: float = 51.6432,
                  omega: float = 289.5972,
                  w: float = 300.5175,
-                 res: int = 1000):
+                 res: int = 1000,
+                 j2: bool = True):
         """Propogates an orbit around Earth based on input parameters, or uses the default parameters for the ISS.
 
         Args:
@@ -45,9 +54,14 @@ class EarthOrbit(Orbit):
             Omega (float): right ascention of the ascending node (deg). Defaults to 289.5972°
             w (float): argument of periapsis (deg). Defaults to 300.5175°.
             res (int): resolution of the orbit. Defaults to 1000.
+            j2 (bool): whether to propagate the secular J2 drift of the node, periapsis, and mean anomaly. Defaults
+                to True.
         """
+        # Set eccentricity and perturbations
+        self._e = e
+        self._j2 = j2
+
         # Convert to radians
-        self._e = np.radians(e)
         self._i = np.radians(i)
         self._omega = np.radians(omega)
         self._w = np.radians(w)
@@ -68,11 +82,20 @@ class EarthOrbit(Orbit):
         # Calculate r
         self._r = (self._h**2/EarthOrbit.MU) * (1/(1 + self._e * np.cos(theta)))
 
-    def plot_ground_track(self, days: float) -> go.Figure:
+    def plot_ground_track(self,
+                          days: float,
+                          chunks: Iterable[GroundTrack] | None = None,
+                          max_points: int | None = 20000) -> 'go.Figure':
         """Plots the ground track of the satellite
 
+        Long tracks are decimated chunk by chunk as they stream in, so only the plotted samples are held in memory.
+
         Args:
-            days (float): the number of days to plot.
+            days (float): the number of days to plot, when no chunks are given.
+            chunks (Iterable[GroundTrack] | None): ground track chunks to plot, e.g. from iter_ground_track. Defaults
+                to None, computing them for the given days.
+            max_points (int | None): about the most samples to plot, shared between chunks by their time span.
+                Defaults to 20000, or None to plot every sample.
 
         Returns:
             go.Figure: the ground track.
@@ -80,27 +103,52 @@ class EarthOrbit(Orbit):
         # Log
         log.info("Plotting ground track")
 
-        # Get ground track
-        ground_track = self.getGroundTrack(days)
-
-        # Create figure
+        # Join the chunks, decimating each to its share of the samples over the span streamed so far, as the span of
+        # given chunks is only known once they are all read
+        if chunks is None:
+            chunks = self.iter_ground_track(days)
+        if max_points is not None:
+            decimated, kept, first = [], 0, None
+            for chunk in chunks:
+                chunk = GroundTrack(*(chunk[key] for key in GroundTrack.FIELDS))
+                if len(chunk) == 0:
+                    continue
+                first = chunk.sec[0] if first is None else first
+                span = chunk.sec[-1] - first
+                if len(chunk) > 2 and span > 0:
+                    chunk = chunk.decimate(max(int(max_points * (chunk.sec[-1] - chunk.sec[0])/span), 2))
+                decimated.append(chunk)
+                kept += len(chunk)
+
+                # Thin the samples held once the span has grown enough to double them
+                if kept > 2 * max_points:
+                    decimated = [GroundTrack.concatenate(decimated).decimate(max_points)]
+                    kept = len(decimated[0])
+            chunks = decimated
+        ground_track = GroundTrack.concatenate(chunks)
+        if max_points is not None and len(ground_track) > max_points:
+            ground_track = ground_track.decimate(max_points)
+        altitude = ground_track.r - self.R
+
+        # Create figure, plotly only imported for plotting
+        import plotly.graph_objects as go
         fig1 = go.Figure(
             data=[
                 go.Scattergeo(  # Earth map
                     name="Ground Track",
-                    lat=ground_track['lat'],
-                    lon=ground_track['lon'],
+                    lat=ground_track.lat,
+                    lon=ground_track.lon,
                     mode="markers",
                     marker={
-                        'cmax': np.max(self._r) - self.R,
-                        'cmin': np.min(self._r) - self.R,
+                        'cmax': np.max(altitude),
+                        'cmin': np.min(altitude),
                         'colorscale': [[0, "rgb(255, 0, 0)"], [1, "rgb(0, 0, 255)"]],
-                        'color': self._r - self.R,
+                        'color': altitude,
                         'colorbar': {
                             'title': {
                                 'text': "Altitude"
                             },
-                            'tickvals': [np.min(self._r) - self.R, np.mean(self._r) - self.R, np.max(self._r) - self.R],
+                            'tickvals': [np.min(altitude), np.mean(altitude), np.max(altitude)],
                         }
                     }
                 )
@@ -159,47 +207,87 @@ class EarthOrbit(Orbit):
         return self._T
 
 
-class EarthTLE():
-    def __init__(self):
-        return
+class EarthTLE(EarthOrbit):
+    # TLEs are fit with WGS-72
+    MU = sgp4.MU
 
-    # Properties
-    @property
-    def r(self) -> np.ndarray:
-        return self._r
+    def __init__(self,
+                 line1: str = "1 25544U 98067A   08264.51782528 -.00002182  00000-0 -11606-4 0  2927",
+                 line2: str = "2 25544  51.6416 247.4627 0006703 130.5360 325.0288 15.72125391563537",
+                 name: str = "",
+                 res: int = 1000,
+                 elements: Dict[str, float] | None = None):
+        """Propagates a two-line element set with SGP4, or uses an example set for the ISS.
 
-    @property
-    def ra(self) -> float:
-        return np.max(self._r)
+        Times are seconds since the element set epoch, and positions are in the TEME frame.
 
-    @property
-    def rp(self) -> float:
-        return np.min(self._r)
+        Args:
+            line1 (str): the first line of the element set.
+            line2 (str): the second line of the element set.
+            name (str): the satellite name. Defaults to "".
+            res (int): resolution of the orbit. Defaults to 1000.
+            elements (Dict[str, float] | None): already parsed elements, from parse_tle, used instead of the lines.
+                Defaults to None.
+        """
+        # Parse elements
+        if elements is None:
+            elements = parse_tle(line1, line2)
+        self._elements = dict(elements)
+        self._name = name
+        self._consts = sgp4.sgp4_init(*(elements[key] for key in ("n", "e", "i", "omega", "w", "M", "bstar")))
+
+        # Set mean elements
+        self._e = elements['e']
+        self._i = elements['i']
+        self._omega = elements['omega']
+        self._w = elements['w']
+
+        # Earth's rotation angle at the epoch
+        self._theta0 = float(gmst(elements['epoch']))
+
+        # Calculate semi-major axis and period from the Brouwer mean motion
+        no = float(self._consts['no'])
+        self._a = (sgp4.XKE/no)**(2/3) * sgp4.RE
+        self._T = 2 * np.pi/no * 60
+        self._h = np.sqrt(self._a * (1 - self._e**2) * self.MU)
 
-    @property
-    def e(self) -> float:
-        return self._e
+        # Calculate r
+        theta = np.linspace(0, 2 * np.pi, res)
+        self._r = (self._h**2/self.MU) * (1/(1 + self._e * np.cos(theta)))
 
-    @property
-    def i(self) -> float:
-        return self._i
+    def propagate(self, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Propagates the element set with SGP4.
+
+        Args:
+            t (np.ndarray): times since the element set epoch (sec).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: TEME position (km) and velocity (km/s), both (len(t), 3).
+        """
+        return sgp4.sgp4(self._consts, t)
 
+    # Properties
     @property
-    def omega(self) -> float:
-        return self._omega
+    def name(self) -> str:
+        """Satellite name"""
+        return self._name
 
     @property
-    def w(self) -> float:
-        return self._w
+    def satnum(self) -> int:
+        """Satellite catalog number"""
+        return int(self._elements['satnum'])
 
     @property
-    def h(self) -> float:
-        return self._h
+    def epoch(self) -> datetime:
+        """Element set epoch (UTC)"""
+        return to_datetime(self._elements['epoch'])
 
     @property
-    def a(self) -> float:
-        return self._a
+    def bstar(self) -> float:
+        """Drag term (1/Earth radii)"""
+        return self._elements['bstar']
 
     @property
-    def T(self) -> float:
-        return self._T
\ No newline at end of file
+    def elements(self) -> Dict[str, float]:
+        """Parsed element set"""
+        return dict(self._elements)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+"""Sunlight and eclipse intervals along an orbit, with a conical Earth shadow.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from datetime import datetime
+from typing import Tuple
+import numpy as np
+
+# Custom packages
+from pyCubeSat import instrumentation
+from pyCubeSat.Orbit.orbit import Orbit, _epoch
+from pyCubeSat.math.frames import julian_date
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat.Orbit')
+
+# Constants
+AU = 149597870.7  # km
+R_SUN = 696000  # km
+
+# Illumination states
+SUNLIT = 0
+PENUMBRA = 1
+UMBRA = 2
+
+# Intervals of constant illumination
+INTERVAL = np.dtype([('start', float), ('stop', float), ('state', np.int8)])
+
+
+def sun_position(jd: float | np.ndarray) -> np.ndarray:
+    """Computes the position of the Sun with the Astronomical Almanac's low-precision formulas.
+
+    Accurate to about 0.01° between 1950 and 2050.
+
+    Args:
+        jd (float | np.ndarray): Julian dates.
+
+    Returns:
+        np.ndarray: the positions in the mean equator and equinox of date, of shape (N, 3) (km).
+    """
+    # Mean longitude and anomaly
+    T = (np.atleast_1d(np.asarray(jd, dtype=float)) - 2451545.0)/36525.0
+    lam_M = np.radians(280.460 + 36000.771 * T)
+    M = np.radians(357.5291092 + 35999.05034 * T)
+
+    # Ecliptic longitude, distance, and obliquity
+    lam = lam_M + np.radians(1.914666471 * np.sin(M) + 0.019994643 * np.sin(2 * M))
+    r = AU * (1.000140612 - 0.016708617 * np.cos(M) - 0.000139589 * np.cos(2 * M))
+    eps = np.radians(23.439291 - 0.0130042 * T)
+
+    # Rotate onto the equator
+    return np.stack((r * np.cos(lam), r * np.cos(eps) * np.sin(lam), r * np.sin(eps) * np.sin(lam)), axis=-1)
+
+
+def shadow_functions(pos: np.ndarray, sun: np.ndarray, R: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Evaluates the conical shadow boundaries, as seen from the satellite.
+
+    The satellite is in the penumbra cone when the angle between the Earth's and Sun's centers is less than the sum
+    of their apparent radii, and in the umbra cone when it is less than their difference. Both functions are
+    negative inside their cone, and cross zero smoothly at its boundary.
+
+    Args:
+        pos (np.ndarray): satellite positions, of shape (N, 3) (km).
+        sun (np.ndarray): Sun positions in the same frame, of shape (N, 3) (km).
+        R (float): radius of the Earth (km).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the penumbra and umbra functions (rad).
+    """
+    # Apparent radii of the Earth and Sun
+    to_sun = sun - pos
+    r = np.linalg.norm(pos, axis=-1)
+    d = np.linalg.norm(to_sun, axis=-1)
+    earth = np.arcsin(np.minimum(R/r, 1))
+    sun_radius = np.arcsin(R_SUN/d)
+
+    # Angle between the centers
+    cos_sep = -np.einsum('ij,ij->i', pos, to_sun)/(r * d)
+    sep = np.arccos(np.clip(cos_sep, -1, 1))
+    return sep - (earth + sun_radius), sep - (earth - sun_radius)
+
+
+def illumination(orbit: Orbit, t: np.ndarray, epoch: datetime | None = None) -> np.ndarray:
+    """Classifies the satellite's illumination at given times.
+
+    Args:
+        orbit (Orbit): the orbit, with positions in an Earth-centered inertial frame.
+        t (np.ndarray): times since the epoch (sec).
+        epoch (datetime | None): the date at t = 0. Defaults to None, the orbit's own epoch.
+
+    Returns:
+        np.ndarray: SUNLIT, PENUMBRA, or UMBRA at each time.
+    """
+    penumbra, umbra = _shadow(orbit, np.atleast_1d(np.asarray(t, dtype=float)), _epoch(orbit, epoch))
+    return _state(penumbra < 0, umbra < 0)
+
+
+@instrumentation.timed("orbit.eclipses")
+def eclipses(orbit: Orbit,
+             days: float,
+             epoch: datetime | None = None,
+             step: float = 60.0,
+             tol: float = 1e-3) -> np.ndarray:
+    """Finds the sunlit, penumbra, and umbra intervals along an orbit.
+
+    The shadow boundaries are bracketed on a grid of "step", then every crossing is refined together by bisection.
+    Shadows shorter than a step can fall between samples, so the step should stay well under the shortest eclipse
+    of interest; the default suits low Earth orbits.
+
+    Args:
+        orbit (Orbit): the orbit, with positions in an Earth-centered inertial frame.
+        days (float): the number of days to search.
+        epoch (datetime | None): the date at t = 0. Defaults to None, the orbit's own epoch.
+        step (float): the time between bracketing samples (sec). Defaults to 60.
+        tol (float): the accuracy of the entry and exit times (sec). Defaults to 1e-3.
+
+    Returns:
+        np.ndarray: the intervals, with "start" and "stop" times (sec) and the illumination "state" (SUNLIT, PENUMBRA,
+            or UMBRA), covering [0, days] in order.
+
+    Raises:
+        ValueError: if the span, step, or tolerance is not positive, or the orbit has no epoch and none is given.
+    """
+    if days <= 0 or step <= 0 or tol <= 0:
+        raise ValueError("Span, step, and tolerance must be positive")
+    epoch = _epoch(orbit, epoch)
+
+    # Log
+    log.info("Finding eclipses")
+
+    # Bracket the crossings of both cones on the grid
+    duration = days * 24 * 60 * 60
+    t = np.append(np.arange(0, duration, step), duration)
+    shadow = _shadow(orbit, t, epoch)
+    brackets = [np.flatnonzero(np.signbit(f[:-1]) != np.signbit(f[1:])) for f in shadow]
+    cone = np.concatenate([np.full(len(k), c) for c, k in enumerate(brackets)])
+    lo = np.concatenate([t[k] for k in brackets])
+    hi = np.concatenate([t[k + 1] for k in brackets])
+    inside = np.concatenate([np.signbit(f[k]) for f, k in zip(shadow, brackets)])
+    instrumentation.count("orbit.eclipse_crossings", len(cone))
+
+    # Bisect every bracket at once, keeping the side that matches its start
+    for _ in range(int(np.ceil(np.log2(step/tol))) if len(cone) else 0):
+        mid = (lo + hi)/2
+        f = _shadow(orbit, mid, epoch)
+        same = np.signbit(np.where(cone == 0, f[0], f[1])) == inside
+        lo = np.where(same, mid, lo)
+        hi = np.where(same, hi, mid)
+    crossings = (lo + hi)/2
+
+    # Each crossing toggles its cone, starting from the state at t = 0
+    order = np.argsort(crossings, kind='stable')
+    crossings, cone = crossings[order], cone[order]
+    in_penumbra = np.signbit(shadow[0][0]) ^ (np.cumsum(cone == 0) % 2).astype(bool)
+    in_umbra = np.signbit(shadow[1][0]) ^ (np.cumsum(cone == 1) % 2).astype(bool)
+    start = _state(np.signbit(shadow[0][:1]), np.signbit(shadow[1][:1]))
+    states = np.concatenate((start, _state(in_penumbra, in_umbra)))
+
+    # Build the intervals, merging any that a zero-length step separates
+    edges = np.concatenate(([0.0], crossings, [duration]))
+    keep = np.concatenate(([True], states[1:] != states[:-1]))
+    starts = edges[:-1][keep]
+    intervals = np.empty(len(starts), dtype=INTERVAL)
+    intervals['start'] = starts
+    intervals['stop'] = np.append(starts[1:], duration)
+    intervals['state'] = states[keep]
+    return intervals
+
+
+def _state(in_penumbra: np.ndarray, in_umbra: np.ndarray) -> np.ndarray:
+    """Combines the cone memberships into illumination states"""
+    return np.where(in_umbra, UMBRA, np.where(in_penumbra, PENUMBRA, SUNLIT)).astype(np.int8)
+
+
+def _shadow(orbit: Orbit, t: np.ndarray, epoch: datetime) -> Tuple[np.ndarray, np.ndarray]:
+    """Propagates an orbit and evaluates the shadow functions along it."""
+    pos, _ = orbit.propagate(t)
+    return shadow_functions(pos, sun_position(julian_date(t, epoch)), orbit.R)
+
+
+# Test
+if __name__ == '__main__':
+    from pyCubeSat.Orbit import EarthOrbit
+    intervals = eclipses(EarthOrbit(), 1, epoch=datetime(2024, 1, 1))
+    for state in (SUNLIT, PENUMBRA, UMBRA):
+        spans = intervals[intervals['state'] == state]
+        print(state, len(spans), np.sum(spans['stop'] - spans['start']))
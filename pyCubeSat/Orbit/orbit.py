@@ -12,88 +12,166 @@ __contact__ = None
 
 # Imports
 from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterator, Tuple
 import numpy as np
-import pandas as pd
+
+# Custom packages
+from pyCubeSat import instrumentation
+from pyCubeSat.Orbit.propagation import j2_rates, propagate, subsatellite
+from pyCubeSat.Orbit.track import GroundTrack
+from pyCubeSat.math.frames import utc
 
 # Logging
 import logging
 log = logging.getLogger('pyCubeSat.Orbit')
 
 
+def _epoch(orbit: 'Orbit', epoch: datetime | None) -> datetime:
+    """Gets the date at t = 0 in naive UTC, which orbits without their own epoch must be given."""
+    if epoch is None:
+        epoch = getattr(orbit, 'epoch', None)
+        if epoch is None:
+            raise ValueError(f"An epoch is needed for {type(orbit).__name__}")
+    return utc(epoch)
+
+
 # Master orbit class
 class Orbit(ABC):
     """Base orbit class"""
     # Set orbital constants
     MU: float
     R: float
+    RE: float
     J2: float
     W: float
 
+    # Secular J2 perturbations are off unless an orbit enables them
+    _j2 = False
+
+    # Rotation angle of the prime meridian at t = 0 (rad)
+    _theta0 = 0.0
+
     @abstractmethod
     def __init__(self):
         pass
 
-    def getGroundTrack(self, days: float) -> pd.DataFrame:
+    def propagate(self, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Propagates the orbit to inertial position and velocity.
+
+        Args:
+            t (np.ndarray): times since periapsis passage (sec).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: position (km) and velocity (km/s), both (len(t), 3).
+        """
+        # Keplerian
+        if not self.j2:
+            return propagate(t, self.a, self.e, self.i, self.omega, self.w, mu=self.MU)
+
+        # Precess the node and periapsis with the J2 secular rates
+        t = np.asarray(t, dtype=float)
+        omega_dot, w_dot, n = j2_rates(self.a, self.e, self.i, self.MU, self.RE, self.J2)
+        omega = self.omega + omega_dot * t
+        pos, vel = propagate(t, self.a, self.e, self.i, omega, self.w + w_dot * t, mu=self.MU, n=n)
+
+        # Add the rotation of the node about the pole and of the periapsis about the orbit normal to the velocity
+        h = np.stack((np.sin(self.i) * np.sin(omega), -np.sin(self.i) * np.cos(omega),
+                      np.full(np.shape(omega), np.cos(self.i))), axis=-1)
+        vel += omega_dot * np.cross((0.0, 0.0, 1.0), pos) + w_dot * np.cross(h, pos)
+        return pos, vel
+
+    @instrumentation.timed("orbit.ground_track")
+    def _track(self, t: np.ndarray) -> GroundTrack:
+        """Computes the ground track at the given times.
+
+        Args:
+            t (np.ndarray): times since periapsis passage (sec).
+
+        Returns:
+            GroundTrack: the ground track.
+        """
+        pos, _ = self.propagate(t)
+        r, lat, lon = subsatellite(pos, t, self.W, self._theta0)
+        return GroundTrack(t, r, lat, lon)
+
+    def _samples(self, days: float, step: float | None) -> Tuple[int, float]:
+        """Number of samples and the time between them for a ground track.
+
+        Args:
+            days (float): the number of days.
+            step (float | None): the time between samples (sec), or None for the orbit's resolution per period.
+
+        Returns:
+            Tuple[int, float]: the number of samples and the step (sec).
+        """
+        if step is None:
+            step = self.T/len(self.r)
+        return int(np.ceil(days * 24 * 60 * 60/step)), step
+
+    def getGroundTrack(self, days: float, step: float | None = None) -> GroundTrack:
         """Computes the ground track for the orbit.
 
         Args:
             days (float): the number of days to compute.
+            step (float | None): the time between samples (sec). Defaults to None, the orbit's resolution per period.
 
         Returns:
-            pd.DataFrame(index=[], columns=["sec", "r", "lat", and "lon"]): the dataframe containing ground track information.
+            GroundTrack: the "sec", "r", "lat", and "lon" arrays, see GroundTrack.to_pandas for a dataframe.
         """
         # Log
         log.info("Computing ground track")
 
-        # Get resolution from length of r
-        res = len(self.r)
-
-        # Calculate number of seconds in that many days
-        sec = days * 24 * 60 * 60
+        # Make time array
+        num, step = self._samples(days, step)
+        t = np.arange(num) * step
 
-        # Calculate number of orbits
-        num_orbits = int(sec/self.T)
+        return self._track(t)
 
-        # Get resolution
-        res = int(res * num_orbits)
+    def iter_ground_track(self,
+                          days: float,
+                          step: float | None = None,
+                          chunk_seconds: float = 24 * 60 * 60) -> Iterator[GroundTrack]:
+        """Computes the ground track in bounded-size chunks, for spans too long to hold in memory at once.
 
-        # Find thetas
-        theta_single = np.arccos((((self.h**2)/(self.r * self.MU)) - 1)/self.e)
+        Chunks are contiguous, and concatenating them gives the same samples as getGroundTrack.
 
-        # Propogate radius and true anomoly for days of orbit
-        theta = np.empty(0)
-        r = np.empty(0)
-        for _ in range(num_orbits):
-            theta = np.append(theta, theta_single)
-            r = np.append(r, self.r)
+        Args:
+            days (float): the number of days to compute.
+            step (float | None): the time between samples (sec). Defaults to None, the orbit's resolution per period.
+            chunk_seconds (float): the span of each chunk (sec). Defaults to one day.
 
-        # Make time array
-        t = np.linspace(0, sec, res)
+        Yields:
+            GroundTrack: each chunk.
+        """
+        # Log
+        log.info("Computing ground track in chunks")
 
-        # Calculate longitude and lattitude
-        # lat = np.arcsin(np.sin(self.i) * np.sin(self.w + theta))
-        # lon = np.arctan(np.cos(self.i) * np.tan(self.w + theta)) + self.omega - self.W * t
-        lat = np.linspace(0, 2 * np.pi, len(t))
-        lon = np.linspace(-np.pi, np.pi, len(t))
+        # Get samples per chunk
+        num, step = self._samples(days, step)
+        per_chunk = max(int(chunk_seconds//step), 1)
 
-        # Convert to degrees
-        lat = np.rad2deg(lat)
-        lon = np.rad2deg(lon)
+        # Times are computed from the global sample index, so chunks line up exactly
+        for start in range(0, num, per_chunk):
+            yield self._track(np.arange(start, min(start + per_chunk, num)) * step)
 
-        # Create dataframe of orbital ground track
-        columns = ['sec', 'r', 'lat', 'lon']
-        index = []
-        ground_track = pd.DataFrame(columns=columns, index=index)
+    # Properties
+    @property
+    def j2(self) -> bool:
+        """Whether J2 secular perturbations are propagated"""
+        return self._j2
 
-        # Populate
-        ground_track['sec'] = t
-        ground_track['r'] = r
-        ground_track['lat'] = lat
-        ground_track['lon'] = lon
+    @property
+    def theta0(self) -> float:
+        """Rotation angle of the prime meridian at t = 0 (rad)"""
+        return self._theta0
 
-        return ground_track
+    @property
+    def elements(self) -> Dict[str, float]:
+        """Elements that define the orbit"""
+        return {'a': float(self.a), 'e': float(self.e), 'i': float(self.i), 'omega': float(self.omega),
+                'w': float(self.w), 'j2': bool(self.j2)}
 
-    # Properties
     @property
     @abstractmethod
     def r(self) -> np.ndarray:
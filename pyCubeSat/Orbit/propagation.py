@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+"""Vectorized two-body orbit propagation.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from typing import Tuple
+import numpy as np
+
+# Custom packages
+from pyCubeSat import instrumentation
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat.Orbit')
+
+
+# Largest angle step that shift_sincos keeps to double precision (rad)
+SHIFT_MAX = 0.05
+
+
+def shift_sincos(s: np.ndarray, c: np.ndarray, d: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Steps known sines and cosines by small angles, with the angle addition formulas and no trigonometric calls.
+
+    Args:
+        s (np.ndarray): sines of the angles.
+        c (np.ndarray): cosines of the angles.
+        d (np.ndarray): the steps, at most SHIFT_MAX in magnitude (rad).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the sines and cosines of the stepped angles.
+    """
+    # Taylor series, below double precision to the 7th and 8th order for |d| <= SHIFT_MAX, or to the 3rd and 4th
+    # for the tiny steps of converging iterations
+    d2 = d * d
+    if np.max(np.abs(d), initial=0) <= 1e-3:
+        sin_d = d * (1 - d2/6)
+        cos_d = 1 - d2/2 * (1 - d2/12)
+    else:
+        sin_d = d * (1 - d2/6 * (1 - d2/20 * (1 - d2/42)))
+        cos_d = 1 - d2/2 * (1 - d2/12 * (1 - d2/30 * (1 - d2/56)))
+    return s * cos_d + c * sin_d, c * cos_d - s * sin_d
+
+
+def kepler(M: np.ndarray,
+           e: float | np.ndarray,
+           tol: float | None = None,
+           max_iter: int = 20,
+           reduced: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Solves Kepler's equation M = E - e sin(E) for the eccentric anomaly, with its sine and cosine.
+
+    Newton iterations start from the second order series in e, which is within e^3/2 of the root, and stop once the
+    quadratic convergence bounds the error left below tol, so near-circular orbits take one step. The sines and
+    cosines of small steps are carried along by angle addition instead of recomputed.
+
+    Args:
+        M (np.ndarray): mean anomalies (rad). Single precision anomalies are solved in single precision.
+        e (float | np.ndarray): eccentricities, broadcastable against M.
+        tol (float | None): the convergence tolerance (rad). Defaults to None, 1e-12 or the single precision epsilon.
+        max_iter (int): the maximum number of iterations. Defaults to 20.
+        reduced (bool): whether M is already within [-π, π], skipping the reduction. Defaults to False.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: the eccentric anomalies (rad), in the same revolution as M, and
+            their sines and cosines.
+    """
+    # Reduce to [-π, π) for fast convergence, restore the revolution afterwards
+    M = np.asarray(M)
+    dtype = M.dtype if M.dtype == np.float32 else np.dtype(float)
+    M = M.astype(dtype, copy=False)
+    e = np.asarray(e, dtype=dtype)
+    if tol is None:
+        tol = 1e-12 if dtype == np.float64 else float(np.finfo(dtype).eps)
+    rev = 0.0 if reduced else np.round(M/(2 * np.pi)) * dtype.type(2 * np.pi)
+    if not reduced:
+        M = M - rev
+
+    # Second order guess, E = M + e sin(M) + e^2/2 sin(2M)
+    E = M + e * np.sin(M) * (1 + e * np.cos(M))
+    sin_E, cos_E = np.sin(E), np.cos(E)
+
+    # Newton's error after a step of dE is about e/(2(1 - e)) dE^2, kept under tol with a factor of 2 to spare
+    e_max = float(np.max(e, initial=0))
+    if e_max == 0:
+        return E + rev, sin_E, cos_E
+    gain = e_max/(1 - e_max) if e_max < 1 else np.inf
+    for _ in range(max_iter):
+        dE = (E - e * sin_E - M)/(1 - e * cos_E)
+        E = E - dE
+        step = float(np.max(np.abs(dE), initial=0))
+        if step <= SHIFT_MAX:
+            sin_E, cos_E = shift_sincos(sin_E, cos_E, -dE)
+        else:
+            sin_E, cos_E = np.sin(E), np.cos(E)
+        if gain * step * step < tol:
+            break
+    else:
+        log.warning("Kepler's equation did not converge")
+
+    return E + rev, sin_E, cos_E
+
+
+def solve_kepler(M: np.ndarray, e: float | np.ndarray, tol: float = 1e-12, max_iter: int = 20) -> np.ndarray:
+    """Solves Kepler's equation M = E - e sin(E) for the eccentric anomaly with vectorized Newton iterations.
+
+    Args:
+        M (np.ndarray): mean anomalies (rad).
+        e (float | np.ndarray): eccentricities, broadcastable against M.
+        tol (float): the convergence tolerance (rad). Defaults to 1e-12.
+        max_iter (int): the maximum number of iterations. Defaults to 20.
+
+    Returns:
+        np.ndarray: the eccentric anomalies (rad), in the same revolution as M.
+    """
+    return kepler(np.asarray(M, dtype=float), e, tol, max_iter)[0]
+
+
+def j2_rates(a: float | np.ndarray,
+             e: float | np.ndarray,
+             i: float | np.ndarray,
+             mu: float,
+             R: float,
+             J2: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Computes the closed-form secular rates caused by the J2 zonal harmonic.
+
+    Args:
+        a (float | np.ndarray): semi-major axis (km).
+        e (float | np.ndarray): eccentricity.
+        i (float | np.ndarray): inclination (rad).
+        mu (float): gravitational parameter (km^3/s^2).
+        R (float): equatorial radius that J2 is referenced to (km).
+        J2 (float): the J2 zonal harmonic.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: the rates of the right ascension of the ascending node, of the
+            argument of periapsis, and of the mean anomaly, i.e. the perturbed mean motion (rad/s).
+    """
+    n = np.sqrt(mu/np.power(a, 3))
+    p = a * (1 - np.square(e))
+    k = 1.5 * J2 * np.square(R/p) * n
+    sin2_i = np.square(np.sin(i))
+    omega_dot = -k * np.cos(i)
+    w_dot = k * (2 - 2.5 * sin2_i)
+    M_dot = n + k * np.sqrt(1 - np.square(e)) * (1 - 1.5 * sin2_i)
+    return omega_dot, w_dot, M_dot
+
+
+@instrumentation.timed("orbit.propagate")
+def propagate(t: np.ndarray,
+              a: float | np.ndarray,
+              e: float | np.ndarray,
+              i: float | np.ndarray,
+              omega: float | np.ndarray,
+              w: float | np.ndarray,
+              M0: float | np.ndarray = 0.0,
+              mu: float = 398600,
+              n: float | np.ndarray | None = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Propagates Keplerian elements to inertial position and velocity.
+
+    Elements may be arrays, broadcast against t, e.g. shaped (N, 1) for N orbits over a shared time grid. The right
+    ascension, argument of periapsis, and mean anomaly may also vary with time.
+
+    Args:
+        t (np.ndarray): times since the element epoch (sec).
+        a (float | np.ndarray): semi-major axis (km).
+        e (float | np.ndarray): eccentricity.
+        i (float | np.ndarray): inclination (rad).
+        omega (float | np.ndarray): right ascension of the ascending node (rad).
+        w (float | np.ndarray): argument of periapsis (rad).
+        M0 (float | np.ndarray): mean anomaly at the epoch (rad). Defaults to 0, at periapsis.
+        mu (float): gravitational parameter (km^3/s^2). Defaults to Earth's.
+        n (float | np.ndarray | None): mean motion (rad/s). Defaults to None, the two-body mean motion.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: position (km) and velocity (km/s), both (..., 3).
+    """
+    # Mean and eccentric anomaly
+    if n is None:
+        n = np.sqrt(mu/np.power(a, 3))
+    _, sin_E, cos_E = kepler(M0 + n * np.asarray(t, dtype=float), e)
+
+    # Perifocal coordinates, from the eccentric anomaly to avoid computing the true anomaly
+    b = a * np.sqrt(1 - np.square(e))
+    xp = a * (cos_E - e)
+    yp = b * sin_E
+    Edot = n/(1 - e * cos_E)
+    vxp = -a * sin_E * Edot
+    vyp = b * cos_E * Edot
+
+    # Perifocal unit vectors P and Q in the inertial frame
+    cO, sO = np.cos(omega), np.sin(omega)
+    ci, si = np.cos(i), np.sin(i)
+    cw, sw = np.cos(w), np.sin(w)
+    P = (cO * cw - sO * sw * ci, sO * cw + cO * sw * ci, sw * si)
+    Q = (-cO * sw - sO * cw * ci, -sO * sw + cO * cw * ci, cw * si)
+
+    # Rotate into the inertial frame, one preallocated pass per component
+    shape = np.broadcast_shapes(np.shape(xp), *(np.shape(x) for x in P))
+    pos = np.empty(shape + (3,))
+    vel = np.empty(shape + (3,))
+    for k in range(3):
+        pos[..., k] = xp * P[k] + yp * Q[k]
+        vel[..., k] = vxp * P[k] + vyp * Q[k]
+    instrumentation.allocation("orbit.states", pos.nbytes + vel.nbytes, 2)
+
+    return pos, vel
+
+
+def subsatellite(pos: np.ndarray, t: np.ndarray, W: float, theta0: float = 0.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Converts inertial positions to geocentric radius, latitude, and longitude on a rotating planet.
+
+    Args:
+        pos (np.ndarray): inertial positions (..., 3) (km).
+        t (np.ndarray): times of the positions (sec).
+        W (float): the planet's rotation rate (rad/s).
+        theta0 (float): the rotation angle of the prime meridian at t = 0 (rad). Defaults to 0.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: radius (km), latitude, and longitude in [-180, 180) (deg).
+    """
+    x, y, z = pos[..., 0], pos[..., 1], pos[..., 2]
+    r = np.sqrt(x * x + y * y + z * z)
+    lat = np.degrees(np.arcsin(z/r))
+    lon = np.degrees(np.arctan2(y, x) - theta0 - W * np.asarray(t, dtype=float))
+    lon = (lon + 180) % 360 - 180
+    return r, lat, lon
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+"""Vectorized SGP4 propagation of two-line element sets.
+
+Follows the near-Earth branch of the reference implementation in Vallado et al., "Revisiting Spacetrack Report #3"
+(AIAA 2006-6753), evaluated for many satellites and times at once.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from typing import Dict, Tuple
+import numpy as np
+
+# Custom packages
+from pyCubeSat import instrumentation
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat.Orbit')
+
+# WGS-72 constants, which two-line element sets are fit with
+MU = 398600.8  # km^3/s^2
+RE = 6378.135  # Equatorial radius (km)
+XKE = 60.0/np.sqrt(RE**3/MU)  # sqrt(mu) in Earth radii^1.5/min
+J2 = 0.001082616
+J3 = -0.00000253881
+J4 = -0.00000165597
+
+# Orbits with longer periods need the deep-space (SDP4) resonance terms
+DEEP_SPACE_PERIOD = 225.0  # min
+
+
+def sgp4_init(n: np.ndarray,
+              e: np.ndarray,
+              i: np.ndarray,
+              omega: np.ndarray,
+              w: np.ndarray,
+              M: np.ndarray,
+              bstar: np.ndarray) -> Dict[str, np.ndarray]:
+    """Computes the SGP4 constants of element sets, which only depend on the elements and are reused every step.
+
+    Args:
+        n (np.ndarray): Kozai mean motions (rad/min).
+        e (np.ndarray): eccentricities.
+        i (np.ndarray): inclinations (rad).
+        omega (np.ndarray): right ascensions of the ascending node (rad).
+        w (np.ndarray): arguments of periapsis (rad).
+        M (np.ndarray): mean anomalies (rad).
+        bstar (np.ndarray): drag terms (1/Earth radii).
+
+    Returns:
+        Dict[str, np.ndarray]: the elements and propagation constants, each shaped like the elements.
+    """
+    n, e, i, omega, w, M, bstar = (np.asarray(x, dtype=float) for x in np.broadcast_arrays(n, e, i, omega, w, M, bstar))
+
+    # Recover the Brouwer mean motion and semi-major axis from the Kozai mean motion
+    omeosq = 1 - e**2
+    rteosq = np.sqrt(omeosq)
+    cosio = np.cos(i)
+    sinio = np.sin(i)
+    cosio2 = cosio**2
+    ak = (XKE/n)**(2/3)
+    d1 = 0.75 * J2 * (3 * cosio2 - 1)/(rteosq * omeosq)
+    delta = d1/ak**2
+    adel = ak * (1 - delta**2 - delta * (1/3 + 134 * delta**2/81))
+    delta = d1/adel**2
+    no = n/(1 + delta)
+    ao = (XKE/no)**(2/3)
+    po = ao * omeosq
+    con42 = 1 - 5 * cosio2
+    con41 = -con42 - 2 * cosio2
+    x1mth2 = 1 - cosio2
+    x7thm1 = 7 * cosio2 - 1
+    pinvsq = 1/po**2
+    perige = (ao * (1 - e) - 1) * RE
+
+    # Orbits with perigees below 220 km use a truncated drag model
+    isimp = perige < 220
+
+    # Atmospheric density parameters, adjusted for low perigees
+    sfour = np.where(perige < 156, np.where(perige < 98, 20.0, perige - 78), 78.0)
+    qzms24 = ((120 - sfour)/RE)**4
+    sfour = sfour/RE + 1
+
+    # Drag coefficients
+    tsi = 1/(ao - sfour)
+    eta = ao * e * tsi
+    etasq = eta**2
+    eeta = e * eta
+    psisq = np.abs(1 - etasq)
+    coef = qzms24 * tsi**4
+    coef1 = coef/psisq**3.5
+    cc2 = coef1 * no * (ao * (1 + 1.5 * etasq + eeta * (4 + etasq)) +
+                        0.375 * J2 * tsi/psisq * con41 * (8 + 3 * etasq * (8 + etasq)))
+    cc1 = bstar * cc2
+    eccentric = e > 1e-4
+    cc3 = np.where(eccentric, -2 * coef * tsi * (J3/J2) * no * sinio/np.where(eccentric, e, 1), 0.0)
+    cc4 = 2 * no * coef1 * ao * omeosq * (
+        eta * (2 + 0.5 * etasq) + e * (0.5 + 2 * etasq) - J2 * tsi/(ao * psisq) * (
+            -3 * con41 * (1 - 2 * eeta + etasq * (1.5 - 0.5 * eeta)) +
+            0.75 * x1mth2 * (2 * etasq - eeta * (1 + etasq)) * np.cos(2 * w)))
+    cc5 = 2 * coef1 * ao * omeosq * (1 + 2.75 * (etasq + eeta) + eeta * etasq)
+
+    # Secular rates from J2 and J4
+    temp1 = 1.5 * J2 * pinvsq * no
+    temp2 = 0.5 * temp1 * J2 * pinvsq
+    temp3 = -0.46875 * J4 * pinvsq**2 * no
+    cosio4 = cosio2**2
+    mdot = no + 0.5 * temp1 * rteosq * con41 + 0.0625 * temp2 * rteosq * (13 - 78 * cosio2 + 137 * cosio4)
+    argpdot = (-0.5 * temp1 * con42 + 0.0625 * temp2 * (7 - 114 * cosio2 + 395 * cosio4) +
+               temp3 * (3 - 36 * cosio2 + 49 * cosio4))
+    xhdot1 = -temp1 * cosio
+    nodedot = xhdot1 + (0.5 * temp2 * (4 - 19 * cosio2) + 2 * temp3 * (3 - 7 * cosio2)) * cosio
+
+    # Long period and drag coefficients
+    omgcof = bstar * cc3 * np.cos(w)
+    xmcof = np.where(eccentric, -(2/3) * coef * bstar/np.where(eccentric, eeta, 1), 0.0)
+    nodecf = 3.5 * omeosq * xhdot1 * cc1
+    t2cof = 1.5 * cc1
+    xlcof = -0.25 * (J3/J2) * sinio * (3 + 5 * cosio)/np.where(np.abs(cosio + 1) > 1.5e-12, 1 + cosio, 1.5e-12)
+    aycof = -0.5 * (J3/J2) * sinio
+    delmo = (1 + eta * np.cos(M))**3
+    sinmao = np.sin(M)
+
+    # Higher order drag terms, dropped for low perigees
+    cc1sq = cc1**2
+    d2 = np.where(isimp, 0.0, 4 * ao * tsi * cc1sq)
+    temp = d2 * tsi * cc1/3
+    d3 = (17 * ao + sfour) * temp
+    d4 = 0.5 * temp * ao * tsi * (221 * ao + 31 * sfour) * cc1
+    t3cof = d2 + 2 * cc1sq
+    t4cof = 0.25 * (3 * d3 + cc1 * (12 * d2 + 10 * cc1sq))
+    t5cof = 0.2 * (3 * d4 + 12 * cc1 * d3 + 6 * d2**2 + 15 * cc1sq * (2 * d2 + cc1sq))
+    t3cof, t4cof, t5cof = (np.where(isimp, 0.0, x) for x in (t3cof, t4cof, t5cof))
+
+    # Deep space orbits are not supported
+    deep = 2 * np.pi/no >= DEEP_SPACE_PERIOD
+    if np.any(deep):
+        log.warning(f"{np.count_nonzero(deep)} deep-space element sets are not supported and will propagate to NaN")
+
+    return {
+        'no': no, 'e': e, 'i': i, 'omega': omega, 'w': w, 'M': M, 'bstar': bstar, 'isimp': isimp, 'deep': deep,
+        'cosio': cosio, 'sinio': sinio, 'con41': con41, 'x1mth2': x1mth2, 'x7thm1': x7thm1, 'eta': eta,
+        'cc1': cc1, 'cc4': cc4, 'cc5': cc5, 'd2': d2, 'd3': d3, 'd4': d4, 'delmo': delmo, 'sinmao': sinmao,
+        'mdot': mdot, 'argpdot': argpdot, 'nodedot': nodedot, 'omgcof': omgcof, 'xmcof': xmcof, 'nodecf': nodecf,
+        't2cof': t2cof, 't3cof': t3cof, 't4cof': t4cof, 't5cof': t5cof, 'xlcof': xlcof, 'aycof': aycof,
+    }
+
+
+@instrumentation.timed("orbit.sgp4")
+def sgp4(c: Dict[str, np.ndarray], t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Propagates element sets with SGP4 to TEME position and velocity.
+
+    Constants may be arrays broadcast against t, e.g. shaped (N, 1) for N satellites over a shared time grid. Samples
+    where the satellite has decayed or the elements are invalid are NaN.
+
+    Args:
+        c (Dict[str, np.ndarray]): the constants from sgp4_init.
+        t (np.ndarray): times since the element epoch (sec).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: position (km) and velocity (km/s), both (..., 3).
+    """
+    t = np.asarray(t, dtype=float)/60
+    t2 = t**2
+    t3 = t2 * t
+    t4 = t3 * t
+
+    # Secular gravity and atmospheric drag
+    xmdf = c['M'] + c['mdot'] * t
+    argpdf = c['w'] + c['argpdot'] * t
+    nodem = c['omega'] + c['nodedot'] * t + c['nodecf'] * t2
+    delm = c['xmcof'] * ((1 + c['eta'] * np.cos(xmdf))**3 - c['delmo'])
+    temp = np.where(c['isimp'], 0.0, c['omgcof'] * t + delm)
+    mm = xmdf + temp
+    argpm = argpdf - temp
+    tempa = 1 - c['cc1'] * t - c['d2'] * t2 - c['d3'] * t3 - c['d4'] * t4
+    tempe = c['bstar'] * c['cc4'] * t + np.where(c['isimp'], 0.0, c['bstar'] * c['cc5'] * (np.sin(mm) - c['sinmao']))
+    templ = c['t2cof'] * t2 + c['t3cof'] * t3 + t4 * (c['t4cof'] + t * c['t5cof'])
+    am = (XKE/c['no'])**(2/3) * tempa**2
+    nm = XKE/am**1.5
+    em = c['e'] - tempe
+    invalid = (em >= 1) | (em < -0.001) | c['deep']
+    em = np.clip(em, 1e-6, None)
+    mm = mm + c['no'] * templ
+
+    # Long period periodics
+    axnl = em * np.cos(argpm)
+    temp = 1/(am * (1 - em**2))
+    aynl = em * np.sin(argpm) + temp * c['aycof']
+    u = (mm + argpm + temp * c['xlcof'] * axnl) % (2 * np.pi)
+
+    # Solve Kepler's equation for the eccentric longitude, limiting steps for convergence
+    eo1 = u.copy()
+    for _ in range(10):
+        sineo1 = np.sin(eo1)
+        coseo1 = np.cos(eo1)
+        tem5 = (u - aynl * coseo1 + axnl * sineo1 - eo1)/(1 - coseo1 * axnl - sineo1 * aynl)
+        tem5 = np.clip(tem5, -0.95, 0.95)
+        eo1 += tem5
+        if np.max(np.abs(tem5), initial=0) < 1e-12:
+            break
+    sineo1 = np.sin(eo1)
+    coseo1 = np.cos(eo1)
+
+    # Short period preliminary quantities
+    ecose = axnl * coseo1 + aynl * sineo1
+    esine = axnl * sineo1 - aynl * coseo1
+    el2 = axnl**2 + aynl**2
+    pl = am * (1 - el2)
+    invalid |= pl < 0
+    el2 = np.where(pl < 0, np.nan, el2)
+    pl = np.where(pl < 0, np.nan, pl)
+    rl = am * (1 - ecose)
+    rdotl = np.sqrt(am) * esine/rl
+    rvdotl = np.sqrt(pl)/rl
+    betal = np.sqrt(1 - el2)
+    temp = esine/(1 + betal)
+    sinu = am/rl * (sineo1 - aynl - axnl * temp)
+    cosu = am/rl * (coseo1 - axnl + aynl * temp)
+    su = np.arctan2(sinu, cosu)
+    sin2u = 2 * cosu * sinu
+    cos2u = 1 - 2 * sinu**2
+    temp = 1/pl
+    temp1 = 0.5 * J2 * temp
+    temp2 = temp1 * temp
+
+    # Short period periodics
+    mrt = rl * (1 - 1.5 * temp2 * betal * c['con41']) + 0.5 * temp1 * c['x1mth2'] * cos2u
+    su = su - 0.25 * temp2 * c['x7thm1'] * sin2u
+    xnode = nodem + 1.5 * temp2 * c['cosio'] * sin2u
+    xinc = c['i'] + 1.5 * temp2 * c['cosio'] * c['sinio'] * cos2u
+    mvt = rdotl - nm * temp1 * c['x1mth2'] * sin2u/XKE
+    rvdot = rvdotl + nm * temp1 * (c['x1mth2'] * cos2u + 1.5 * c['con41'])/XKE
+    invalid |= mrt < 1
+
+    # Orientation vectors
+    sinsu, cossu = np.sin(su), np.cos(su)
+    snod, cnod = np.sin(xnode), np.cos(xnode)
+    sini, cosi = np.sin(xinc), np.cos(xinc)
+    xmx = -snod * cosi
+    xmy = cnod * cosi
+    U = (xmx * sinsu + cnod * cossu, xmy * sinsu + snod * cossu, sini * sinsu)
+    V = (xmx * cossu - cnod * sinsu, xmy * cossu - snod * sinsu, sini * cossu)
+
+    # Position and velocity, one preallocated pass per component
+    mrt = np.where(invalid, np.nan, mrt) * RE
+    vkm = RE * XKE/60
+    mvt = mvt * vkm
+    rvdot = rvdot * vkm
+    pos = np.empty(mrt.shape + (3,))
+    vel = np.empty(mrt.shape + (3,))
+    for k in range(3):
+        pos[..., k] = mrt * U[k]
+        vel[..., k] = mvt * U[k] + rvdot * V[k]
+    vel[invalid] = np.nan
+    instrumentation.allocation("orbit.states", pos.nbytes + vel.nbytes, 2)
+
+    return pos, vel
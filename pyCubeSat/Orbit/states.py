@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""Generates orbital state ephemerides over UTC intervals.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from datetime import datetime
+from typing import TYPE_CHECKING
+import numpy as np
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Custom packages
+from pyCubeSat.Orbit.earth import EarthOrbit
+from pyCubeSat.math.frames import utc
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat.Orbit')
+
+
+def get_orbital_states(start_datetime: datetime,
+                       end_datetime: datetime,
+                       Aa: float = 419,
+                       Ap: float = 418,
+                       e: float | None = None,
+                       i: float = 51.6433,
+                       Ω: float = 115.2267,
+                       ω: float = 223.6999,
+                       *,
+                       step: float = 60.0,
+                       j2: bool = True) -> 'pd.DataFrame':
+    """Generates the inertial position and velocity of an orbit over the time specified.
+
+    The positional arguments match the STK Engine export this replaces. The satellite passes periapsis at the start.
+    Altitudes are above the volumetric mean radius, as in EarthOrbit.
+
+    Args:
+        start_datetime (datetime): simulation start datetime (UTC).
+        end_datetime (datetime): simulation end datetime (UTC), included if it falls on a step.
+        Aa (float): altitude of apoapsis (km). Defaults to 419 km.
+        Ap (float): altitude of periapsis (km). Defaults to 418 km.
+        e (float | None): eccentricity of the orbit, only checked against the altitudes, which set the orbit.
+            Defaults to None.
+        i (float): inclination of the orbit (deg). Defaults to 51.6433°.
+        Ω (float): right ascension of the ascending node (deg). Defaults to 115.2267°.
+        ω (float): argument of periapsis (deg). Defaults to 223.6999°.
+        step (float): the time between states (sec). Defaults to 60.
+        j2 (bool): whether to propagate the secular J2 drift. Defaults to True.
+
+    Raises:
+        ValueError: if the interval or step is empty, the apoapsis is below the periapsis, or the apoapsis that the
+            periapsis and eccentricity give is more than 1 km from Aa.
+
+    Returns:
+        pd.DataFrame(index=[], columns=["time", "sec", "x", "y", "z", "vx", "vy", "vz"]): the UTC time, seconds since
+            the start, ECI position (km), and ECI velocity (km/s) of each state.
+    """
+    # Check arguments
+    duration = (end_datetime - start_datetime).total_seconds()
+    if duration < 0 or step <= 0:
+        raise ValueError(f"Cannot step {step} sec from {start_datetime} to {end_datetime}")
+    if Aa < Ap:
+        raise ValueError(f"Apoapsis altitude {Aa} km is below the periapsis altitude {Ap} km")
+    if e is not None and (not 0 <= e < 1 or abs((Ap + EarthOrbit.R) * (1 + e)/(1 - e) - EarthOrbit.R - Aa) > 1):
+        raise ValueError(f"Eccentricity {e} does not match the apoapsis and periapsis altitudes {Aa} and {Ap} km")
+
+    # Log
+    log.info(f"Generating orbital states from {start_datetime} to {end_datetime}")
+
+    # Create orbit
+    za = Aa + EarthOrbit.R
+    zp = Ap + EarthOrbit.R
+    orbit = EarthOrbit(Ap=Ap, e=(za - zp)/(za + zp), i=i, omega=Ω, w=ω, j2=j2)
+
+    # Make time array, with a small tolerance so an end on a step is kept
+    t = np.arange(int(np.floor(duration/step * (1 + 1e-12))) + 1) * step
+    pos, vel = orbit.propagate(t)
+
+    # Create dataframe of states
+    import pandas as pd
+    time = np.datetime64(utc(start_datetime), 'us') + np.round(t * 1e6).astype('timedelta64[us]')
+    return pd.DataFrame({
+        'time': time, 'sec': t,
+        'x': pos[:, 0], 'y': pos[:, 1], 'z': pos[:, 2],
+        'vx': vel[:, 0], 'vy': vel[:, 1], 'vz': vel[:, 2],
+    })
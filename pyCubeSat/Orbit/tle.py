@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""Parses two-line element sets and catalogs of them.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, Tuple
+import numpy as np
+
+# Custom packages
+from pyCubeSat.math.frames import JD_UNIX, utc
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat.Orbit')
+
+# Element set fields, in catalog order
+FIELDS = ("satnum", "epoch", "bstar", "i", "omega", "e", "w", "M", "n")
+
+
+def _checksum(line: str) -> int:
+    """Computes the modulo 10 checksum of a TLE line, where minus signs count as 1."""
+    return sum(int(c) if c.isdigit() else c == '-' for c in line[:68]) % 10
+
+
+def _decimal(field: str) -> float:
+    """Parses a field with an assumed leading decimal point and an exponent, e.g. " 12345-4" = 0.12345e-4."""
+    field = field.strip().replace(' ', '')
+    if not field:
+        return 0.0
+    sign = -1.0 if field[0] == '-' else 1.0
+    field = field.lstrip('+-')
+    return sign * float('.' + field[:-2]) * 10**int(field[-2:])
+
+
+def _satnum(field: str) -> float:
+    """Parses a catalog number, including the Alpha-5 scheme where a leading letter counts from 10, skipping I and O."""
+    field = field.strip()
+    if field[:1].isalpha():
+        return float((ord(field[0].upper()) - ord('A') + 10 - (field[0].upper() > 'I') - (field[0].upper() > 'O')) *
+                     10000 + int(field[1:]))
+    return float(field)
+
+
+def parse_tle(line1: str, line2: str) -> Dict[str, float]:
+    """Parses a two-line element set.
+
+    Args:
+        line1 (str): the first line.
+        line2 (str): the second line.
+
+    Raises:
+        ValueError: if the lines are malformed or fail their checksums.
+
+    Returns:
+        Dict[str, float]: the catalog number, epoch as a Julian date, drag term (1/Earth radii), inclination, right
+            ascension of the ascending node, argument of periapsis, and mean anomaly (rad), eccentricity, and mean
+            motion (rad/min).
+    """
+    line1, line2 = line1.rstrip(), line2.rstrip()
+    if len(line1) < 69 or len(line2) < 69 or line1[0] != '1' or line2[0] != '2':
+        raise ValueError("Malformed two-line element set")
+    for line in (line1, line2):
+        if line[68].isdigit() and _checksum(line) != int(line[68]):
+            raise ValueError(f"Checksum failed for line {line[0]} of satellite {line1[2:7].strip()}")
+
+    # Epoch, as year and fractional day of year
+    year = int(line1[18:20])
+    year += 2000 if year < 57 else 1900
+    day = float(line1[20:32])
+    epoch = (datetime(year, 1, 1) - datetime(1970, 1, 1)).days + JD_UNIX + day - 1
+
+    return {
+        'satnum': _satnum(line1[2:7]),
+        'epoch': epoch,
+        'bstar': _decimal(line1[53:61]),
+        'i': np.radians(float(line2[8:16])),
+        'omega': np.radians(float(line2[17:25])),
+        'e': float('.' + line2[26:33].strip()),
+        'w': np.radians(float(line2[34:42])),
+        'M': np.radians(float(line2[43:51])),
+        'n': float(line2[52:63]) * 2 * np.pi/(24 * 60),
+    }
+
+
+def read_tle(lines: Iterable[str]) -> Iterator[Tuple[str, str, str]]:
+    """Streams element sets from two or three line (named) catalog text.
+
+    Args:
+        lines (Iterable[str]): the catalog lines, e.g. an open file.
+
+    Yields:
+        Tuple[str, str, str]: the name (empty for two line sets), first line, and second line.
+    """
+    name = ''
+    line1 = None
+    for line in lines:
+        line = line.rstrip()
+        if not line:
+            continue
+        if line.startswith('1 ') and line1 is None:
+            line1 = line
+        elif line.startswith('2 ') and line1 is not None:
+            yield name, line1, line
+            name = ''
+            line1 = None
+        else:
+            name = line[2:].strip() if line.startswith('0 ') else line.strip()
+            line1 = None
+
+
+def to_datetime(jd: float) -> datetime:
+    """Converts a Julian date to a datetime."""
+    return datetime(1970, 1, 1) + timedelta(days=float(jd) - JD_UNIX)
+
+
+def to_jd(date: datetime) -> float:
+    """Converts a datetime, naive in UTC or timezone-aware, to a Julian date."""
+    return (utc(date) - datetime(1970, 1, 1))/timedelta(days=1) + JD_UNIX
+
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""Columnar ground track results
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from typing import Iterable, Iterator, Mapping
+import numpy as np
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat.Orbit')
+
+
+class GroundTrack():
+    """Ground track samples, held as contiguous arrays.
+
+    Fields are also readable by name, e.g. track['lat'], so a ground track can be used wherever a mapping of
+    columns is expected.
+    """
+    __slots__ = ('sec', 'r', 'lat', 'lon')
+    FIELDS = __slots__
+
+    def __init__(self, sec: np.ndarray, r: np.ndarray, lat: np.ndarray, lon: np.ndarray):
+        """Wraps the sample arrays, without copying them if they are already contiguous floats.
+
+        Args:
+            sec (np.ndarray): times of the samples (sec).
+            r (np.ndarray): radii (km).
+            lat (np.ndarray): latitudes (deg).
+            lon (np.ndarray): longitudes, in [-180, 180] (deg).
+
+        Raises:
+            ValueError: if the arrays differ in length.
+        """
+        self.sec = np.ascontiguousarray(sec, dtype=float)
+        self.r = np.ascontiguousarray(r, dtype=float)
+        self.lat = np.ascontiguousarray(lat, dtype=float)
+        self.lon = np.ascontiguousarray(lon, dtype=float)
+        if not len(self.sec) == len(self.r) == len(self.lat) == len(self.lon):
+            raise ValueError("Ground track arrays must have the same length")
+
+    @classmethod
+    def concatenate(cls, chunks: Iterable[Mapping[str, np.ndarray]]) -> 'GroundTrack':
+        """Joins ground track chunks, e.g. from Orbit.iter_ground_track.
+
+        Args:
+            chunks (Iterable[Mapping[str, np.ndarray]]): ground tracks, or mappings with the same fields.
+
+        Returns:
+            GroundTrack: the joined ground track.
+        """
+        columns = {key: [] for key in cls.FIELDS}
+        for chunk in chunks:
+            for key, values in columns.items():
+                values.append(np.asarray(chunk[key], dtype=float))
+        return cls(*(np.concatenate(values) if values else np.empty(0) for values in columns.values()))
+
+    def decimate(self, n: int) -> 'GroundTrack':
+        """Downsamples the ground track to about n samples, keeping its shape.
+
+        The track is split at each antimeridian crossing, and each pass is decimated with the largest-triangle-three-
+        buckets method in (lon, lat), which keeps the samples where the track bends. The first and last samples of
+        every pass are kept, so the crossings stay where they were.
+
+        Args:
+            n (int): the number of samples to keep. At least two per pass are always kept.
+
+        Returns:
+            GroundTrack: the kept samples, in time order.
+
+        Raises:
+            ValueError: if n is less than 2.
+        """
+        if n < 2:
+            raise ValueError("Must keep at least 2 samples")
+        num = len(self)
+        if num <= n:
+            return self
+
+        # Passes between antimeridian crossings, with their share of the samples
+        edges = np.concatenate(([0], np.flatnonzero(np.abs(np.diff(self.lon)) > 180) + 1, [num]))
+        sizes = np.diff(edges)
+        keep = np.minimum(np.maximum(np.floor(n * sizes/num).astype(int), 2), sizes)
+
+        # Decimate each pass
+        index = np.concatenate([start + _lttb(self.lon[start:stop], self.lat[start:stop], k)
+                                for start, stop, k in zip(edges[:-1], edges[1:], keep)])
+        return type(self)(*(getattr(self, key)[index] for key in self.FIELDS))
+
+    def to_pandas(self, **columns: np.ndarray):
+        """Builds a dataframe of the ground track.
+
+        Args:
+            **columns (np.ndarray): extra columns to append, e.g. fields evaluated along the track.
+
+        Returns:
+            pd.DataFrame(index=[], columns=["sec", "r", "lat", "lon", ...]): the ground track.
+        """
+        import pandas as pd
+        return pd.DataFrame({**self, **columns})
+
+    def keys(self) -> tuple:
+        return self.FIELDS
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.sec)
+
+    def __repr__(self) -> str:
+        return f"GroundTrack({len(self)} samples)"
+
+
+def _lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """Picks n points of a path with the largest-triangle-three-buckets method.
+
+    Args:
+        x (np.ndarray): x coordinates of the path.
+        y (np.ndarray): y coordinates of the path.
+        n (int): the number of points to pick, at least 2.
+
+    Returns:
+        np.ndarray: indices of the picked points, including the first and last.
+    """
+    num = len(x)
+    if n >= num:
+        return np.arange(num)
+    if n == 2:
+        return np.array([0, num - 1])
+
+    # Interior points split into n - 2 buckets, with the mean of each and the last point after them
+    edges = np.linspace(1, num - 1, n - 1).astype(int)
+    sizes = np.diff(edges)
+    mean_x = np.append(np.add.reduceat(x[1:-1], edges[:-1] - 1)/sizes, x[-1])
+    mean_y = np.append(np.add.reduceat(y[1:-1], edges[:-1] - 1)/sizes, y[-1])
+
+    # Each bucket keeps the point making the largest triangle with the last kept point and the next bucket's mean
+    index = np.empty(n, dtype=int)
+    index[0], index[-1] = 0, num - 1
+    a = 0
+    for j in range(n - 2):
+        lo, hi = edges[j], edges[j + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((x[lo:hi] - ax) * (mean_y[j + 1] - ay) - (mean_x[j + 1] - ax) * (y[lo:hi] - ay))
+        a = lo + int(np.argmax(area))
+        index[j + 1] = a
+    return index
@@ -1,6 +1,12 @@
 """PMACS dynamics
 """
 
-# __all__
-from .dynamics import dynamics
-__all__ = [dynamics]
\ No newline at end of file
+# __all__, imported on first use
+from pyCubeSat._lazy import lazy
+_exports = {
+    'Dynamics': ".dynamics",
+    'OrbitField': ".dynamics",
+    'Ensemble': ".ensemble",
+}
+__getattr__, __dir__ = lazy(__name__, _exports)
+__all__ = list(_exports)
\ No newline at end of file
@@ -1,5 +1,9 @@
 #!/usr/bin/env python
-"""Computes the International Geomagnetic Reference Field 13, valid between 1900-01-01 and 2025-12-31.
+"""Simulates the rigid-body attitude dynamics of a passively magnetically stabilized CubeSat.
+
+The state is the body-to-inertial quaternion (scalar first), the body angular velocity, and the flux density of each
+hysteresis rod. A permanent magnet aligns the satellite with the geomagnetic field, and the hysteresis rods damp its
+rotation following the Flatley-Henretty model.
 """
 __author__ = "Justin Panchula"
 __copyright__ = "Copyright 2024 UC CubeCats"
@@ -11,7 +15,474 @@ __maintainer__ = None
 __contact__ = None
 
 # Imports
+import math
+from datetime import datetime
+from typing import Dict, Tuple
+import numpy as np
+
+# Custom packages
+from pyCubeSat import instrumentation
+from pyCubeSat.Orbit import Orbit
+from pyCubeSat.PMACS.IGRF.igrf import igrf_field
 
 # Logging
 import logging
-log = logging.getLogger('pyCubeSat.PMACS.Dynamics')
\ No newline at end of file
+log = logging.getLogger('pyCubeSat.PMACS.Dynamics')
+
+# Permeability of free space (H/m)
+MU0 = 4e-7 * np.pi
+
+# Dormand-Prince 5(4) tableau, error weights, and dense output coefficients
+DP_C = (0, 1/5, 3/10, 4/5, 8/9, 1)
+DP_A = ((),
+        (1/5,),
+        (3/40, 9/40),
+        (44/45, -56/15, 32/9),
+        (19372/6561, -25360/2187, 64448/6561, -212/729),
+        (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656))
+DP_B = (35/384, 0, 500/1113, 125/192, -2187/6784, 11/84)
+DP_E = (71/57600, 0, -71/16695, 71/1920, -17253/339200, 22/525, -1/40)
+DP_P = np.array([
+    [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+    [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+    [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+    [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0, 40617522/29380423, -110615467/29380423, 69997945/29380423]])
+
+
+class OrbitField():
+    """IGRF-13 geomagnetic field along an orbit in the inertial frame, tabulated for fast lookup"""
+    def __init__(self, orbit: Orbit, t: float | datetime, days: float, step: float = 10.0):
+        """Evaluates the field along the orbit and fits a C1 cubic between the samples.
+
+        Args:
+            orbit (Orbit): the orbit.
+            t (float | datetime): the decimal year or date at the start of the orbit.
+            days (float): the number of days to tabulate.
+            step (float): the time between samples (sec). Defaults to 10.
+        """
+        # Log
+        log.info("Tabulating geomagnetic field along the orbit")
+
+        # Propagate, with a sample past each end for the slopes
+        with instrumentation.stage("dynamics.field_table"):
+            sec = np.arange(-1, int(np.ceil(days * 24 * 60 * 60/step)) + 2) * step
+            pos, _ = orbit.propagate(sec)
+            r = np.linalg.norm(pos, axis=-1)
+            colat = np.arccos(pos[:, 2]/r)
+            ra = np.arctan2(pos[:, 1], pos[:, 0])
+            _, Br, Bt, Bp = igrf_field(r, colat, ra - orbit.theta0 - orbit.W * sec, sec, epoch=t)
+
+        # Rotate the local spherical components into the inertial frame (T)
+        st, ct = np.sin(colat), np.cos(colat)
+        sa, ca = np.sin(ra), np.cos(ra)
+        b = 1e-9 * np.stack((Br * st * ca + Bt * ct * ca - Bp * sa,
+                             Br * st * sa + Bt * ct * sa + Bp * ca,
+                             Br * ct - Bt * st), axis=1)
+
+        # Cubic Hermite coefficients per interval, from central difference slopes
+        m = (b[2:] - b[:-2])/2
+        y0, y1, m0, m1 = b[1:-2], b[2:-1], m[:-1], m[1:]
+        self._coef = np.stack((y0, m0, 3 * (y1 - y0) - 2 * m0 - m1, 2 * (y0 - y1) + m0 + m1), axis=1)
+        self._step = step
+        self._span = (len(sec) - 3) * step
+
+        # Python floats per interval, for the scalar lookups of the integrators
+        self._table = self._coef.reshape(len(self._coef), 12).tolist()
+
+    def __getstate__(self) -> dict:
+        # Pickle the coefficients only, the float table is rebuilt
+        return {key: value for key, value in self.__dict__.items() if key != '_table'}
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._table = self._coef.reshape(len(self._coef), 12).tolist()
+
+    def __call__(self, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Interpolates the field.
+
+        Args:
+            t (np.ndarray): times since the start of the orbit (sec).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: the inertial field (T) and its rate of change (T/s), both (..., 3).
+        """
+        t = np.asarray(t, dtype=float)
+        k = np.clip((t//self._step).astype(int), 0, len(self._coef) - 1)
+        s = (t/self._step - k)[..., None]
+        c = self._coef[k]
+        b = c[..., 0, :] + s * (c[..., 1, :] + s * (c[..., 2, :] + s * c[..., 3, :]))
+        db = (c[..., 1, :] + s * (2 * c[..., 2, :] + 3 * s * c[..., 3, :]))/self._step
+        return b, db
+
+    def lookup(self, t: float) -> Tuple[float, float, float, float, float, float]:
+        """Interpolates the field at a single time, as Python floats.
+
+        Args:
+            t (float): time since the start of the orbit (sec).
+
+        Returns:
+            Tuple[float, float, float, float, float, float]: the inertial field (T) and its rate of change (T/s).
+        """
+        x = t/self._step
+        k = min(max(int(x), 0), len(self._table) - 1)
+        s = x - k
+        a0, a1, a2, b0, b1, b2, c0, c1, c2, d0, d1, d2 = self._table[k]
+        h = 1/self._step
+        return (a0 + s * (b0 + s * (c0 + s * d0)),
+                a1 + s * (b1 + s * (c1 + s * d1)),
+                a2 + s * (b2 + s * (c2 + s * d2)),
+                (b0 + s * (2 * c0 + 3 * s * d0)) * h,
+                (b1 + s * (2 * c1 + 3 * s * d1)) * h,
+                (b2 + s * (2 * c2 + 3 * s * d2)) * h)
+
+    # Properties
+    @property
+    def step(self) -> float:
+        """Time between field samples (sec)"""
+        return self._step
+
+    @property
+    def span(self) -> float:
+        """Time span of the table (sec)"""
+        return self._span
+
+
+class Dynamics():
+    """Passive magnetic attitude dynamics of a rigid CubeSat"""
+    def __init__(self,
+                 field: OrbitField,
+                 inertia: Tuple[float, float, float] = (0.0108, 0.0108, 0.0022),
+                 magnet: Tuple[float, float, float] = (0.0, 0.0, 0.3),
+                 rods: Tuple[Tuple[float, float, float], ...] = ((1.0, 0.0, 0.0), (0.0, 1.0, 0.0)),
+                 rod_volume: float = 7.85e-8,
+                 Hc: float = 1.59,
+                 Br: float = 0.35,
+                 Bs: float = 0.73):
+        """Sets the satellite's mass and magnetic properties, defaulting to a 2U CubeSat with HyMu-80 rods.
+
+        Args:
+            field (OrbitField): the geomagnetic field along the orbit.
+            inertia (Tuple[float, float, float]): principal moments of inertia (kg m^2).
+            magnet (Tuple[float, float, float]): permanent magnet dipole in the body frame (A m^2).
+            rods (Tuple[Tuple[float, float, float], ...]): axes of the hysteresis rods in the body frame.
+            rod_volume (float): volume of each hysteresis rod (m^3).
+            Hc (float): rod coercivity (A/m).
+            Br (float): rod remanence (T).
+            Bs (float): rod saturation flux density (T).
+        """
+        # Check arguments
+        if min(inertia) <= 0:
+            raise ValueError(f"Moments of inertia must be positive, got {inertia}")
+        if not Hc > 0 or not 0 < Br < Bs:
+            raise ValueError(f"Invalid hysteresis parameters Hc={Hc}, Br={Br}, Bs={Bs}")
+
+        self._field = field
+        self._inertia = tuple(float(x) for x in inertia)
+        self._magnet = tuple(float(x) for x in magnet)
+        self._rods = tuple(tuple(float(x) for x in np.asarray(u)/np.linalg.norm(u)) for u in rods)
+        self._rod_volume = rod_volume
+        self._Hc = Hc
+        self._Br = Br
+        self._Bs = Bs
+
+        # Slope of the limiting hysteresis loop
+        self._k = math.tan(math.pi * Br/(2 * Bs))/Hc
+
+    def initial_state(self, q: Tuple[float, float, float, float] = (1.0, 0.0, 0.0, 0.0),
+                      w: Tuple[float, float, float] = (0.1, 0.1, 0.1)) -> np.ndarray:
+        """Builds a state vector, with each rod on the ascending branch of its limiting loop.
+
+        Args:
+            q (Tuple[float, float, float, float]): body-to-inertial quaternion, scalar first.
+            w (Tuple[float, float, float]): body angular velocity (rad/s).
+
+        Returns:
+            np.ndarray: the state vector.
+        """
+        q = np.asarray(q, dtype=float)/np.linalg.norm(q)
+        bx, by, bz, _, _, _ = self._field.lookup(0.0)
+        Bb = _to_body(q, bx, by, bz)
+        rods = [2 * self._Bs/np.pi * np.arctan(self._k * (np.dot(u, Bb)/MU0 - self._Hc)) for u in self._rods]
+        return np.concatenate((q, np.asarray(w, dtype=float), rods))
+
+    def derivative(self, t: float, y: list) -> list:
+        """Computes the state derivative.
+
+        Args:
+            t (float): time since the start of the orbit (sec).
+            y (list): the state.
+
+        Returns:
+            list: the state derivative.
+        """
+        return _derivative(y, self._field.lookup(t), self._inertia, self._magnet, self._rods, self._rod_volume,
+                           self._Hc, self._Bs, self._k, math)
+
+    def simulate(self,
+                 duration: float,
+                 y0: np.ndarray | None = None,
+                 dt: float = 0.1,
+                 method: str = "rk4",
+                 output_step: float | None = None,
+                 rtol: float = 1e-6,
+                 atol: float = 1e-9,
+                 max_step: float = 60.0) -> Dict[str, np.ndarray]:
+        """Integrates the attitude dynamics into preallocated state arrays.
+
+        Args:
+            duration (float): the simulated time (sec), within the field table.
+            y0 (np.ndarray | None): the initial state, e.g. from initial_state. Defaults to None, its defaults.
+            dt (float): the RK4 step, or the initial RK45 step (sec). Defaults to 0.1.
+            method (str): "rk4" for fixed steps, or "rk45" for adaptive Dormand-Prince steps with dense output.
+                Defaults to "rk4".
+            output_step (float | None): the time between stored states (sec), a multiple of dt for RK4. Defaults to
+                None, every dt.
+            rtol (float): the RK45 relative tolerance. Defaults to 1e-6.
+            atol (float): the RK45 absolute tolerance. Defaults to 1e-9.
+            max_step (float): the largest RK45 step (sec). Defaults to 60.
+
+        Raises:
+            ValueError: if the method is unknown or the duration exceeds the field table.
+
+        Returns:
+            Dict[str, np.ndarray]: the times "t" (sec), quaternions "q" (N, 4), angular velocities "w" (N, 3) (rad/s),
+                and rod flux densities "B" (N, rods) (T).
+        """
+        # Check arguments
+        if duration > self._field.span + 1e-9:
+            raise ValueError(f"Duration {duration} sec exceeds the {self._field.span} sec field table")
+        if output_step is None:
+            output_step = dt
+
+        # Preallocate states
+        y0 = self.initial_state() if y0 is None else np.asarray(y0, dtype=float)
+        num = int(np.floor(duration/output_step + 1e-9)) + 1
+        t = np.arange(num) * output_step
+        Y = np.empty((num, len(y0)))
+        Y[0] = y0
+        instrumentation.allocation("dynamics.states", Y.nbytes)
+
+        # Integrate
+        log.info(f"Simulating {duration} sec of attitude dynamics with {method.upper()}")
+        with instrumentation.stage(f"dynamics.{method}"):
+            if method == "rk4":
+                self._rk4(Y, dt, max(int(round(output_step/dt)), 1))
+            elif method == "rk45":
+                self._rk45(Y, t, dt, rtol, atol, max_step)
+            else:
+                raise ValueError(f"Unknown method \"{method}\"")
+
+        return {'t': t, 'q': Y[:, :4], 'w': Y[:, 4:7], 'B': Y[:, 7:]}
+
+    def _rk4(self, Y: np.ndarray, dt: float, stride: int):
+        """Fixed-step classical Runge-Kutta, storing every stride steps into Y.
+
+        Args:
+            Y (np.ndarray): the preallocated states, with the initial state in the first row.
+            dt (float): the step (sec).
+            stride (int): the number of steps between stored states.
+        """
+        f = self.derivative
+        y = Y[0].tolist()
+        half = dt/2
+        sixth = dt/6
+        t = 0.0
+        for row in range(1, len(Y)):
+            for _ in range(stride):
+                k1 = f(t, y)
+                k2 = f(t + half, [a + half * b for a, b in zip(y, k1)])
+                k3 = f(t + half, [a + half * b for a, b in zip(y, k2)])
+                k4 = f(t + dt, [a + dt * b for a, b in zip(y, k3)])
+                y = [a + sixth * (b1 + 2 * (b2 + b3) + b4) for a, b1, b2, b3, b4 in zip(y, k1, k2, k3, k4)]
+                t += dt
+                _normalize(y)
+            Y[row] = y
+        instrumentation.count("dynamics.steps", (len(Y) - 1) * stride)
+        instrumentation.count("dynamics.derivatives", 4 * (len(Y) - 1) * stride)
+
+    def _rk45(self, Y: np.ndarray, t_out: np.ndarray, dt: float, rtol: float, atol: float, max_step: float):
+        """Adaptive Dormand-Prince 5(4), storing states at the output times from its dense output.
+
+        Args:
+            Y (np.ndarray): the preallocated states, with the initial state in the first row.
+            t_out (np.ndarray): the output times (sec).
+            dt (float): the initial step (sec).
+            rtol (float): the relative tolerance.
+            atol (float): the absolute tolerance.
+            max_step (float): the largest step (sec).
+        """
+        f = self.derivative
+        y = Y[0].tolist()
+        t = 0.0
+        end = t_out[-1]
+        row = 1
+        h = dt
+        K = [f(t, y)] + [None] * 6
+        steps = rejected = 0
+        while row < len(Y):
+            h = min(h, max_step, end - t)
+
+            # Stages, reusing the last derivative of the previous step
+            for s in range(1, 6):
+                a = DP_A[s]
+                K[s] = f(t + DP_C[s] * h, [v + h * sum(c * k[j] for c, k in zip(a, K)) for j, v in enumerate(y)])
+            y_new = [v + h * sum(b * k[j] for b, k in zip(DP_B, K)) for j, v in enumerate(y)]
+            K[6] = f(t + h, y_new)
+
+            # Error norm
+            err = 0.0
+            for j, (v, w) in enumerate(zip(y, y_new)):
+                e = h * sum(c * k[j] for c, k in zip(DP_E, K))/(atol + rtol * max(abs(v), abs(w)))
+                err += e * e
+            err = math.sqrt(err/len(y))
+
+            # Reject, shrinking the step
+            if err > 1:
+                h *= max(0.2, 0.9 * err**-0.2)
+                rejected += 1
+                continue
+
+            # Accept, filling output rows covered by the step from the dense output
+            steps += 1
+            t_new = t + h
+            if row < len(Y) and t_out[row] <= t_new:
+                Q = np.asarray(K).T @ DP_P
+                while row < len(Y) and t_out[row] <= t_new:
+                    x = (t_out[row] - t)/h
+                    Y[row] = np.asarray(y) + h * (Q @ (x * x**np.arange(4)))
+                    _normalize_row(Y[row])
+                    row += 1
+            y = y_new
+            _normalize(y)
+            t = t_new
+            K[0] = K[6]
+            h *= min(5.0, 0.9 * err**-0.2) if err > 0 else 5.0
+
+        log.info(f"RK45 took {steps} steps, rejected {rejected}")
+        instrumentation.count("dynamics.steps", steps)
+        instrumentation.count("dynamics.rejected", rejected)
+        instrumentation.count("dynamics.derivatives", 1 + 6 * (steps + rejected))
+
+    # Properties
+    @property
+    def field(self) -> OrbitField:
+        """Geomagnetic field along the orbit"""
+        return self._field
+
+    @property
+    def inertia(self) -> Tuple[float, float, float]:
+        """Principal moments of inertia (kg m^2)"""
+        return self._inertia
+
+    @property
+    def magnet(self) -> Tuple[float, float, float]:
+        """Permanent magnet dipole in the body frame (A m^2)"""
+        return self._magnet
+
+    @property
+    def rods(self) -> Tuple[Tuple[float, float, float], ...]:
+        """Unit axes of the hysteresis rods in the body frame"""
+        return self._rods
+
+    @property
+    def rod_volume(self) -> float:
+        """Volume of each hysteresis rod (m^3)"""
+        return self._rod_volume
+
+    @property
+    def Hc(self) -> float:
+        """Rod coercivity (A/m)"""
+        return self._Hc
+
+    @property
+    def Br(self) -> float:
+        """Rod remanence (T)"""
+        return self._Br
+
+    @property
+    def Bs(self) -> float:
+        """Rod saturation flux density (T)"""
+        return self._Bs
+
+
+def _derivative(y, b, inertia, magnet, rods, rod_volume, Hc, Bs, k, xp) -> list:
+    """Computes the state derivative, for a single state of floats or an ensemble of states of arrays.
+
+    Args:
+        y (Sequence): the state components, floats or arrays over the ensemble.
+        b (Tuple[float, ...]): the inertial field (T) and its rate of change (T/s).
+        inertia (Tuple): principal moments of inertia (kg m^2), floats or arrays.
+        magnet (Tuple): permanent magnet dipole in the body frame (A m^2), floats or arrays.
+        rods (Tuple[Tuple[float, float, float], ...]): unit axes of the hysteresis rods in the body frame.
+        rod_volume (float | np.ndarray): volume of each hysteresis rod (m^3).
+        Hc (float): rod coercivity (A/m).
+        Bs (float): rod saturation flux density (T).
+        k (float): slope of the limiting hysteresis loop (m/A).
+        xp (module): math for floats, or numpy for arrays.
+
+    Returns:
+        list: the state derivative components.
+    """
+    q0, q1, q2, q3, wx, wy, wz = y[:7]
+    Jx, Jy, Jz = inertia
+    bx, by, bz, dbx, dby, dbz = b
+
+    # Rotate the field and its inertial rate into the body frame
+    r00, r01, r02 = 1 - 2 * (q2 * q2 + q3 * q3), 2 * (q1 * q2 - q0 * q3), 2 * (q1 * q3 + q0 * q2)
+    r10, r11, r12 = 2 * (q1 * q2 + q0 * q3), 1 - 2 * (q1 * q1 + q3 * q3), 2 * (q2 * q3 - q0 * q1)
+    r20, r21, r22 = 2 * (q1 * q3 - q0 * q2), 2 * (q2 * q3 + q0 * q1), 1 - 2 * (q1 * q1 + q2 * q2)
+    Bx = r00 * bx + r10 * by + r20 * bz
+    By = r01 * bx + r11 * by + r21 * bz
+    Bz = r02 * bx + r12 * by + r22 * bz
+    dBx = r00 * dbx + r10 * dby + r20 * dbz - (wy * Bz - wz * By)
+    dBy = r01 * dbx + r11 * dby + r21 * dbz - (wz * Bx - wx * Bz)
+    dBz = r02 * dbx + r12 * dby + r22 * dbz - (wx * By - wy * Bx)
+
+    # Hysteresis rods, moving from the opposite limiting branch toward the one in the direction of the field
+    mx, my, mz = magnet
+    dB = []
+    for j, (ux, uy, uz) in enumerate(rods):
+        B = y[7 + j]
+        H = (ux * Bx + uy * By + uz * Bz)/MU0
+        dH = (ux * dBx + uy * dBy + uz * dBz)/MU0
+        s = xp.copysign(Hc, dH)
+        x = (H - xp.tan(math.pi * B/(2 * Bs))/k + s)/(2 * s)
+        dB.append(x * x * (2 * Bs * k/math.pi)/(1 + (k * (H - s))**2) * dH)
+        m = B * rod_volume/MU0
+        mx = mx + m * ux
+        my = my + m * uy
+        mz = mz + m * uz
+
+    return [0.5 * (-q1 * wx - q2 * wy - q3 * wz),
+            0.5 * (q0 * wx + q2 * wz - q3 * wy),
+            0.5 * (q0 * wy - q1 * wz + q3 * wx),
+            0.5 * (q0 * wz + q1 * wy - q2 * wx),
+            (my * Bz - mz * By - (Jz - Jy) * wy * wz)/Jx,
+            (mz * Bx - mx * Bz - (Jx - Jz) * wz * wx)/Jy,
+            (mx * By - my * Bx - (Jy - Jx) * wx * wy)/Jz] + dB
+
+
+def _to_body(q: np.ndarray, bx: float, by: float, bz: float) -> np.ndarray:
+    """Rotates an inertial vector into the body frame of a scalar first body-to-inertial quaternion."""
+    q0, q1, q2, q3 = q
+    R = np.array([[1 - 2 * (q2 * q2 + q3 * q3), 2 * (q1 * q2 - q0 * q3), 2 * (q1 * q3 + q0 * q2)],
+                  [2 * (q1 * q2 + q0 * q3), 1 - 2 * (q1 * q1 + q3 * q3), 2 * (q2 * q3 - q0 * q1)],
+                  [2 * (q1 * q3 - q0 * q2), 2 * (q2 * q3 + q0 * q1), 1 - 2 * (q1 * q1 + q2 * q2)]])
+    return R.T @ np.array([bx, by, bz])
+
+
+def _normalize(y: list):
+    """Renormalizes the quaternion at the start of a state list in place."""
+    n = 1/math.sqrt(y[0] * y[0] + y[1] * y[1] + y[2] * y[2] + y[3] * y[3])
+    y[0] *= n
+    y[1] *= n
+    y[2] *= n
+    y[3] *= n
+
+
+def _normalize_row(y: np.ndarray):
+    """Renormalizes the quaternion at the start of a state array in place."""
+    y[:4] /= np.linalg.norm(y[:4])
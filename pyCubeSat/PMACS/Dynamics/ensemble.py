@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+"""Runs Monte Carlo ensembles of PMACS attitude simulations, advancing every member together.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from typing import Callable, Dict, Tuple
+import numpy as np
+
+# Custom packages
+from pyCubeSat import instrumentation
+from pyCubeSat.PMACS.Dynamics.dynamics import Dynamics, _derivative
+from pyCubeSat.parallel import SharedArray, map_shards
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat.PMACS.Dynamics')
+
+# Resolution of the pointing error histograms (deg)
+BIN = 0.1
+
+# Worker state, set once per process by _init
+_state = {}
+
+
+class Ensemble():
+    """Monte Carlo ensemble of attitude simulations, sharing an orbit and rod material"""
+    def __init__(self,
+                 dynamics: Dynamics,
+                 inertia: np.ndarray | None = None,
+                 magnet: np.ndarray | None = None,
+                 rod_volume: np.ndarray | None = None):
+        """Sets per-member parameters, broadcast against each other, defaulting to those of the base dynamics.
+
+        Args:
+            dynamics (Dynamics): the base dynamics, providing the field, rods, and defaults.
+            inertia (np.ndarray | None): principal moments of inertia (M, 3) (kg m^2). Defaults to None.
+            magnet (np.ndarray | None): permanent magnet dipoles in the body frame (M, 3) (A m^2). Defaults to None.
+            rod_volume (np.ndarray | None): volumes of each hysteresis rod (M,) (m^3). Defaults to None.
+        """
+        self._dynamics = dynamics
+        inertia = np.atleast_2d(dynamics.inertia if inertia is None else inertia).astype(float)
+        magnet = np.atleast_2d(dynamics.magnet if magnet is None else magnet).astype(float)
+        rod_volume = np.atleast_1d(dynamics.rod_volume if rod_volume is None else rod_volume).astype(float)
+        if np.any(inertia <= 0):
+            raise ValueError("Moments of inertia must be positive")
+
+        # Broadcast to a common number of members
+        M = np.broadcast_shapes(inertia.shape[:1], magnet.shape[:1], rod_volume.shape)[0]
+        self._inertia = np.ascontiguousarray(np.broadcast_to(inertia, (M, 3)))
+        self._magnet = np.ascontiguousarray(np.broadcast_to(magnet, (M, 3)))
+        self._rod_volume = np.ascontiguousarray(np.broadcast_to(rod_volume, (M,)))
+
+    def initial_state(self, q: np.ndarray, w: np.ndarray) -> np.ndarray:
+        """Builds the member states, with each rod on the ascending branch of its limiting loop.
+
+        Args:
+            q (np.ndarray): body-to-inertial quaternions, scalar first (M, 4).
+            w (np.ndarray): body angular velocities (M, 3) (rad/s).
+
+        Returns:
+            np.ndarray: the states (M, state).
+        """
+        q = np.broadcast_to(np.atleast_2d(q), (len(self), 4))
+        w = np.broadcast_to(np.atleast_2d(w), (len(self), 3))
+        return np.stack([self._dynamics.initial_state(qk, wk) for qk, wk in zip(q, w)])
+
+    @instrumentation.timed("ensemble.block")
+    def _simulate(self,
+                  y0: np.ndarray,
+                  members: slice,
+                  duration: float,
+                  dt: float,
+                  output_step: float,
+                  threshold: float,
+                  after: float,
+                  percentiles: Tuple[float, ...]) -> np.ndarray:
+        """Integrates a block of members with RK4, accumulating statistics instead of trajectories.
+
+        Args:
+            y0 (np.ndarray): the initial states of the block (m, state).
+            members (slice): the block's members.
+            duration (float): the simulated time (sec).
+            dt (float): the step (sec).
+            output_step (float): the time between evaluated samples (sec), a multiple of dt.
+            threshold (float): the pointing error that counts as settled (deg).
+            after (float): the start of the samples that pointing error percentiles are taken over (sec).
+            percentiles (Tuple[float, ...]): the pointing error percentiles.
+
+        Returns:
+            np.ndarray: the settle time (sec), final body rate (rad/s), and pointing error percentiles (deg) of each
+                member (m, 2 + len(percentiles)), NaN for the pointing statistics of members without a magnet.
+        """
+        d = self._dynamics
+        lookup = d.field.lookup
+        inertia = tuple(self._inertia[members].T)
+        magnet = tuple(self._magnet[members].T)
+        rod_volume = self._rod_volume[members]
+        args = (inertia, magnet, d.rods, rod_volume, d.Hc, d.Bs, d._k, np)
+
+        def f(t: float, y: np.ndarray) -> np.ndarray:
+            return np.array(_derivative(y, lookup(t), *args))
+
+        # Magnet directions, for the pointing error, which members without a magnet do not have
+        m = len(y0)
+        norm = np.linalg.norm(self._magnet[members], axis=1)
+        magnetized = norm > 0
+        u = self._magnet[members]/np.where(magnetized, norm, 1)[:, np.newaxis]
+        ux, uy, uz = u.T
+
+        # Statistics accumulators
+        hist = np.zeros((m, int(round(180/BIN)) + 1), dtype=np.int64)
+        rows = np.arange(m)
+        exceeded = np.full(m, -np.inf)
+
+        # Integrate, members along the last axis
+        y = np.array(y0, dtype=float).T
+        stride = max(int(round(output_step/dt)), 1)
+        num = int(np.floor(duration/(stride * dt) + 1e-9))
+        half = dt/2
+        sixth = dt/6
+        t = 0.0
+        for row in range(num + 1):
+            # Pointing error between the magnet and the field
+            q0, q1, q2, q3 = y[:4]
+            bx, by, bz, _, _, _ = lookup(t)
+            mx = (1 - 2 * (q2 * q2 + q3 * q3)) * ux + 2 * (q1 * q2 - q0 * q3) * uy + 2 * (q1 * q3 + q0 * q2) * uz
+            my = 2 * (q1 * q2 + q0 * q3) * ux + (1 - 2 * (q1 * q1 + q3 * q3)) * uy + 2 * (q2 * q3 - q0 * q1) * uz
+            mz = 2 * (q1 * q3 - q0 * q2) * ux + 2 * (q2 * q3 + q0 * q1) * uy + (1 - 2 * (q1 * q1 + q2 * q2)) * uz
+            cos = (mx * bx + my * by + mz * bz)/np.sqrt(bx * bx + by * by + bz * bz)
+            error = np.degrees(np.arccos(np.clip(cos, -1, 1)))
+            exceeded[error > threshold] = t
+            if t >= after - 1e-9:
+                hist[rows, np.minimum((error/BIN).astype(int), hist.shape[1] - 1)] += 1
+            if row == num:
+                break
+
+            # Step
+            for _ in range(stride):
+                k1 = f(t, y)
+                k2 = f(t + half, y + half * k1)
+                k3 = f(t + half, y + half * k2)
+                k4 = f(t + dt, y + dt * k3)
+                y += sixth * (k1 + 2 * (k2 + k3) + k4)
+                y[:4] /= np.sqrt(np.sum(y[:4]**2, axis=0))
+                t += dt
+
+        instrumentation.count("ensemble.member_steps", m * num * stride)
+
+        # Settle time after the last sample above the threshold, NaN if the last sample is still above it
+        settle = np.where(exceeded < 0, 0.0, exceeded + stride * dt)
+        settle[exceeded >= t - 1e-9] = np.nan
+
+        # Percentiles from the histograms, at the upper edge of their bin
+        cdf = np.cumsum(hist, axis=1)/np.maximum(hist.sum(axis=1, keepdims=True), 1)
+        pointing = np.stack([(np.argmax(cdf >= p/100, axis=1) + 1) * BIN for p in percentiles], axis=1)
+        settle[~magnetized] = np.nan
+        pointing[~magnetized] = np.nan
+
+        return np.column_stack((settle, np.linalg.norm(y[4:7], axis=0), pointing))
+
+    def run(self,
+            y0: np.ndarray,
+            duration: float,
+            dt: float = 0.1,
+            output_step: float = 10.0,
+            threshold: float = 10.0,
+            after: float = 0.0,
+            percentiles: Tuple[float, ...] = (50, 90, 99),
+            workers: int | None = 1,
+            block_size: int = 64,
+            progress: Callable[[int, int], None] | None = None) -> Dict[str, np.ndarray]:
+        """Integrates every member with fixed RK4 steps, advancing each block of members together.
+
+        Only summary statistics are kept. Pointing error is the angle between the magnet and the geomagnetic field,
+        sampled every output_step. A member settles at the first sample after its last one above the threshold, and
+        never, NaN, if its final sample is still above it. Members without a magnet have no pointing error, so their
+        settle times and percentiles are NaN.
+
+        Args:
+            y0 (np.ndarray): the initial states, e.g. from initial_state (M, state).
+            duration (float): the simulated time (sec), within the field table.
+            dt (float): the step (sec). Defaults to 0.1.
+            output_step (float): the time between pointing error samples (sec), a multiple of dt. Defaults to 10.
+            threshold (float): the pointing error that counts as settled (deg). Defaults to 10.
+            after (float): the start of the samples that the percentiles are taken over (sec). Defaults to 0.
+            percentiles (Tuple[float, ...]): the pointing error percentiles. Defaults to (50, 90, 99).
+            workers (int | None): the number of processes, None for one per core. Defaults to 1, in this process.
+            block_size (int): the number of members per block. Defaults to 64.
+            progress (Callable[[int, int], None] | None): called with the number of members done and the total.
+                Defaults to None.
+
+        Raises:
+            ValueError: if the states do not match the members, or the duration exceeds the field table.
+
+        Returns:
+            Dict[str, np.ndarray]: the "settle_time" (sec), final body "rate" (rad/s), and "pointing" error
+                percentiles (M, len(percentiles)) (deg) of each member, to a resolution of 0.1 deg.
+        """
+        # Check arguments
+        y0 = np.atleast_2d(np.asarray(y0, dtype=float))
+        if len(y0) != len(self):
+            raise ValueError(f"Got {len(y0)} initial states for {len(self)} members")
+        if duration > self._dynamics.field.span + 1e-9:
+            raise ValueError(f"Duration {duration} sec exceeds the {self._dynamics.field.span} sec field table")
+
+        # Log
+        log.info(f"Simulating an ensemble of {len(self)} for {duration} sec")
+
+        # Run blocks into shared memory
+        options = (duration, dt, output_step, threshold, after, tuple(percentiles))
+        with SharedArray((len(self), 2 + len(percentiles))) as results:
+            map_shards(_block, len(self), block_size, workers, initializer=_init,
+                       initargs=(self, y0, options, results), progress=progress)
+            out = results.array.copy()
+
+        return {'settle_time': out[:, 0], 'rate': out[:, 1], 'pointing': out[:, 2:]}
+
+    def __len__(self) -> int:
+        return len(self._rod_volume)
+
+    # Properties
+    @property
+    def dynamics(self) -> Dynamics:
+        """Base dynamics"""
+        return self._dynamics
+
+    @property
+    def inertia(self) -> np.ndarray:
+        """Principal moments of inertia of each member (kg m^2)"""
+        return self._inertia
+
+    @property
+    def magnet(self) -> np.ndarray:
+        """Permanent magnet dipole of each member (A m^2)"""
+        return self._magnet
+
+    @property
+    def rod_volume(self) -> np.ndarray:
+        """Hysteresis rod volume of each member (m^3)"""
+        return self._rod_volume
+
+
+def _init(ensemble: Ensemble, y0: np.ndarray, options: tuple, results: SharedArray):
+    """Initializes a worker with the ensemble and the shared results."""
+    _state.update(ensemble=ensemble, y0=y0, options=options, results=results)
+
+
+def _block(start: int, stop: int):
+    """Simulates a block of members, writing their statistics into the shared results."""
+    members = slice(start, stop)
+    stats = _state['ensemble']._simulate(_state['y0'][members], members, *_state['options'])
+    _state['results'].array[members] = stats
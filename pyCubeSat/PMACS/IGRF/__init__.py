@@ -1,6 +1,13 @@
 """International Geomagnetic Reference Field
 """
 
-# __all__
-from .igrf import igrf
-__all__ = [igrf]
+# __all__, the field grid (and scipy.ndimage) imported on first use. The igrf function shares its submodule's name,
+# so it is imported up front to shadow the submodule.
+from pyCubeSat._lazy import lazy
+from .igrf import igrf, igrf_field, igrf_iter
+from .coefficients import load_coefficients, coefficients, decimal_year
+_exports = {
+    'FieldGrid': ".grid",
+}
+__getattr__, __dir__ = lazy(__name__, _exports)
+__all__ = ['igrf', 'igrf_field', 'igrf_iter', 'load_coefficients', 'coefficients', 'decimal_year', *_exports]
\ No newline at end of file
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+"""Loads and caches the International Geomagnetic Reference Field 13 coefficients.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Tuple
+import os
+import tempfile
+import zipfile
+import numpy as np
+
+# Custom packages
+from pyCubeSat import instrumentation
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat.PMACS.IGRF')
+
+# Set IGRF constants
+NMAX = 13  # Maximum degree of the model
+EPOCH_STEP = 5  # Years between IGRF epochs
+IGRF_PATH = Path(__file__).parent / "IGRF13.csv"
+SECONDS_PER_YEAR = 365.25 * 24 * 60 * 60  # Julian year (sec)
+
+# Number of interpolated coefficient sets kept in memory
+CACHE_SIZE = 1024
+
+
+def _parse(path: Path) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Parses the IGRF-13 coefficient table into dense (n, m) tensors.
+
+    Args:
+        path (Path): the path to the IGRF-13 coefficient table.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]: the epochs (E,), g (E, N+1, N+1),
+            h (E, N+1, N+1), and the secular variation of g and h (N+1, N+1).
+    """
+    # Load table
+    import pandas as pd
+    log.info(f"Parsing IGRF-13 coefficients from {path.name}")
+    igrf_data = pd.read_csv(path, header=3)
+
+    # Split columns into keys, epochs, and secular variation
+    gh = igrf_data.iloc[:, 0].to_numpy()
+    n = igrf_data.iloc[:, 1].to_numpy(dtype=int)
+    m = igrf_data.iloc[:, 2].to_numpy(dtype=int)
+    epochs = igrf_data.columns[3:-1].astype(float).to_numpy()
+    values = igrf_data.iloc[:, 3:-1].to_numpy(dtype=float)
+    sv = igrf_data.iloc[:, -1].to_numpy(dtype=float)
+
+    # Scatter rows into dense tensors
+    is_g = gh == 'g'
+    is_h = ~is_g
+    g = np.zeros((len(epochs), NMAX + 1, NMAX + 1))
+    h = np.zeros((len(epochs), NMAX + 1, NMAX + 1))
+    g[:, n[is_g], m[is_g]] = values[is_g].T
+    h[:, n[is_h], m[is_h]] = values[is_h].T
+    sv_g = np.zeros((NMAX + 1, NMAX + 1))
+    sv_h = np.zeros((NMAX + 1, NMAX + 1))
+    sv_g[n[is_g], m[is_g]] = sv[is_g]
+    sv_h[n[is_h], m[is_h]] = sv[is_h]
+
+    return epochs, g, h, sv_g, sv_h
+
+
+@lru_cache(maxsize=None)
+@instrumentation.timed("igrf.load_coefficients")
+def load_coefficients(path: Path = IGRF_PATH) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Loads the IGRF-13 coefficient tensors, once per process.
+
+    The table is parsed once and saved as a binary snapshot next to it, which is loaded instead on later runs for as
+    long as it is newer than the table. The returned arrays are shared and read-only.
+
+    Args:
+        path (Path): the path to the IGRF-13 coefficient table. Defaults to the packaged IGRF13.csv.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]: the epochs (E,), g (E, N+1, N+1),
+            h (E, N+1, N+1), and the secular variation of g and h (N+1, N+1) in nT and nT/yr.
+    """
+    path = Path(path)
+    snapshot = path.with_suffix(".npz")
+
+    # Load snapshot if it is up to date, parsing the table instead if it cannot be read
+    coeffs = None
+    if snapshot.exists() and snapshot.stat().st_mtime >= path.stat().st_mtime:
+        log.info("Loading IGRF-13 coefficients")
+        try:
+            with np.load(snapshot) as data:
+                coeffs = tuple(data[key] for key in ("epochs", "g", "h", "sv_g", "sv_h"))
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as err:
+            log.warning(f"Unable to load IGRF-13 snapshot, parsing the table instead: {err}")
+    if coeffs is None:
+        coeffs = _parse(path)
+
+        # Save snapshot to a temporary file that replaces it whole, so concurrent readers never see a partial one
+        tmp = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=snapshot.parent, prefix=snapshot.stem, suffix=".tmp",
+                                             delete=False) as tmp:
+                np.savez(tmp, **dict(zip(("epochs", "g", "h", "sv_g", "sv_h"), coeffs)))
+            os.replace(tmp.name, snapshot)
+        except OSError as err:
+            log.debug(f"Unable to save IGRF-13 snapshot: {err}")
+            if tmp is not None and os.path.exists(tmp.name):
+                os.remove(tmp.name)
+
+    # Read-only, these are shared between calls
+    for arr in coeffs:
+        arr.flags.writeable = False
+
+    return coeffs
+
+
+@lru_cache(maxsize=None)
+@instrumentation.timed("igrf.rate_tables")
+def rate_tables(path: Path = IGRF_PATH) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Builds the per-epoch lookup tables used to evaluate the coefficients at any time.
+
+    The coefficients at a time t in the epoch interval e are g[e] + (t - epochs[e]) * dg[e], where dg[e] is the linear
+    rate to the next epoch, or the secular variation for the last epoch.
+
+    Args:
+        path (Path): the path to the IGRF-13 coefficient table. Defaults to the packaged IGRF13.csv.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]: the epochs (E,), g and h (E, N+1, N+1) in
+            nT, and their rates dg and dh (E, N+1, N+1) in nT/yr.
+    """
+    # Load coefficients
+    epochs, g, h, sv_g, sv_h = load_coefficients(path)
+
+    # Rates between epochs, secular variation after the last
+    step = np.diff(epochs)[:, None, None]
+    dg = np.concatenate((np.diff(g, axis=0)/step, sv_g[None]))
+    dh = np.concatenate((np.diff(h, axis=0)/step, sv_h[None]))
+
+    # Read-only, these are shared between calls
+    dg.flags.writeable = False
+    dh.flags.writeable = False
+
+    return epochs, g, h, dg, dh
+
+
+def epoch_index(t: np.ndarray, path: Path = IGRF_PATH) -> Tuple[np.ndarray, np.ndarray]:
+    """Finds the epoch interval of every sample time.
+
+    Args:
+        t (np.ndarray): the decimal years.
+        path (Path): the path to the IGRF-13 coefficient table. Defaults to the packaged IGRF13.csv.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the index into the rate tables and the years since that epoch.
+    """
+    # Load lookup tables
+    epochs = rate_tables(path)[0]
+    t = np.asarray(t, dtype=float)
+
+    # Check validity
+    if np.any(t < epochs[0]) or np.any(t > epochs[-1] + EPOCH_STEP):
+        log.warning("Some years are outside of the IGRF-13 validity range, extrapolating")
+
+    # Find bracketing epoch, extrapolating from the first and last
+    i = np.clip(np.searchsorted(epochs, t, side='right') - 1, 0, len(epochs) - 1)
+
+    return i, t - epochs[i]
+
+
+def decimal_year(date: datetime | np.ndarray) -> float | np.ndarray:
+    """Converts dates to decimal years.
+
+    Args:
+        date (datetime | np.ndarray): a datetime, or an array of datetime64 values.
+
+    Returns:
+        float | np.ndarray: the decimal year(s).
+    """
+    date = np.asarray(date, dtype='datetime64[ns]')
+    year = date.astype('datetime64[Y]')
+    start = year.astype('datetime64[ns]')
+    length = (year + 1).astype('datetime64[ns]') - start
+    dec = year.astype(float) + 1970 + (date - start)/length
+    return float(dec) if dec.ndim == 0 else dec
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def coefficients(t: float, path: Path = IGRF_PATH) -> Tuple[np.ndarray, np.ndarray]:
+    """Computes the g and h coefficients for a decimal year.
+
+    Coefficients are linearly interpolated between the bracketing epochs, or extrapolated with the secular variation
+    after the last epoch. Results are cached by decimal year and are read-only.
+
+    Args:
+        t (float): the decimal year.
+        path (Path): the path to the IGRF-13 coefficient table. Defaults to the packaged IGRF13.csv.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the g and h coefficients (N+1, N+1), in nT.
+    """
+    # Look up epoch
+    _, g, h, dg, dh = rate_tables(path)
+    i, dt = epoch_index(t, path)
+    g_t, h_t = g[i] + dt * dg[i], h[i] + dt * dh[i]
+
+    # Read-only, these are shared between calls
+    g_t.flags.writeable = False
+    h_t.flags.writeable = False
+
+    return g_t, h_t
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+"""Precomputed International Geomagnetic Reference Field 13 lookup grid.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Tuple
+import numpy as np
+from scipy.ndimage import spline_filter
+
+# Custom packages
+from pyCubeSat.PMACS.IGRF.igrf import igrf_field
+from pyCubeSat.PMACS.IGRF.coefficients import decimal_year
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat.PMACS.IGRF')
+
+# Padding added on each side of every axis for cubic interpolation
+_PAD = 3
+
+# Points interpolated at a time, keeping the gathered nodes in cache
+_BLOCK = 1024
+
+
+class FieldGrid():
+    """Geomagnetic field sampled on a regular (alt, lat, lon) grid, answering queries by interpolation."""
+    # Earth radius that altitudes are measured from, matching EarthOrbit
+    R = 6371  # km
+
+    def __init__(self,
+                 alt: Tuple[float, float] = (300, 700),
+                 lat: Tuple[float, float] = (-90, 90),
+                 lon: Tuple[float, float] = (-180, 180),
+                 step: Tuple[float, float, float] = (25, 1, 1),
+                 t: float | datetime = 2024.0):
+        """Evaluates IGRF-13 over a box of altitude, latitude, and longitude at a single epoch.
+
+        Args:
+            alt (Tuple[float, float]): the altitude range (km). Defaults to 300-700 km.
+            lat (Tuple[float, float]): the geocentric latitude range (deg). Defaults to -90-90°.
+            lon (Tuple[float, float]): the longitude range (deg). Defaults to -180-180°, which wraps around.
+            step (Tuple[float, float, float]): the grid spacing in altitude (km), latitude, and longitude (deg).
+                Defaults to 25 km, 1°, and 1°.
+            t (float | datetime): the decimal year or date of the field. Defaults to 2024.0.
+        """
+        # Build axes
+        if not isinstance(t, (int, float)):
+            t = decimal_year(t)
+        self._t = float(t)
+        self._axes = tuple(np.linspace(lo, hi, int(round((hi - lo)/d)) + 1)
+                           for (lo, hi), d in zip((alt, lat, lon), step))
+
+        # Evaluate field on the grid, components last so each node is one contiguous row
+        log.info(f"Building {'x'.join(str(len(a)) for a in self._axes)} IGRF-13 grid")
+        a, la, lo = np.meshgrid(*self._axes, indexing='ij')
+        _, Br, Bt, Bp = igrf_field(a + self.R, np.radians(90 - la), np.radians(lo), self._t)
+        self._values = np.stack((Br, Bt, Bp), axis=-1).reshape(a.shape + (3,))
+        self._prepare()
+
+    @classmethod
+    def load(cls, path: Path, mmap_mode: str | None = 'r') -> 'FieldGrid':
+        """Loads a saved grid, memory-mapping the field values.
+
+        Args:
+            path (Path): the path the grid was saved to, without suffix.
+            mmap_mode (str | None): the memory-map mode passed to np.load. Defaults to 'r', None loads into memory.
+
+        Returns:
+            FieldGrid: the grid.
+        """
+        path = Path(path)
+        with open(path.with_suffix(".json"), 'r') as f:
+            meta = json.load(f)
+        grid = cls.__new__(cls)
+        grid._t = meta['t']
+        grid._axes = tuple(np.linspace(*axis) for axis in meta['axes'])
+        grid._values = np.load(path.with_suffix(".npy"), mmap_mode=mmap_mode)
+        grid._prepare()
+        return grid
+
+    def save(self, path: Path):
+        """Saves the grid as a memory-mappable array and a small metadata header.
+
+        Args:
+            path (Path): the path to save to, without suffix.
+        """
+        path = Path(path)
+        np.save(path.with_suffix(".npy"), np.ascontiguousarray(self._values))
+        with open(path.with_suffix(".json"), 'w') as f:
+            json.dump({
+                't': self._t,
+                'axes': [[float(a[0]), float(a[-1]), len(a)] for a in self._axes],
+            }, f)
+
+    def _prepare(self):
+        """Precomputes the index mapping and node offsets shared by every query."""
+        self._shape = np.array(self._values.shape[:3])
+        self._origin = np.array([a[0] for a in self._axes])[:, None]
+        self._spacing = np.array([a[1] - a[0] for a in self._axes])[:, None]
+        self._flat = self._values.reshape(-1, 3)
+        self._strides = np.array([self._shape[1]*self._shape[2], self._shape[2], 1])
+        self._corners = _offsets(self._strides, 2)
+        self._periodic = bool(np.isclose(self._axes[2][-1] - self._axes[2][0], 360))
+        self._spline = None
+
+    def __call__(self,
+                 alt: np.ndarray,
+                 lat: np.ndarray,
+                 lon: np.ndarray,
+                 method: str = "linear") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Interpolates the field at a batch of points.
+
+        Points outside of the altitude and latitude range take the value at the nearest edge.
+
+        Args:
+            alt (np.ndarray): altitudes (km).
+            lat (np.ndarray): geocentric latitudes (deg).
+            lon (np.ndarray): longitudes (deg).
+            method (str): "linear" for trilinear or "cubic" for tricubic spline interpolation. Defaults to "linear".
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Br, Bθ, and Bφ (nT).
+        """
+        if method.lower() == "linear":
+            interpolate = self._trilinear
+        elif method.lower() == "cubic":
+            interpolate = self._tricubic
+        else:
+            raise ValueError(f"Unknown interpolation method \"{method}\"")
+
+        # Get fractional indices
+        alt, lat, lon = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (alt, lat, lon)))
+        idx = (np.array((alt.ravel(), lat.ravel(), lon.ravel())) - self._origin)/self._spacing
+        n = self._shape - 1
+        np.clip(idx[:2], 0, n[:2, None], out=idx[:2])
+        if self._periodic:
+            np.mod(idx[2], n[2], out=idx[2])
+        else:
+            np.clip(idx[2], 0, n[2], out=idx[2])
+
+        # Interpolate in blocks
+        if idx.shape[1] <= _BLOCK:
+            B = interpolate(idx)
+        else:
+            B = np.empty((idx.shape[1], 3))
+            for k in range(0, idx.shape[1], _BLOCK):
+                B[k:k + _BLOCK] = interpolate(idx[:, k:k + _BLOCK])
+
+        return tuple(B[:, c].reshape(alt.shape) for c in range(3))
+
+    def _trilinear(self, idx: np.ndarray) -> np.ndarray:
+        """Trilinear interpolation at fractional grid indices.
+
+        Args:
+            idx (np.ndarray): the fractional indices along each axis (3, K).
+
+        Returns:
+            np.ndarray: the interpolated components (K, 3).
+        """
+        lower = np.minimum(idx.astype(np.intp), self._shape[:, None] - 2)
+        f = idx - lower
+        return _contract(self._flat, self._strides @ lower, self._corners, np.array((1 - f, f)))
+
+    def _tricubic(self, idx: np.ndarray) -> np.ndarray:
+        """Tricubic spline interpolation at fractional grid indices.
+
+        The prefiltered B-spline nodes are the precomputed coefficients, so each point only gathers the 4x4x4 nodes
+        around it and weights them by the cubic B-spline basis.
+
+        Args:
+            idx (np.ndarray): the fractional indices along each axis (3, K).
+
+        Returns:
+            np.ndarray: the interpolated components (K, 3).
+        """
+        # Prefilter spline coefficients once, padding each axis so the spline holds up to the edges. The periodic
+        # longitude axis wraps, the others are extended point-symmetrically to keep their trend.
+        if self._spline is None:
+            values = np.asarray(self.values)
+            values = np.pad(values, ((0, 0), (_PAD, _PAD), (_PAD, _PAD), (0, 0)), mode='reflect', reflect_type='odd')
+            if self.periodic:
+                values = np.concatenate((values[..., -_PAD - 1:-1], values, values[..., 1:_PAD + 1]), axis=-1)
+            else:
+                values = np.pad(values, ((0, 0), (0, 0), (0, 0), (_PAD, _PAD)), mode='reflect', reflect_type='odd')
+            spline = np.stack([spline_filter(v, order=3, mode='nearest') for v in values], axis=-1)
+            strides = np.array([spline.shape[1]*spline.shape[2], spline.shape[2], 1])
+            self._spline = (spline.reshape(-1, 3), strides, _offsets(strides, 4))
+        flat, strides, nodes = self._spline
+
+        # Cubic B-spline basis
+        lower = np.floor(idx)
+        f = idx - lower
+        f2 = f*f
+        f3 = f2*f
+        w = np.array(((1 - f)**3, 3*f3 - 6*f2 + 4, 3*(f2 + f - f3) + 1, f3))/6
+
+        return _contract(flat, strides @ (lower.astype(np.intp) + _PAD - 1), nodes, w)
+
+    def max_error(self, samples: int = 10000, method: str = "linear", seed: int = 0) -> float:
+        """Estimates the maximum interpolation error against the direct model at random points in the grid.
+
+        Args:
+            samples (int): the number of random points. Defaults to 10000.
+            method (str): the interpolation method to check. Defaults to "linear".
+            seed (int): the random seed. Defaults to 0.
+
+        Returns:
+            float: the largest field vector error (nT).
+        """
+        rng = np.random.default_rng(seed)
+        alt, lat, lon = (rng.uniform(a[0], a[-1], samples) for a in self._axes)
+        B = np.array(self(alt, lat, lon, method))
+        ref = np.array(igrf_field(alt + self.R, np.radians(90 - lat), np.radians(lon), self._t)[1:])
+        return float(np.max(np.linalg.norm(B - ref, axis=0)))
+
+    # Properties
+    @property
+    def periodic(self) -> bool:
+        """Whether the longitude axis wraps around the globe"""
+        return self._periodic
+
+    @property
+    def axes(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Grid altitudes (km), latitudes (deg), and longitudes (deg)"""
+        return self._axes
+
+    @property
+    def values(self) -> np.ndarray:
+        """Field components Br, Bθ, and Bφ on the grid (nT), (3, alt, lat, lon)"""
+        return np.moveaxis(self._values, -1, 0)
+
+    @property
+    def t(self) -> float:
+        """Decimal year of the field"""
+        return self._t
+
+
+def _offsets(strides: np.ndarray, m: int) -> np.ndarray:
+    """Flat offsets of the m x m x m nodes from their first node, in C order.
+
+    Args:
+        strides (np.ndarray): the flat stride of each axis.
+        m (int): the nodes per axis.
+
+    Returns:
+        np.ndarray: the offsets (m³,).
+    """
+    i = np.arange(m)
+    return (i[:, None, None]*strides[0] + i[None, :, None]*strides[1] + i[None, None, :]*strides[2]).ravel()
+
+
+def _contract(flat: np.ndarray, base: np.ndarray, offsets: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """Gathers the nodes around each point in one take and sums them with separable weights.
+
+    Args:
+        flat (np.ndarray): the node values, one row of components per node (N, 3).
+        base (np.ndarray): the flat index of each point's first node (K,).
+        offsets (np.ndarray): the flat offsets of the m x m x m nodes, see _offsets.
+        w (np.ndarray): the weight of each node along each axis (m, 3, K).
+
+    Returns:
+        np.ndarray: the weighted sums (K, 3).
+    """
+    # Nodes with points and components flattened last, so the products below run over contiguous rows
+    m = len(w)
+    c = np.take(flat, base + offsets[:, None], axis=0).reshape(m, m, m, -1)
+    w = np.repeat(w, 3, axis=-1)
+
+    # Sum out longitude, latitude, then altitude
+    for axis in (2, 1, 0):
+        s = c[..., 0, :]*w[0, axis]
+        for j in range(1, m):
+            s += c[..., j, :]*w[j, axis]
+        c = s
+    return c.reshape(-1, 3)
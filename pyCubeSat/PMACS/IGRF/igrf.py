@@ -11,124 +11,231 @@ __maintainer__ = None
 __contact__ = None
 
 # Imports
-from pathlib import Path
-import pandas as pd
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Tuple
 import numpy as np
-from scipy.special import lpmv
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Custom packages
+from pyCubeSat import instrumentation
 from pyCubeSat.Orbit import Orbit
+from pyCubeSat.math import Legendre
+from pyCubeSat.PMACS.IGRF.coefficients import NMAX, SECONDS_PER_YEAR, decimal_year, epoch_index, rate_tables
 
 # Logging
 import logging
 log = logging.getLogger('pyCubeSat.PMACS.IGRF')
 
+# Set IGRF constants
+A = 6371.2  # IGRF reference radius (km)
+
+# Number of points evaluated per broadcast pass, bounds the (n, m, k) working arrays
+CHUNK = 16384
+
+
+@instrumentation.timed("igrf.synthesize")
+def _synthesize(r: np.ndarray,
+                colat: np.ndarray,
+                lon: np.ndarray,
+                g: np.ndarray,
+                h: np.ndarray,
+                nmax: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Evaluates the potential and field of several coefficient sets, sharing the Legendre and longitude terms.
+
+    Args:
+        r (np.ndarray): geocentric radii (km).
+        colat (np.ndarray): geocentric co-latitudes (rad).
+        lon (np.ndarray): longitudes (rad).
+        g (np.ndarray): the g coefficient sets (S, N+1, N+1), in nT.
+        h (np.ndarray): the h coefficient sets (S, N+1, N+1), in nT.
+        nmax (int): the maximum degree to evaluate.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: V (nT km), Br, Bθ, and Bφ (nT), each (S, K).
+    """
+    # Keep co-latitude off the poles, where Bφ is singular
+    colat = np.clip(colat, 1e-8, np.pi - 1e-8)
+
+    # Trim coefficients to degree
+    n = np.arange(nmax + 1)[:, None]
+    g = g[:, :nmax + 1, :nmax + 1]
+    h = h[:, :nmax + 1, :nmax + 1]
+    mg = n.T * g
+    mh = n.T * h
+
+    # Allocate outputs
+    V = np.empty((len(g), len(r)))
+    Br = np.empty_like(V)
+    Bt = np.empty_like(V)
+    Bp = np.empty_like(V)
 
-def igrf(orbit: Orbit, t: float, days: float = 14):
-    # Load IGRF coefficients
-    log.info("Loading IGRF-13 coefficients")
-    igrf_data = pd.read_csv(Path("./pyCubeSat/PMACS/IGRF/IGRF13.csv"), header=3)
-
-    # Get year bracket
-    T = t - t % 5
-
-    # Cap at epoch 2020
-    if T > 2020:
-        log.info("Input \"year\" was greater than 2024, using epoch 2020")
-        T = 2020
-
-    # Get IGRF coefficientts
-    coeffs = igrf_data.iloc[:, 0:3]
-    coeffs.loc[:, str(T)] = igrf_data.loc[:, str(T)]
-    if T == 2020:
-        coeffs.loc[:, "SV"] = igrf_data.iloc[:, -1]
-    else:
-        coeffs.loc[:, "SV"] = (1/5) * (igrf_data.iloc[:, str(T + 5)] - igrf_data.iloc[:, str(T)])
-
-    # Set Earth radius
-    a = 6371.2  # km
-
-    # Set N based on epoch
-    if T <= 1995:
-        N = 10
-    else:
-        N = 13
-
-    # Get radius, co-latitude, and longitutde
-    groundTrack = orbit.getGroundTrack(days)
-    r = groundTrack['r']
-    lat = groundTrack['lat']
-    lon = groundTrack['lon']
-
-    # Compute co-latitude
-    colat = (np.pi/2) - lat
-
-    def g(n: int, m: int, T: int, t: int) -> float:
-        """The value of the "g" coefficient from the IGRF-13 model.
-
-        Args:
-            n (int): the degree of the coefficient.
-            m (int): the order of the coefficient.
-            T (int): the epoch.
-            t (int): the year.
-
-        Returns:
-            float: the coefficient value of g.
-        """
-        # Find correct values
-        i = 0
-        while i < len(coeffs):
-            gh, en, em = coeffs.iloc[i, 0:3]
-            if gh == 'g' and en == n and em == m:
-                break
-            else:
-                i += 1
-
-        # Load coefficients
-        c = coeffs.loc[i, str(T)]
-        sv = coeffs.loc[i, 'SV']
-
-        # Return correct values
-        return c + (t - T) * sv
-
-    def h(n: int, m: int, T: int, t: int) -> float:
-        """The value of the "h" coefficient from the IGRF-13 model.
-
-        Args:
-            n (int): the degree of the coefficient.
-            m (int): the order of the coefficient.
-            T (int): the epoch.
-            t (int): the year.
-
-        Returns:
-            float: the coefficient value of h.
-        """
-        # Find correct values
-        i = 0
-        while i < len(coeffs):
-            gh, en, em = coeffs.iloc[i, 0:3]
-            if gh == 'h' and en == n and em == m:
-                break
-            else:
-                i += 1
-
-        # Check that "h" value in valid
-        if i == len(coeffs):
-            return 0.0
-        else:  # Load coefficients
-            c = coeffs.loc[i, str(T)]
-            sv = coeffs.loc[i, 'SV']
-
-            # Return correct values
-            return c + (t - T) * sv
+    # Compute field
+    for start in range(0, len(r), CHUNK):
+        chunk = slice(start, start + CHUNK)
+        k = len(r[chunk])
+        P, dP = Legendre(nmax, colat[chunk])
+
+        # Longitude terms (m, k), cos(mφ) and sin(mφ) from powers of e^(iφ)
+        z = np.empty((nmax + 1, k), dtype=complex)
+        z[0] = 1
+        z[1:] = np.exp(1j * lon[chunk])
+        z = np.cumprod(z, axis=0)
+        cos_m = np.ascontiguousarray(z.real)
+        sin_m = np.ascontiguousarray(z.imag)
+
+        # Sum over order (s, n, k), only the lower triangle m <= n is non-zero
+        Sv = np.zeros((len(g), nmax + 1, k))
+        St = np.zeros_like(Sv)
+        Sp = np.zeros_like(Sv)
+        for i in range(1, nmax + 1):
+            c = cos_m[:i + 1]
+            s = sin_m[:i + 1]
+            Pc = P[i, :i + 1] * c
+            Ps = P[i, :i + 1] * s
+            Sv[:, i] = g[:, i, :i + 1] @ Pc + h[:, i, :i + 1] @ Ps
+            Sp[:, i] = mg[:, i, :i + 1] @ Ps - mh[:, i, :i + 1] @ Pc
+            St[:, i] = g[:, i, :i + 1] @ (dP[i, :i + 1] * c) + h[:, i, :i + 1] @ (dP[i, :i + 1] * s)
+
+        # Radial terms (n, k)
+        ratio = (A/r[chunk])**(n + 1)
+        V[:, chunk] = A * np.einsum('nk,snk->sk', ratio, Sv)
+        ratio *= A/r[chunk]
+        Br[:, chunk] = np.einsum('nk,snk->sk', (n + 1) * ratio, Sv)
+        Bt[:, chunk] = -np.einsum('nk,snk->sk', ratio, St)
+        Bp[:, chunk] = np.einsum('nk,snk->sk', ratio, Sp)/np.sin(colat[chunk])
+
+    return V, Br, Bt, Bp
+
+
+def _flatten(*arrays: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Broadcasts inputs against each other and flattens them to 1-D float arrays."""
+    arrays = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=float)) for x in arrays))
+    return tuple(x.ravel() for x in arrays)
+
+
+def field(r: np.ndarray,
+          colat: np.ndarray,
+          lon: np.ndarray,
+          g: np.ndarray,
+          h: np.ndarray,
+          nmax: int = NMAX) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Evaluates the geomagnetic potential and field for every point in a single broadcast pass.
+
+    Args:
+        r (np.ndarray): geocentric radii (km).
+        colat (np.ndarray): geocentric co-latitudes (rad).
+        lon (np.ndarray): longitudes (rad).
+        g (np.ndarray): the g coefficients (N+1, N+1), in nT.
+        h (np.ndarray): the h coefficients (N+1, N+1), in nT.
+        nmax (int): the maximum degree to evaluate. Defaults to 13.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: V (nT km), Br, Bθ, and Bφ (nT).
+    """
+    r, colat, lon = _flatten(r, colat, lon)
+    V, Br, Bt, Bp = _synthesize(r, colat, lon, g[None], h[None], nmax)
+    return V[0], Br[0], Bt[0], Bp[0]
+
+
+@instrumentation.timed("igrf.field")
+def igrf_field(r: np.ndarray,
+               colat: np.ndarray,
+               lon: np.ndarray,
+               t: np.ndarray,
+               epoch: float | datetime | None = None,
+               nmax: int = NMAX) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Evaluates the geomagnetic potential and field with each sample at its own time.
+
+    Every sample uses the coefficients of its own epoch interval, linearly interpolated between the bracketing 5-year
+    models or extrapolated with the secular variation. Since the field is linear in the coefficients, each interval
+    is evaluated once for its base coefficients and once for their rates, and the two are combined per sample.
+
+    Args:
+        r (np.ndarray): geocentric radii (km).
+        colat (np.ndarray): geocentric co-latitudes (rad).
+        lon (np.ndarray): longitudes (rad).
+        t (np.ndarray): the sample times, as decimal years, datetime64 values, or seconds since "epoch".
+        epoch (float | datetime | None): the decimal year or date that "t" is measured from in seconds. Defaults
+            to None, for absolute times.
+        nmax (int): the maximum degree to evaluate. Defaults to 13.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: V (nT km), Br, Bθ, and Bφ (nT).
+    """
+    # Convert times to decimal years
+    t = np.asarray(t)
+    if np.issubdtype(t.dtype, np.datetime64):
+        t = decimal_year(t)
+    elif epoch is not None:
+        if not isinstance(epoch, (int, float)):
+            epoch = decimal_year(epoch)
+        t = epoch + t/SECONDS_PER_YEAR
+    r, colat, lon, t = _flatten(r, colat, lon, t)
+
+    # Look up each sample's epoch interval
+    _, g, h, dg, dh = rate_tables()
+    index, dt = epoch_index(t)
+
+    # Allocate outputs
+    V = np.empty(len(r))
+    Br = np.empty(len(r))
+    Bt = np.empty(len(r))
+    Bp = np.empty(len(r))
+    instrumentation.count("igrf.points", len(r))
+    instrumentation.allocation("igrf.field", 4 * V.nbytes, 4)
+
+    # Evaluate base and rate coefficients per epoch interval, then combine per sample
+    order = np.argsort(index, kind='stable')
+    intervals, starts = np.unique(index[order], return_index=True)
+    for e, sel in zip(intervals, np.split(order, starts[1:])):
+        out = _synthesize(r[sel], colat[sel], lon[sel],
+                          np.stack((g[e], dg[e])), np.stack((h[e], dh[e])), nmax)
+        for arr, (base, rate) in zip((V, Br, Bt, Bp), out):
+            arr[sel] = base + dt[sel] * rate
+
+    return V, Br, Bt, Bp
+
+
+def igrf(orbit: Orbit, t: float | datetime, days: float = 14) -> 'pd.DataFrame':
+    """Computes the IGRF-13 geomagnetic field along the ground track of an orbit.
+
+    Each sample is evaluated at its own time, so tracks may span epoch boundaries.
+
+    Args:
+        orbit (Orbit): the orbit.
+        t (float | datetime): the decimal year or date at the start of the ground track.
+        days (float): the number of days to compute. Defaults to 14.
+
+    Returns:
+        pd.DataFrame(index=[], columns=["sec", "r", "lat", "lon", "V", "Br", "Btheta", "Bphi"]): the ground track
+            with the potential (nT km) and field components (nT).
+    """
+    # Get radius, co-latitude, and longitude
+    track = orbit.getGroundTrack(days)
+    colat = np.pi/2 - np.radians(track.lat)
+    lon = np.radians(track.lon)
 
     # Compute field
     log.info("Computing IGRF-13 model")
-    sum = np.zeros(len(r))
-    # for i in range(len(r)):
-    for i in range(1):
-        log.debug(f"Computing IGRF-13 for point {i}: r = {r[i]:0.4f} | colat = {colat[i]} | lon = {lon[i]}")
-        for n in range(N):
-            for m in range(n):
-                sum[i] += (a/r[i])**(n + 1) * (g(n, m, T, t) * np.cos(m * colat[i]) + h(n, m, T, t) * np.sin(m * colat[i])) * lpmv(m, n, np.cos(colat[i]))
-    V = a * sum
\ No newline at end of file
+    V, Br, Bt, Bp = igrf_field(track.r, colat, lon, track.sec, epoch=t)
+
+    return track.to_pandas(V=V, Br=Br, Btheta=Bt, Bphi=Bp)
+
+
+def igrf_iter(chunks: Iterable[Dict[str, np.ndarray]], t: float | datetime) -> Iterator[Dict[str, np.ndarray]]:
+    """Computes the IGRF-13 geomagnetic field along a ground track streamed in chunks.
+
+    Args:
+        chunks (Iterable[Dict[str, np.ndarray]]): ground track chunks with "sec", "r", "lat", and "lon", e.g. from
+            Orbit.iter_ground_track.
+        t (float | datetime): the decimal year or date that "sec" is measured from.
+
+    Yields:
+        Dict[str, np.ndarray]: each chunk with the potential "V" (nT km) and field components "Br", "Btheta", and
+            "Bphi" (nT) added.
+    """
+    for chunk in chunks:
+        V, Br, Bt, Bp = igrf_field(chunk['r'], np.pi/2 - np.radians(chunk['lat']), np.radians(chunk['lon']),
+                                   chunk['sec'], epoch=t)
+        yield {**chunk, 'V': V, 'Br': Br, 'Btheta': Bt, 'Bphi': Bp}
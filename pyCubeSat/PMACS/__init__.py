@@ -1,6 +1,11 @@
 """Passive Magnetic Attitude Control Simulation
 """
 
-# __all__
-from . import IGRF
-__all__ = [IGRF]
\ No newline at end of file
+# __all__, imported on first use
+from pyCubeSat._lazy import lazy
+_exports = {
+    'IGRF': ".IGRF",
+    'Dynamics': ".Dynamics",
+}
+__getattr__, __dir__ = lazy(__name__, _exports)
+__all__ = list(_exports)
\ No newline at end of file
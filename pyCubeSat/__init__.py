@@ -1,14 +1,25 @@
 """Pure Python CubeSat Simulation
 """
 
-# __all__
-from . import Orbit
-from . import PMACS
-__all__ = [Orbit, PMACS]
+# __all__, imported on first use
+from pyCubeSat._lazy import lazy
+_exports = {
+    'Orbit': ".Orbit",
+    'PMACS': ".PMACS",
+    'math': ".math",
+    'ephemeris': ".ephemeris",
+    'instrumentation': ".instrumentation",
+    'parallel': ".parallel",
+    'sweep': ".sweep",
+}
+__getattr__, __dir__ = lazy(__name__, _exports)
+__all__ = ['Orbit', 'PMACS']
 
 
-# Configure logging
+# Configure logging, from the configuration packaged alongside this file
 import logging
 import logging.config
+from pathlib import Path
 import yaml
-logging.config.dictConfig(yaml.safe_load(open("pyCubeSat/logging.yaml", 'r').read()))
\ No newline at end of file
+with open(Path(__file__).parent / "logging.yaml", 'r') as file:
+    logging.config.dictConfig(yaml.safe_load(file))
\ No newline at end of file
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""Lazy package exports, so importing a package only loads the submodules that are used.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from importlib import import_module
+from typing import Callable, Dict, List, Tuple
+import sys
+
+
+def lazy(package: str, exports: Dict[str, str]) -> Tuple[Callable[[str], object], Callable[[], List[str]]]:
+    """Builds the module-level __getattr__ and __dir__ of a package with lazy exports.
+
+    Args:
+        package (str): the package's __name__.
+        exports (Dict[str, str]): each exported name and the relative module it comes from. A name that is the last
+            part of its module's name exports the module itself, e.g. {"Orbit": ".Orbit"}.
+
+    Returns:
+        Tuple[Callable[[str], object], Callable[[], List[str]]]: the __getattr__ and __dir__ functions.
+    """
+    def __getattr__(name: str) -> object:
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        module = import_module(exports[name], package)
+        value = module if module.__name__.rpartition('.')[2] == name else getattr(module, name)
+
+        # Cache on the package, so later lookups skip this
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
@@ -0,0 +1,497 @@
+#!/usr/bin/env python
+"""Persistent, memory-mapped ephemeris store, and interpolation between its samples.
+
+Each dataset is a directory of chunk files, one (columns, samples) array per span of time, with an index.json
+header. Datasets are keyed by the orbit elements, the start date, the step, and the field model, so a dataset is
+generated once and then reused, and extended when a longer span is asked for.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Tuple
+import hashlib
+import json
+import os
+import numpy as np
+
+# Custom packages
+from pyCubeSat.Orbit.orbit import Orbit, _epoch
+from pyCubeSat.Orbit.propagation import subsatellite
+from pyCubeSat.math.frames import utc
+from pyCubeSat.PMACS.IGRF import igrf_field
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat')
+
+# Stored columns: time since the start (sec), inertial position (km) and velocity (km/s), latitude and longitude
+# (deg), altitude (km), and the geomagnetic field (nT)
+COLUMNS = ("sec", "x", "y", "z", "vx", "vy", "vz", "lat", "lon", "alt", "Br", "Btheta", "Bphi")
+
+# Field model, and layout version of the store, both part of every key
+MODEL = "IGRF-13"
+VERSION = 2
+
+
+def _samples(orbit: Orbit, t: np.ndarray, epoch: datetime) -> np.ndarray:
+    """Propagates an orbit and evaluates the field along it.
+
+    Args:
+        orbit (Orbit): the orbit.
+        t (np.ndarray): the times (sec).
+        epoch (datetime): the date at t = 0.
+
+    Returns:
+        np.ndarray: the samples of every column (len(COLUMNS), len(t)).
+    """
+    pos, vel = orbit.propagate(t)
+    r, lat, lon = subsatellite(pos, t, orbit.W, orbit.theta0)
+    _, Br, Bt, Bp = igrf_field(r, np.pi/2 - np.radians(lat), np.radians(lon), t, epoch=epoch)
+    return np.stack((t, *pos.T, *vel.T, lat, lon, r - orbit.R, Br, Bt, Bp))
+
+
+class EphemerisStore():
+    """Directory of ephemeris datasets, read back through memory maps"""
+    def __init__(self, root: str | Path, chunk_seconds: float = 24 * 60 * 60):
+        """Opens or creates a store.
+
+        Args:
+            root (str | Path): the store directory.
+            chunk_seconds (float): the span of each chunk file of new datasets (sec). Defaults to one day.
+        """
+        self._root = Path(root)
+        self._root.mkdir(parents=True, exist_ok=True)
+        self._chunk_seconds = chunk_seconds
+
+    def key(self, orbit: Orbit, epoch: datetime | None = None, step: float = 60.0) -> str:
+        """Builds the key of an orbit's dataset.
+
+        Args:
+            orbit (Orbit): the orbit.
+            epoch (datetime | None): the date at t = 0. Defaults to None, the orbit's own epoch.
+            step (float): the time between samples (sec). Defaults to 60.
+
+        Returns:
+            str: the key.
+        """
+        return self._header(orbit, _epoch(orbit, epoch), step)['key']
+
+    def generate(self,
+                 orbit: Orbit,
+                 days: float,
+                 epoch: datetime | None = None,
+                 step: float = 60.0,
+                 progress: Callable[[int, int], None] | None = None) -> str:
+        """Generates an orbit's dataset, reusing every chunk already stored and only computing the rest.
+
+        Args:
+            orbit (Orbit): the orbit.
+            days (float): the number of days the dataset must cover.
+            epoch (datetime | None): the date at t = 0. Defaults to None, the orbit's own epoch.
+            step (float): the time between samples (sec). Defaults to 60.
+            progress (Callable[[int, int], None] | None): called with the number of chunks done and the total.
+                Defaults to None.
+
+        Returns:
+            str: the dataset's key.
+        """
+        epoch = _epoch(orbit, epoch)
+        header = self._header(orbit, epoch, step)
+        path = self._root / header['key']
+        index = self.info(header['key']) if (path / "index.json").exists() else header
+
+        # Chunks still to compute, the last stored one is redone if it was partial
+        num = int(np.ceil(days * 24 * 60 * 60/step - 1e-9))
+        per_chunk = index['chunk_rows']
+        chunks = index['chunks']
+        if num <= sum(chunks):
+            return header['key']
+        if chunks and chunks[-1] < per_chunk:
+            chunks.pop()
+        todo = range(len(chunks), int(np.ceil(num/per_chunk)))
+
+        # Log
+        log.info(f"Generating ephemeris {header['key']}, chunks {todo.start} to {todo.stop - 1}")
+
+        # Compute chunks, recording each in the index once written, so an interrupted run resumes
+        path.mkdir(exist_ok=True)
+        for done, k in enumerate(todo):
+            t = np.arange(k * per_chunk, min((k + 1) * per_chunk, num)) * step
+            self._write_chunk(path / f"{k:05d}.npy", _samples(orbit, t, epoch))
+            chunks.append(len(t))
+            self._write_index(path, index)
+            if progress is not None:
+                progress(done + 1, len(todo))
+
+        return header['key']
+
+    def query(self,
+              key: str,
+              start: float | datetime = 0.0,
+              stop: float | datetime | None = None,
+              columns: Iterable[str] | None = None) -> Dict[str, np.ndarray]:
+        """Reads the samples in [start, stop), opening only the chunks that overlap it.
+
+        Samples within a single chunk are returned as read-only views of its memory map, otherwise they are copied
+        into one array per column.
+
+        Args:
+            key (str): the dataset's key.
+            start (float | datetime): the start, in seconds since the dataset epoch or as a date, naive dates taken as
+                UTC. Defaults to 0.
+            stop (float | datetime | None): the stop, likewise. Defaults to None, the end of the dataset.
+            columns (Iterable[str] | None): the columns to read. Defaults to None, all of COLUMNS.
+
+        Raises:
+            ValueError: if a column is unknown, or the range is not within the dataset.
+
+        Returns:
+            Dict[str, np.ndarray]: the samples of each column.
+        """
+        index = self.info(key)
+        columns = COLUMNS if columns is None else tuple(columns)
+        rows = [COLUMNS.index(column) for column in columns if column in COLUMNS]
+        if len(rows) != len(columns):
+            raise ValueError(f"Unknown columns {set(columns) - set(COLUMNS)}, expected some of {COLUMNS}")
+
+        # Convert the range to sample indices
+        epoch = datetime.fromisoformat(index['epoch'])
+        step, per_chunk = index['step'], index['chunk_rows']
+        total = sum(index['chunks'])
+        if isinstance(start, datetime):
+            start = (utc(start) - epoch).total_seconds()
+        if isinstance(stop, datetime):
+            stop = (utc(stop) - epoch).total_seconds()
+        first = max(int(np.ceil(start/step - 1e-9)), 0)
+        last = total if stop is None else int(np.ceil(stop/step - 1e-9))
+        if last > total or first > last:
+            raise ValueError(f"Range {start} to {stop} sec is outside the dataset's {total * step} sec")
+        if first == last:
+            return {column: np.empty(0) for column in columns}
+
+        # Slice each overlapping chunk's memory map, one view per column
+        parts = []
+        for k in range(first//per_chunk, (last - 1)//per_chunk + 1):
+            data = np.load(self._root / key / f"{k:05d}.npy", mmap_mode='r')
+            window = slice(max(first - k * per_chunk, 0), last - k * per_chunk)
+            parts.append([data[row, window] for row in rows])
+        if len(parts) == 1:
+            return dict(zip(columns, parts[0]))
+        return {column: np.concatenate(views) for column, views in zip(columns, zip(*parts))}
+
+    def info(self, key: str) -> Dict:
+        """Reads a dataset's index.
+
+        Args:
+            key (str): the dataset's key.
+
+        Raises:
+            ValueError: if the dataset does not exist.
+
+        Returns:
+            Dict: the orbit "elements", "epoch", "step", "model", "version", sample "columns", "chunk_rows", and
+                the samples in each of the "chunks".
+        """
+        path = self._root / key / "index.json"
+        if not path.exists():
+            raise ValueError(f"No ephemeris {key} in {self._root}")
+        with open(path, 'r') as file:
+            return json.load(file)
+
+    def keys(self) -> List[str]:
+        """Keys of every stored dataset"""
+        return sorted(path.parent.name for path in self._root.glob("*/index.json"))
+
+    def __contains__(self, key: str) -> bool:
+        return (self._root / key / "index.json").exists()
+
+    def _header(self, orbit: Orbit, epoch: datetime, step: float) -> Dict:
+        """Builds the index of an empty dataset, with its key hashed from everything the samples depend on."""
+        identity = {
+            'orbit': type(orbit).__name__,
+            'elements': orbit.elements,
+            'theta0': orbit.theta0,
+            'epoch': epoch.isoformat(),
+            'step': float(step),
+            'model': MODEL,
+            'version': VERSION,
+        }
+        key = hashlib.sha1(json.dumps(identity, sort_keys=True).encode()).hexdigest()[:16]
+        rows = max(int(self._chunk_seconds//step), 1)
+        return {'key': key, **identity, 'columns': COLUMNS, 'chunk_rows': rows, 'chunks': []}
+
+    @staticmethod
+    def _write_chunk(path: Path, data: np.ndarray):
+        """Replaces a chunk file in one step, so readers never see a partial file."""
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, 'wb') as file:
+            np.save(file, data)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _write_index(path: Path, index: Dict):
+        """Replaces a dataset's index in one step, so readers never see a partial file."""
+        tmp = path / "index.json.tmp"
+        with open(tmp, 'w') as file:
+            json.dump(index, file, indent=4)
+        os.replace(tmp, path / "index.json")
+
+    # Properties
+    @property
+    def root(self) -> Path:
+        """Store directory"""
+        return self._root
+
+
+class Interpolator():
+    """Ephemeris at arbitrary times, interpolated from a propagated track.
+
+    Position and velocity use cubic Hermite interpolation of the sampled positions and velocities, and the field uses
+    four-point cubic (Lagrange) interpolation. Each interval carries an error estimate relative to direct
+    propagation, from the interpolation remainder terms with the fourth derivatives estimated by local divided
+    differences and multiplied by a safety factor. The derivatives are only known from the samples, so the estimates
+    are not guaranteed bounds: steps too coarse to resolve the motion or the field can exceed them.
+    """
+    def __init__(self,
+                 t: np.ndarray,
+                 pos: np.ndarray,
+                 vel: np.ndarray,
+                 field: np.ndarray | None = None,
+                 safety: float = 2.0):
+        """Sets the samples and estimates the error of each interval.
+
+        Args:
+            t (np.ndarray): increasing sample times, at least 5 (N,) (sec).
+            pos (np.ndarray): positions (N, 3) (km).
+            vel (np.ndarray): velocities (N, 3) (km/s).
+            field (np.ndarray | None): field components (N, k), e.g. Br, Bθ, and Bφ (nT). Defaults to None.
+            safety (float): the factor applied to the estimated fourth derivatives. Defaults to 2.
+
+        Raises:
+            ValueError: if there are fewer than 5 samples, or the times are not increasing.
+        """
+        self._t = np.ascontiguousarray(t, dtype=float)
+        self._pos = np.ascontiguousarray(pos, dtype=float)
+        self._vel = np.ascontiguousarray(vel, dtype=float)
+        self._field = np.ascontiguousarray(np.empty((len(self._t), 0)) if field is None else field, dtype=float)
+        if len(self._t) < 5:
+            raise ValueError("At least 5 samples are needed")
+        if np.any(np.diff(self._t) <= 0):
+            raise ValueError("Sample times must be increasing")
+
+        # Largest fourth derivatives of each interval, from the 5-point windows containing both of its samples
+        h = np.diff(self._t)
+        d4_pos = safety * self._window_max(_fourth_derivative(self._t, self._pos))
+        d4_field = safety * self._window_max(_fourth_derivative(self._t, self._field))
+
+        # Propagators whose velocity is not exactly the derivative of their position, like SGP4, add the mismatch
+        # through the velocity basis functions, at most 4/27 h for position and 1 for velocity
+        mismatch = safety * _velocity_mismatch(self._t, self._pos, self._vel)
+        mismatch = np.maximum(mismatch[:-1], mismatch[1:])
+
+        # Remainder terms: h^4/384 for Hermite positions, sqrt(3)/216 h^3 for their derivative, and max|ω|/4! for
+        # four-point Lagrange, with max|ω| = 9/16 h^4 on inner intervals and h^4 on the first and last
+        edge = np.full(len(h), 9/16)
+        edge[[0, -1]] = 1.0
+        s = np.clip(np.arange(len(h)) - 1, 0, len(h) - 3)
+        h_max = np.maximum.reduce([h[s], h[s + 1], h[s + 2]])
+        self._estimates = np.column_stack((h**4/384 * d4_pos + 4/27 * h * mismatch,
+                                        np.sqrt(3)/216 * h**3 * d4_pos + mismatch,
+                                        edge * h_max**4/24 * d4_field))
+
+    @classmethod
+    def from_orbit(cls,
+                   orbit: Orbit,
+                   days: float,
+                   epoch: datetime | None = None,
+                   step: float = 60.0,
+                   safety: float = 2.0) -> 'Interpolator':
+        """Propagates an orbit and evaluates the field on a grid, to interpolate between.
+
+        Args:
+            orbit (Orbit): the orbit.
+            days (float): the number of days to cover.
+            epoch (datetime | None): the date at t = 0. Defaults to None, the orbit's own epoch.
+            step (float): the time between samples (sec). Defaults to 60.
+            safety (float): the factor applied to the estimated fourth derivatives. Defaults to 2.
+
+        Returns:
+            Interpolator: the interpolator.
+        """
+        t = np.arange(int(np.ceil(days * 24 * 60 * 60/step - 1e-9)) + 1) * step
+        samples = dict(zip(COLUMNS, _samples(orbit, t, _epoch(orbit, epoch))))
+        return cls._from_columns(samples, safety)
+
+    @classmethod
+    def from_store(cls,
+                   store: EphemerisStore,
+                   key: str,
+                   start: float | datetime = 0.0,
+                   stop: float | datetime | None = None,
+                   safety: float = 2.0) -> 'Interpolator':
+        """Interpolates between the samples of a stored dataset.
+
+        Args:
+            store (EphemerisStore): the store.
+            key (str): the dataset's key.
+            start (float | datetime): the start, in seconds since the dataset epoch or as a date, naive dates taken as
+                UTC. Defaults to 0.
+            stop (float | datetime | None): the stop, likewise. Defaults to None, the end of the dataset.
+            safety (float): the factor applied to the estimated fourth derivatives. Defaults to 2.
+
+        Returns:
+            Interpolator: the interpolator.
+        """
+        return cls._from_columns(store.query(key, start, stop), safety)
+
+    @classmethod
+    def _from_columns(cls, samples: Dict[str, np.ndarray], safety: float) -> 'Interpolator':
+        """Builds an interpolator from the columns of the store."""
+        pos, vel, field = (np.column_stack([samples[key] for key in keys])
+                           for keys in (('x', 'y', 'z'), ('vx', 'vy', 'vz'), ('Br', 'Btheta', 'Bphi')))
+        return cls(samples['sec'], pos, vel, field, safety)
+
+    def __call__(self, t: np.ndarray) -> Dict[str, np.ndarray]:
+        """Interpolates the ephemeris.
+
+        Args:
+            t (np.ndarray): the query times, within the span (sec).
+
+        Raises:
+            ValueError: if a time is outside the span.
+
+        Returns:
+            Dict[str, np.ndarray]: the "pos" (len(t), 3) (km), "vel" (len(t), 3) (km/s), and "field" (len(t), k).
+        """
+        t = np.atleast_1d(np.asarray(t, dtype=float))
+        k = self._locate(t)
+        pos, vel = self._hermite(t, k)
+        return {'pos': pos, 'vel': vel, 'field': self._lagrange(t, k)}
+
+    def estimate(self, t: np.ndarray) -> Dict[str, np.ndarray]:
+        """Estimates the error of each query, relative to direct propagation.
+
+        Args:
+            t (np.ndarray): the query times, within the span (sec).
+
+        Returns:
+            Dict[str, np.ndarray]: the estimated error norms of "pos" (km), "vel" (km/s), and "field".
+        """
+        estimates = self._estimates[self._locate(np.atleast_1d(np.asarray(t, dtype=float)))]
+        return {'pos': estimates[:, 0], 'vel': estimates[:, 1], 'field': estimates[:, 2]}
+
+    def _locate(self, t: np.ndarray) -> np.ndarray:
+        """Finds the interval containing each query by binary search."""
+        if np.any(t < self._t[0]) or np.any(t > self._t[-1]):
+            raise ValueError(f"Times must be within {self._t[0]} to {self._t[-1]} sec")
+        return np.clip(np.searchsorted(self._t, t, side='right') - 1, 0, len(self._t) - 2)
+
+    def _hermite(self, t: np.ndarray, k: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Evaluates the cubic Hermite position and its derivative on intervals k."""
+        h = (self._t[k + 1] - self._t[k])[:, None]
+        u = (t - self._t[k])[:, None]/h
+        p0, p1 = self._pos[k], self._pos[k + 1]
+        m0, m1 = h * self._vel[k], h * self._vel[k + 1]
+
+        # Basis functions and their derivatives
+        u2, u3 = u * u, u * u * u
+        pos = (2 * u3 - 3 * u2 + 1) * p0 + (u3 - 2 * u2 + u) * m0 + (3 * u2 - 2 * u3) * p1 + (u3 - u2) * m1
+        vel = ((6 * u2 - 6 * u) * (p0 - p1) + (3 * u2 - 4 * u + 1) * m0 + (3 * u2 - 2 * u) * m1)/h
+        return pos, vel
+
+    def _lagrange(self, t: np.ndarray, k: np.ndarray) -> np.ndarray:
+        """Evaluates the four-point cubic through the samples around intervals k."""
+        s = np.clip(k - 1, 0, len(self._t) - 4)
+        nodes = self._t[s[:, None] + np.arange(4)]
+        out = np.zeros((len(t), self._field.shape[1]))
+        for j in range(4):
+            w = np.ones(len(t))
+            for m in range(4):
+                if m != j:
+                    w *= (t - nodes[:, m])/(nodes[:, j] - nodes[:, m])
+            out += w[:, None] * self._field[s + j]
+        return out
+
+    def _window_max(self, d4: np.ndarray) -> np.ndarray:
+        """Spreads the fourth derivative of each 5-point window to the intervals it contains (N - 1,)."""
+        d4 = np.pad(d4, (3, 3), mode='edge')
+        return np.maximum.reduce([d4[j:j + len(self._t) - 1] for j in range(4)])
+
+    # Properties
+    @property
+    def span(self) -> Tuple[float, float]:
+        """First and last sample times (sec)"""
+        return float(self._t[0]), float(self._t[-1])
+
+    @property
+    def error(self) -> Dict[str, float]:
+        """Largest error estimates of "pos" (km), "vel" (km/s), and "field" over the span"""
+        return dict(zip(('pos', 'vel', 'field'), self._estimates.max(axis=0).tolist()))
+
+
+def _fourth_derivative(t: np.ndarray, f: np.ndarray) -> np.ndarray:
+    """Estimates the largest norm of the fourth derivative over every 5-point window from the divided differences.
+
+    The fourth divided difference gives the derivative somewhere in the window, and the fifth divided differences of
+    the 6-point windows around it extend that across the window.
+
+    Args:
+        t (np.ndarray): the sample times (N,).
+        f (np.ndarray): the samples (N, k).
+
+    Returns:
+        np.ndarray: the estimates (N - 4,).
+    """
+    d = f
+    for order in range(1, 5):
+        d = (d[1:] - d[:-1])/(t[order:] - t[:-order])[:, None]
+    d4 = 24 * np.linalg.norm(d, axis=1)
+    if len(d4) < 2:
+        return d4
+
+    # Larger fifth derivative of the 6-point windows on either side, times the span of the window
+    d5 = 120 * np.linalg.norm((d[1:] - d[:-1])/(t[5:] - t[:-5])[:, None], axis=1)
+    d5 = np.maximum(np.append(d5, d5[-1]), np.insert(d5, 0, d5[0]))
+    return d4 + d5 * (t[4:] - t[:-4])
+
+
+def _velocity_mismatch(t: np.ndarray, pos: np.ndarray, vel: np.ndarray) -> np.ndarray:
+    """Estimates how far each sampled velocity is from the derivative of the positions.
+
+    The derivative is that of the quartic through the 5 nearest samples.
+
+    Args:
+        t (np.ndarray): the sample times (N,).
+        pos (np.ndarray): the positions (N, 3).
+        vel (np.ndarray): the velocities (N, 3).
+
+    Returns:
+        np.ndarray: the norm of the difference at each sample (N,).
+    """
+    # Window of each sample, and its place in the window
+    k = np.arange(len(t))
+    s = np.clip(k - 2, 0, len(t) - 5)
+    nodes = t[s[:, None] + np.arange(5)]
+    x = t[:, None]
+
+    # Derivatives of the Lagrange basis at the sample
+    derivative = np.zeros_like(pos)
+    for j in range(5):
+        others = [m for m in range(5) if m != j]
+        at_node = np.isclose(nodes[:, j:j + 1], x)[:, 0]
+        w = np.zeros(len(t))
+        for m in others:
+            rest = np.prod([x[:, 0] - nodes[:, o] for o in others if o != m], axis=0)
+            w += rest/np.prod([nodes[:, j] - nodes[:, o] for o in others], axis=0)
+        w[at_node] = np.sum([1/(nodes[at_node, j] - nodes[at_node, o]) for o in others], axis=0)
+        derivative += w[:, None] * pos[s + j]
+    return np.linalg.norm(vel - derivative, axis=1)
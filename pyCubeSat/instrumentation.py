@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+"""Stage timers, call counters, and allocation counters for the hot paths.
+
+Instrumentation is off by default, when every hook costs a flag check. Enable it around a run to see where the
+time goes:
+
+    with instrumentation.profile() as run:
+        Dynamics(field).simulate(30 * 86400)
+    print(run.text())
+    run.save("profile.json")
+
+Statistics are kept per process, so profile parallel runs with a single worker.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict
+import json
+import time
+import tracemalloc
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat')
+
+# State, shared by every hook
+_enabled = False
+_memory = False
+_start = time.perf_counter()
+_stages = {}  # name -> [calls, total, max, peak bytes]
+_counters = {}  # name -> count
+_allocations = {}  # name -> [count, bytes]
+_stack = []  # [traced bytes at entry, highest traced bytes] of each open stage
+
+
+def enable(memory: bool = False):
+    """Turns instrumentation on.
+
+    Args:
+        memory (bool): whether to also trace the peak memory of each stage with tracemalloc, which slows every
+            allocation. Defaults to False.
+    """
+    global _enabled, _memory
+    _enabled = True
+    _memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Turns instrumentation off, keeping the statistics gathered so far."""
+    global _enabled, _memory
+    if _memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _enabled = False
+    _memory = False
+
+
+def is_enabled() -> bool:
+    """Whether instrumentation is on"""
+    return _enabled
+
+
+def reset():
+    """Clears every statistic and restarts the run clock."""
+    global _start
+    _stages.clear()
+    _counters.clear()
+    _allocations.clear()
+    _stack.clear()
+    _start = time.perf_counter()
+
+
+def count(name: str, n: int = 1):
+    """Adds to a counter.
+
+    Args:
+        name (str): the counter.
+        n (int): the amount. Defaults to 1.
+    """
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def allocation(name: str, nbytes: int, n: int = 1):
+    """Records allocations.
+
+    Args:
+        name (str): the allocation site.
+        nbytes (int): the total size of the allocations (bytes).
+        n (int): the number of allocations. Defaults to 1.
+    """
+    if _enabled:
+        entry = _allocations.setdefault(name, [0, 0])
+        entry[0] += n
+        entry[1] += int(nbytes)
+
+
+class _Stage():
+    """Times a block as a named stage"""
+    __slots__ = ('_name', '_start')
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __enter__(self):
+        if _enabled:
+            if _memory:
+                _open()
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if _enabled:
+            _record(self._name, time.perf_counter() - self._start)
+
+
+class _Off():
+    """Does nothing, for stages while instrumentation is off"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_OFF = _Off()
+
+
+def stage(name: str) -> _Stage | _Off:
+    """Times a block as a named stage, e.g. with stage("igrf.field"): ...
+
+    Args:
+        name (str): the stage.
+
+    Returns:
+        _Stage | _Off: the context manager.
+    """
+    return _Stage(name) if _enabled else _OFF
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """Decorates a function to time every call as a named stage.
+
+    Args:
+        name (str): the stage.
+
+    Returns:
+        Callable[[Callable], Callable]: the decorator.
+    """
+    def decorate(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            if _memory:
+                _open()
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def _open():
+    """Starts tracing the peak memory of a stage, handing the peak so far to the enclosing stage."""
+    current, peak = tracemalloc.get_traced_memory()
+    if _stack:
+        _stack[-1][1] = max(_stack[-1][1], peak)
+    tracemalloc.reset_peak()
+    _stack.append([current, current])
+
+
+def _record(name: str, elapsed: float):
+    """Adds a call of a stage."""
+    entry = _stages.setdefault(name, [0, 0.0, 0.0, 0])
+    entry[0] += 1
+    entry[1] += elapsed
+    entry[2] = max(entry[2], elapsed)
+    if _memory and _stack:
+        start, highest = _stack.pop()
+        highest = max(highest, tracemalloc.get_traced_memory()[1])
+        entry[3] = max(entry[3], highest - start)
+        if _stack:
+            _stack[-1][1] = max(_stack[-1][1], highest)
+
+
+def report() -> Dict:
+    """Gathers the statistics of the run so far.
+
+    Returns:
+        Dict: the "wall" time since the last reset (sec), the "stages" with their "calls", "total", "mean", and "max"
+            time (sec), share of the wall time in "percent", and "peak" memory above the stage's entry (bytes) if
+            traced, the "counters", and the "allocations" with their "count" and "bytes".
+    """
+    wall = time.perf_counter() - _start
+    stages = {}
+    for name, (calls, total, longest, peak) in sorted(_stages.items(), key=lambda item: -item[1][1]):
+        stages[name] = {'calls': calls, 'total': total, 'mean': total/calls, 'max': longest,
+                        'percent': 100 * total/wall if wall > 0 else 0.0}
+        if peak:
+            stages[name]['peak'] = peak
+    return {
+        'wall': wall,
+        'stages': stages,
+        'counters': dict(sorted(_counters.items())),
+        'allocations': {name: {'count': n, 'bytes': nbytes} for name, (n, nbytes) in sorted(_allocations.items())},
+    }
+
+
+def format_report(stats: Dict | None = None) -> str:
+    """Formats a report as text tables.
+
+    Args:
+        stats (Dict | None): the report. Defaults to None, the current one.
+
+    Returns:
+        str: the stages by total time, the counters, and the allocations.
+    """
+    stats = report() if stats is None else stats
+    lines = [f"Wall time {stats['wall']:.3f} sec", "",
+             f"{'stage':<32}{'calls':>10}{'total (s)':>12}{'mean (ms)':>12}{'max (ms)':>12}{'%':>8}{'peak (MB)':>12}"]
+    for name, s in stats['stages'].items():
+        peak = f"{s['peak']/1e6:.1f}" if 'peak' in s else ""
+        lines.append(f"{name:<32}{s['calls']:>10}{s['total']:>12.4f}{1e3 * s['mean']:>12.4f}{1e3 * s['max']:>12.4f}"
+                     f"{s['percent']:>8.1f}{peak:>12}")
+    if stats['counters']:
+        lines += ["", f"{'counter':<32}{'count':>10}"]
+        lines += [f"{name:<32}{n:>10}" for name, n in stats['counters'].items()]
+    if stats['allocations']:
+        lines += ["", f"{'allocation':<32}{'count':>10}{'MB':>12}"]
+        lines += [f"{name:<32}{a['count']:>10}{a['bytes']/1e6:>12.1f}" for name, a in stats['allocations'].items()]
+    return "\n".join(lines)
+
+
+def save_report(path: str | Path, stats: Dict | None = None):
+    """Writes a report as JSON.
+
+    Args:
+        path (str | Path): the file.
+        stats (Dict | None): the report. Defaults to None, the current one.
+    """
+    with open(path, 'w') as file:
+        json.dump(report() if stats is None else stats, file, indent=4)
+
+
+class profile():
+    """Instruments a block as one run, e.g. with profile() as run: ..., then run.text() or run.save(path)"""
+    def __init__(self, memory: bool = False):
+        """Sets up the run.
+
+        Args:
+            memory (bool): whether to also trace the peak memory of each stage. Defaults to False.
+        """
+        self._memory = memory
+        self._report = None
+
+    def __enter__(self) -> 'profile':
+        reset()
+        enable(self._memory)
+        return self
+
+    def __exit__(self, *exc):
+        self._report = report()
+        disable()
+        log.info(f"Profiled {self._report['wall']:.3f} sec over {len(self._report['stages'])} stages")
+
+    def text(self) -> str:
+        """Formats the run's report as text tables."""
+        return format_report(self.report)
+
+    def save(self, path: str | Path):
+        """Writes the run's report as JSON."""
+        save_report(path, self.report)
+
+    # Properties
+    @property
+    def report(self) -> Dict:
+        """Report of the run, or of the run so far while it is open"""
+        return report() if self._report is None else self._report
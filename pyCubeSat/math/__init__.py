@@ -1,7 +1,13 @@
 """PMACS helper functions
 """
 
-# __all__
-from .legendre import Legendre
-from .math import Rotation, Quaternion
-__all__ = [Legendre, Rotation, Quaternion]
\ No newline at end of file
+# __all__, imported on first use
+from pyCubeSat._lazy import lazy
+_exports = {
+    'Legendre': ".legendre",
+    'Rotation': ".frames",
+    'Quaternion': ".math",
+    'QuaternionArray': ".quaternion",
+}
+__getattr__, __dir__ = lazy(__name__, _exports)
+__all__ = list(_exports)
\ No newline at end of file
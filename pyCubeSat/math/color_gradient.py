@@ -11,38 +11,63 @@ __maintainer__ = None
 __contact__ = None
 
 # Imports
+from typing import Sequence, Tuple
 import numpy as np
 
 
-def color_gradient(data: np.ndarray) -> np.ndarray:
-    """Given an array, returns the appropriate color gradient
+def color_map(data: np.ndarray,
+              colorscale: Sequence[Tuple[float, Sequence[float]]] = ((0, (255, 0, 0)), (1, (0, 0, 255))),
+              cmin: float | None = None,
+              cmax: float | None = None) -> np.ndarray:
+    """Maps values onto a colorscale.
 
     Args:
         data (np.ndarray): the array of values.
+        colorscale (Sequence[Tuple[float, Sequence[float]]]): increasing levels in [0, 1], each with its rgb color.
+            Defaults to red at the minimum to blue at the maximum.
+        cmin (float | None): the value at level 0. Defaults to None, the minimum of the data.
+        cmax (float | None): the value at level 1. Defaults to None, the maximum of the data.
 
     Returns:
-        np.ndarray: the array of rgb color codes.
+        np.ndarray: the rgb colors, in [0, 255], of shape (N, 3).
     """
+    # Mix between 0 and 1, with constant data at the bottom of the scale
+    data = np.asarray(data, dtype=float).ravel()
+    cmin = np.min(data) if cmin is None else cmin
+    cmax = np.max(data) if cmax is None else cmax
+    span = cmax - cmin
+    mix_lvl = np.clip((data - cmin)/span if span > 0 else np.zeros_like(data), 0, 1)
 
-    # Find min, max, and count of data
-    min = np.min(data)
-    max = np.max(data)
-    num = len(data)
+    # Interpolate each channel between the levels
+    levels = np.array([level for level, _ in colorscale], dtype=float)
+    colors = np.array([color for _, color in colorscale], dtype=float)
+    return np.stack([np.interp(mix_lvl, levels, colors[:, c]) for c in range(3)], axis=-1)
 
-    # Mix between 0 and 1
-    mix_lvl = (data - min)/(max - min)
 
-    # Calculate RGB values
-    r = 255 * np.array([i for i in reversed(mix_lvl)])
-    g = np.zeros(num)
-    b = 255 * mix_lvl
+def color_gradient(data: np.ndarray,
+                   colorscale: Sequence[Tuple[float, Sequence[float]]] = ((0, (255, 0, 0)), (1, (0, 0, 255))),
+                   cmin: float | None = None,
+                   cmax: float | None = None) -> np.ndarray:
+    """Given an array, returns the appropriate color gradient
 
-    # Create gradient
-    gradient = np.empty((len(r), 1), dtype=object)
-    for i in range(num):
-        gradient[i] = (f"rgb({r[i]}, {g[i]}, {b[i]})")
+    Plotting libraries that take numeric colors with a colorscale should be given the data and the colorscale
+    instead, which skips building a string per point.
 
-    return gradient
+    Args:
+        data (np.ndarray): the array of values.
+        colorscale (Sequence[Tuple[float, Sequence[float]]]): increasing levels in [0, 1], each with its rgb color.
+            Defaults to red at the minimum to blue at the maximum.
+        cmin (float | None): the value at level 0. Defaults to None, the minimum of the data.
+        cmax (float | None): the value at level 1. Defaults to None, the maximum of the data.
+
+    Returns:
+        np.ndarray: the array of rgb color codes, of shape (N, 1).
+    """
+    # Format each channel at once
+    rgb = np.rint(color_map(data, colorscale, cmin, cmax)).astype(int).astype(str)
+    gradient = np.char.add(np.char.add(np.char.add(np.char.add(np.char.add(np.char.add(
+        "rgb(", rgb[:, 0]), ", "), rgb[:, 1]), ", "), rgb[:, 2]), ")")
+    return gradient.astype(object)[:, np.newaxis]
 
 
 # Test
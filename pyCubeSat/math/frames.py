@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+"""Batched rotations between the ECI, ECEF, NED, and orbit (LVLH) frames.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from datetime import datetime, timezone
+import numpy as np
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat.math')
+
+# Julian date of 1970-01-01 00:00
+JD_UNIX = 2440587.5
+
+
+def utc(date: datetime) -> datetime:
+    """Converts a date to naive UTC, taking naive dates to already be in UTC.
+
+    Args:
+        date (datetime): the date, naive or timezone-aware.
+
+    Returns:
+        datetime: the naive UTC date.
+    """
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+
+def julian_date(t: np.ndarray, epoch: datetime | None = None) -> np.ndarray:
+    """Converts times to Julian dates.
+
+    Args:
+        t (np.ndarray): datetime64 values, seconds since "epoch", or Julian dates if there is no epoch.
+        epoch (datetime | None): the date that "t" is measured from in seconds, naive dates taken as UTC. Defaults
+            to None.
+
+    Returns:
+        np.ndarray: the Julian dates.
+    """
+    t = np.asarray(t)
+    if np.issubdtype(t.dtype, np.datetime64):
+        return (t - np.datetime64('1970-01-01')) / np.timedelta64(1, 'D') + JD_UNIX
+    if epoch is not None:
+        start = (np.datetime64(utc(epoch), 'us') - np.datetime64('1970-01-01')) / np.timedelta64(1, 'D')
+        return start + JD_UNIX + t.astype(float)/(24 * 60 * 60)
+    return t.astype(float)
+
+
+def gmst(jd: float | np.ndarray) -> np.ndarray:
+    """Computes the Greenwich mean sidereal time with the IAU-82 model.
+
+    Args:
+        jd (float | np.ndarray): UT1 Julian dates.
+
+    Returns:
+        np.ndarray: the rotation angle of the prime meridian, in [0, 2π) (rad).
+    """
+    tut1 = (np.asarray(jd, dtype=float) - 2451545.0)/36525.0
+    sec = (-6.2e-6 * tut1**3 + 0.093104 * tut1**2 + (876600.0 * 3600 + 8640184.812866) * tut1 + 67310.54841)
+    return np.radians(sec/240.0) % (2 * np.pi)
+
+
+class Rotation():
+    """Converts vectors between coordinate frames, caching the Earth rotation matrices of a time grid"""
+    def __init__(self, t: np.ndarray, epoch: datetime | None = None):
+        """Sets the time grid, which may be shared by any number of vector sets.
+
+        Args:
+            t (np.ndarray): datetime64 values, seconds since "epoch", or Julian dates if there is no epoch (N,).
+            epoch (datetime | None): the date that "t" is measured from in seconds. Defaults to None.
+        """
+        self._jd = np.atleast_1d(julian_date(t, epoch))
+        self._cache = {}
+
+    def __len__(self) -> int:
+        return len(self._jd)
+
+    @property
+    def gmst(self) -> np.ndarray:
+        """Greenwich mean sidereal time of each time (rad)"""
+        if 'gmst' not in self._cache:
+            self._cache['gmst'] = gmst(self._jd)
+        return self._cache['gmst']
+
+    @property
+    def eci_to_ecef(self) -> np.ndarray:
+        """Rotations from ECI to ECEF (N, 3, 3), about the pole by GMST"""
+        if 'eci_to_ecef' not in self._cache:
+            c, s = np.cos(self.gmst), np.sin(self.gmst)
+            R = np.zeros((len(self), 3, 3))
+            R[:, 0, 0] = c
+            R[:, 0, 1] = s
+            R[:, 1, 0] = -s
+            R[:, 1, 1] = c
+            R[:, 2, 2] = 1
+            R.flags.writeable = False
+            self._cache['eci_to_ecef'] = R
+        return self._cache['eci_to_ecef']
+
+    @property
+    def ecef_to_eci(self) -> np.ndarray:
+        """Rotations from ECEF to ECI (N, 3, 3)"""
+        return self.eci_to_ecef.transpose(0, 2, 1)
+
+    @staticmethod
+    def ecef_to_ned(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """Builds rotations from ECEF to the local north-east-down frame.
+
+        Args:
+            lat (np.ndarray): geocentric latitudes (deg).
+            lon (np.ndarray): longitudes (deg).
+
+        Returns:
+            np.ndarray: the rotations (N, 3, 3).
+        """
+        lat, lon = np.broadcast_arrays(np.radians(np.atleast_1d(lat)), np.radians(np.atleast_1d(lon)))
+        sp, cp = np.sin(lat), np.cos(lat)
+        sl, cl = np.sin(lon), np.cos(lon)
+        R = np.empty(lat.shape + (3, 3))
+        R[..., 0, :] = np.stack((-sp * cl, -sp * sl, cp), axis=-1)
+        R[..., 1, :] = np.stack((-sl, cl, np.zeros_like(sl)), axis=-1)
+        R[..., 2, :] = np.stack((-cp * cl, -cp * sl, -sp), axis=-1)
+        return R
+
+    @staticmethod
+    def ned_to_ecef(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """Builds rotations from the local north-east-down frame to ECEF (N, 3, 3), see ecef_to_ned."""
+        return Rotation.ecef_to_ned(lat, lon).swapaxes(-1, -2)
+
+    @staticmethod
+    def eci_to_lvlh(pos: np.ndarray, vel: np.ndarray) -> np.ndarray:
+        """Builds rotations from ECI to the local-vertical local-horizontal orbit frame.
+
+        The orbit frame's z axis points to nadir, y against the orbit normal, and x completes the frame, along the
+        velocity for circular orbits.
+
+        Args:
+            pos (np.ndarray): ECI positions (N, 3).
+            vel (np.ndarray): ECI velocities (N, 3).
+
+        Returns:
+            np.ndarray: the rotations (N, 3, 3).
+        """
+        pos, vel = np.atleast_2d(pos), np.atleast_2d(vel)
+        z = -pos/np.linalg.norm(pos, axis=-1, keepdims=True)
+        y = -np.cross(pos, vel)
+        y /= np.linalg.norm(y, axis=-1, keepdims=True)
+        return np.stack((np.cross(y, z), y, z), axis=-2)
+
+    @staticmethod
+    def lvlh_to_eci(pos: np.ndarray, vel: np.ndarray) -> np.ndarray:
+        """Builds rotations from the orbit frame to ECI (N, 3, 3), see eci_to_lvlh."""
+        return Rotation.eci_to_lvlh(pos, vel).swapaxes(-1, -2)
+
+    @staticmethod
+    def apply(R: np.ndarray, v: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """Rotates vectors by stacked rotation matrices in a single pass.
+
+        Args:
+            R (np.ndarray): the rotations (N, 3, 3).
+            v (np.ndarray): the vectors (N, 3), or one vector (3,) for every rotation.
+            out (np.ndarray | None): where to store the rotated vectors (N, 3). Defaults to None, a new array.
+
+        Returns:
+            np.ndarray: the rotated vectors (N, 3).
+        """
+        return np.einsum('nij,nj->ni', R, np.broadcast_to(v, R.shape[:-1]), out=out)
@@ -11,15 +11,111 @@ __maintainer__ = None
 __contact__ = None
 
 # Imports
-from scipy.special import factorial
-from scipy.sp
-
-
-def Legendre(n: float, m: float, x: float, method: str = "") -> float:
-    if method.lower() == "":
-        L = (1 - x**2) * 
-    elif method.lower() == "schmidt"
-        if m == 0:
-            L = (1/(2**n * factorial(n))) * (x**2 - 1)**n
-        else:
-            L = (-1)**m * np.sqrt((2 * factorial(n - m))/factorial(n + m)) * P(n, m, x)
\ No newline at end of file
+from functools import lru_cache
+from typing import Tuple
+import numpy as np
+from scipy.special import gammaln
+
+
+@lru_cache(maxsize=None)
+def _recurrence(N: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Recurrence factors for the Schmidt semi-normalized functions, computed once per degree.
+
+    Args:
+        N (int): the maximum degree.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: the sectoral factors (N+1,) and the two zonal/tesseral factors
+            (N+1, N+1).
+    """
+    n = np.arange(N + 1)[:, None].astype(float)
+    m = np.arange(N + 1)[None, :].astype(float)
+
+    # Sectoral factors, P(n, n) = k(n) sin(θ) P(n-1, n-1)
+    k = np.ones(N + 1)
+    k[1:] = np.sqrt((2 * n[1:, 0] - 1)/(2 * n[1:, 0]))
+
+    # Zonal and tesseral factors, P(n, m) = a(n, m) cos(θ) P(n-1, m) - b(n, m) P(n-2, m)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = np.where(m < n, (2 * n - 1)/np.sqrt(n**2 - m**2), 0)
+        b = np.where(m < n, np.sqrt(np.maximum((n - 1)**2 - m**2, 0)/(n**2 - m**2)), 0)
+
+    # Read-only, these are shared between calls
+    for arr in (k, a, b):
+        arr.flags.writeable = False
+
+    return k, a, b
+
+
+@lru_cache(maxsize=None)
+def _schmidt_norm(N: int) -> np.ndarray:
+    """Schmidt normalization factors sqrt((2 - δ(m, 0)) (n - m)!/(n + m)!), computed once per degree.
+
+    Args:
+        N (int): the maximum degree.
+
+    Returns:
+        np.ndarray: the normalization factors (N+1, N+1), zero where m > n.
+    """
+    n = np.arange(N + 1)[:, None]
+    m = np.arange(N + 1)[None, :]
+    valid = m <= n
+    log_ratio = gammaln(np.where(valid, n - m, 0) + 1) - gammaln(n + m + 1)
+    S = np.where(valid, np.sqrt(np.where(m == 0, 1, 2) * np.exp(log_ratio)), 0)
+    S.flags.writeable = False
+    return S
+
+
+def Legendre(N: int, theta: np.ndarray, method: str = "schmidt") -> Tuple[np.ndarray, np.ndarray]:
+    """Computes every associated Legendre function P(n, m)(cos θ) and its derivative dP(n, m)/dθ up to degree N.
+
+    Args:
+        N (int): the maximum degree.
+        theta (np.ndarray): the co-latitudes (rad).
+        method (str): "schmidt" for Schmidt semi-normalized functions, or "" for unnormalized functions without the
+            Condon-Shortley phase. Defaults to "schmidt".
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: P and dP/dθ, both (N+1, N+1, len(theta)) and zero where m > n.
+    """
+    # Check method
+    method = method.lower()
+    if method not in ("schmidt", ""):
+        raise ValueError(f"Unknown Legendre normalization \"{method}\"")
+
+    # Get recurrence factors
+    k, a, b = _recurrence(N)
+
+    # Allocate
+    theta = np.atleast_1d(np.asarray(theta, dtype=float))
+    x = np.cos(theta)
+    s = np.sin(theta)
+    P = np.zeros((N + 1, N + 1, len(theta)))
+    dP = np.zeros_like(P)
+
+    # Seed degrees 0 and 1
+    P[0, 0] = 1
+    if N > 0:
+        P[1, 0] = x
+        dP[1, 0] = -s
+        P[1, 1] = s
+        dP[1, 1] = x
+
+    # Recur one degree at a time, all orders at once
+    for n in range(2, N + 1):
+        an = a[n, :n, None]
+        bn = b[n, :n, None]
+        P[n, :n] = an * x * P[n - 1, :n] - bn * P[n - 2, :n]
+        dP[n, :n] = an * (x * dP[n - 1, :n] - s * P[n - 1, :n]) - bn * dP[n - 2, :n]
+        P[n, n] = k[n] * s * P[n - 1, n - 1]
+        dP[n, n] = k[n] * (s * dP[n - 1, n - 1] + x * P[n - 1, n - 1])
+
+    # Remove normalization
+    if method == "":
+        S = _schmidt_norm(N)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.where(S > 0, 1/S, 0)[..., None]
+        P *= scale
+        dP *= scale
+
+    return P, dP
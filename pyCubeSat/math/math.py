@@ -16,12 +16,6 @@ import numpy as np
 from scipy.spatial.transform import Rotation as R
 
 
-class Rotation():
-    """Converts between different coordinate frames"""
-    def Earth_to_Stuff(x, y, z):
-        return
-
-
 class Quaternion():
     """Exchanges between quaternion and Euler angles.
     """
@@ -50,7 +44,7 @@ class Quaternion():
         Returns:
             Tuple[float, float, float, float]: the quaternions.
         """
-        return R.from_euler('xyz', np.array(theta, alpha, psi), False).as_quat(True)
+        return R.from_euler('xyz', np.array([theta, alpha, psi]), False).as_quat(True)
 
 
 # Test
@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+"""Arrays of quaternions backed by a single contiguous buffer.
+
+Quaternions are scalar first, (w, x, y, z), and rotate vectors actively, v' = q v q*, matching the body-to-inertial
+attitude of the PMACS dynamics.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from typing import Tuple
+import numpy as np
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat.math')
+
+# Hamilton product terms, (p index, q index, sign) for each output component
+_PRODUCT = (((0, 0, 1), (1, 1, -1), (2, 2, -1), (3, 3, -1)),
+            ((0, 1, 1), (1, 0, 1), (2, 3, 1), (3, 2, -1)),
+            ((0, 2, 1), (1, 3, -1), (2, 0, 1), (3, 1, 1)),
+            ((0, 3, 1), (1, 2, 1), (2, 1, -1), (3, 0, 1)))
+
+# Axes of each component of a cross product, (a x b)[c] = a[j] b[k] - a[k] b[j]
+_CROSS = ((1, 2), (2, 0), (0, 1))
+
+# Axis indices of Euler angle sequences
+_AXES = {'x': 0, 'y': 1, 'z': 2}
+
+
+class QuaternionArray():
+    """N quaternions stored as one contiguous (N, 4) float64 buffer"""
+    def __init__(self, q: np.ndarray, copy: bool = True):
+        """Wraps quaternions, scalar first.
+
+        Args:
+            q (np.ndarray): the quaternions (N, 4), or a single quaternion (4,).
+            copy (bool): whether to copy q. Defaults to True. Without a copy, a contiguous float64 q is used as the
+                buffer directly, so in-place operations write through to it.
+
+        Raises:
+            ValueError: if q is not shaped (N, 4).
+        """
+        q = np.array(q, dtype=np.float64, copy=copy or None, order='C', ndmin=2)
+        if q.ndim != 2 or q.shape[1] != 4:
+            raise ValueError(f"Quaternions must be shaped (N, 4), got {q.shape}")
+        self._q = q
+        self._work = None
+
+    @classmethod
+    def identity(cls, n: int) -> 'QuaternionArray':
+        """Creates n identity quaternions."""
+        q = np.zeros((n, 4))
+        q[:, 0] = 1
+        return cls(q, copy=False)
+
+    @classmethod
+    def from_axis_angle(cls, axis: np.ndarray, angle: np.ndarray) -> 'QuaternionArray':
+        """Creates rotations about axes.
+
+        Args:
+            axis (np.ndarray): the rotation axes (N, 3), normalized here.
+            angle (np.ndarray): the rotation angles (N,) (rad).
+
+        Returns:
+            QuaternionArray: the rotations.
+        """
+        axis = np.atleast_2d(np.asarray(axis, dtype=float))
+        half = np.asarray(angle, dtype=float).reshape(-1, 1)/2
+        axis = np.sin(half) * axis/np.linalg.norm(axis, axis=1, keepdims=True)
+        q = np.empty((len(axis), 4))
+        q[:, 0] = np.broadcast_to(np.cos(half[:, 0]), len(axis))
+        q[:, 1:] = axis
+        return cls(q, copy=False)
+
+    @classmethod
+    def from_euler(cls, angles: np.ndarray, seq: str = "xyz", degrees: bool = False) -> 'QuaternionArray':
+        """Creates rotations from Tait-Bryan angles.
+
+        Args:
+            angles (np.ndarray): the angles (N, 3).
+            seq (str): the axis sequence, lowercase for extrinsic (fixed axes) or uppercase for intrinsic (rotating
+                axes), as in scipy. Defaults to "xyz".
+            degrees (bool): whether the angles are in degrees. Defaults to False.
+
+        Returns:
+            QuaternionArray: the rotations.
+        """
+        intrinsic, axes = _sequence(seq)
+        angles = np.atleast_2d(np.asarray(angles, dtype=float))
+        if degrees:
+            angles = np.radians(angles)
+
+        # Compose elementary rotations, later extrinsic rotations apply on the left
+        q = None
+        for k in (range(3) if intrinsic else reversed(range(3))):
+            e = np.zeros((len(angles), 4))
+            e[:, 0] = np.cos(angles[:, k]/2)
+            e[:, 1 + axes[k]] = np.sin(angles[:, k]/2)
+            q = cls(e, copy=False) if q is None else q.multiply(cls(e, copy=False), out=q)
+        return q
+
+    @classmethod
+    def from_dcm(cls, R: np.ndarray) -> 'QuaternionArray':
+        """Creates rotations from direction cosine matrices with Shepperd's method.
+
+        Args:
+            R (np.ndarray): the rotation matrices (N, 3, 3), where v' = R v.
+
+        Returns:
+            QuaternionArray: the rotations, with non-negative scalar parts.
+        """
+        R = np.asarray(R, dtype=float).reshape(-1, 3, 3)
+        trace = np.trace(R, axis1=1, axis2=2)
+
+        # Pick the largest component of each quaternion to divide by
+        diag = np.stack((trace, R[:, 0, 0], R[:, 1, 1], R[:, 2, 2]), axis=1)
+        k = np.argmax(diag, axis=1)
+        s = np.sqrt(np.maximum(1 + 2 * diag[np.arange(len(R)), k] - trace, 0)) * 2
+        q = np.empty((len(R), 4))
+
+        # Scalar largest
+        m = k == 0
+        q[m] = np.stack((s[m]/4, (R[m, 2, 1] - R[m, 1, 2])/s[m], (R[m, 0, 2] - R[m, 2, 0])/s[m],
+                         (R[m, 1, 0] - R[m, 0, 1])/s[m]), axis=1)
+
+        # A vector component largest
+        for i in range(3):
+            j, l = (i + 1) % 3, (i + 2) % 3
+            m = k == i + 1
+            q[m, 0] = (R[m, l, j] - R[m, j, l])/s[m]
+            q[m, 1 + i] = s[m]/4
+            q[m, 1 + j] = (R[m, j, i] + R[m, i, j])/s[m]
+            q[m, 1 + l] = (R[m, l, i] + R[m, i, l])/s[m]
+
+        q[q[:, 0] < 0] *= -1
+        return cls(q, copy=False)
+
+    def __len__(self) -> int:
+        return len(self._q)
+
+    def __getitem__(self, k) -> 'QuaternionArray':
+        return QuaternionArray(self._q[k], copy=False)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return self._q if dtype is None else self._q.astype(dtype)
+
+    def __repr__(self) -> str:
+        return f"QuaternionArray({self._q!r})"
+
+    def __mul__(self, other: 'QuaternionArray') -> 'QuaternionArray':
+        return self.multiply(other)
+
+    def __imul__(self, other: 'QuaternionArray') -> 'QuaternionArray':
+        return self.multiply(other, out=self)
+
+    def _scratch(self, n: int) -> np.ndarray:
+        """Reusable (n, 5) work buffer, so in-place products and rotations do not allocate."""
+        if self._work is None or len(self._work) != n:
+            self._work = np.empty((n, 5))
+        return self._work
+
+    def multiply(self, other: 'QuaternionArray', out: 'QuaternionArray | None' = None) -> 'QuaternionArray':
+        """Computes the Hamilton product self * other, i.e. other's rotation followed by self's.
+
+        Args:
+            other (QuaternionArray): the right-hand quaternions, N or 1.
+            out (QuaternionArray | None): where to store the product, e.g. self for an in-place product. Defaults to
+                None, a new array.
+
+        Returns:
+            QuaternionArray: the product.
+        """
+        p = self._q
+        q = other._q if isinstance(other, QuaternionArray) else np.atleast_2d(np.asarray(other, dtype=float))
+        n = max(len(p), len(q))
+        if out is None:
+            out = QuaternionArray(np.empty((n, 4)), copy=False)
+
+        # Accumulate each component in the work buffer, then copy, since out may alias an input
+        work = out._scratch(n)
+        tmp = work[:, 4]
+        for c, terms in enumerate(_PRODUCT):
+            acc = work[:, c]
+            (a, b, _), *rest = terms
+            np.multiply(p[:, a], q[:, b], out=acc)
+            for a, b, sign in rest:
+                np.multiply(p[:, a], q[:, b], out=tmp)
+                (np.add if sign > 0 else np.subtract)(acc, tmp, out=acc)
+        out._q[...] = work[:, :4]
+        return out
+
+    def conjugate(self, out: 'QuaternionArray | None' = None) -> 'QuaternionArray':
+        """Computes the conjugates, which are the inverses of unit quaternions.
+
+        Args:
+            out (QuaternionArray | None): where to store the conjugates, e.g. self. Defaults to None, a new array.
+
+        Returns:
+            QuaternionArray: the conjugates.
+        """
+        if out is None:
+            out = QuaternionArray(self._q)
+        elif out is not self:
+            out._q[...] = self._q
+        np.negative(out._q[:, 1:], out=out._q[:, 1:])
+        return out
+
+    def norm(self) -> np.ndarray:
+        """Computes the quaternion norms (N,)."""
+        return np.sqrt(np.einsum('ij,ij->i', self._q, self._q))
+
+    def normalize(self, out: 'QuaternionArray | None' = None) -> 'QuaternionArray':
+        """Scales the quaternions to unit norm.
+
+        Args:
+            out (QuaternionArray | None): where to store the unit quaternions, e.g. self. Defaults to None, a new
+                array.
+
+        Returns:
+            QuaternionArray: the unit quaternions.
+        """
+        if out is None:
+            out = QuaternionArray(np.empty_like(self._q), copy=False)
+        work = out._scratch(len(self))
+        norm = work[:, 4]
+        np.einsum('ij,ij->i', self._q, self._q, out=norm)
+        np.sqrt(norm, out=norm)
+        np.divide(self._q, norm[:, None], out=out._q)
+        return out
+
+    def rotate(self, v: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """Rotates vectors by the unit quaternions, v' = q v q*.
+
+        Args:
+            v (np.ndarray): the vectors (N, 3), or one vector (3,) for every quaternion.
+            out (np.ndarray | None): where to store the rotated vectors (N, 3), which may be v. Defaults to None, a
+                new array.
+
+        Returns:
+            np.ndarray: the rotated vectors (N, 3).
+        """
+        v = np.asarray(v, dtype=float)
+        q = self._q
+        n = len(q) if v.ndim == 1 else max(len(q), len(v))
+        if out is None:
+            out = np.empty((n, 3))
+
+        # t = 2 u x v in the work buffer, with u the vector part
+        work = self._scratch(n)
+        t, tmp, term = work[:, :3], work[:, 3], work[:, 4]
+        for c, (j, k) in enumerate(_CROSS):
+            np.multiply(q[:, 1 + j], v[..., k], out=t[:, c])
+            np.multiply(q[:, 1 + k], v[..., j], out=tmp)
+            np.subtract(t[:, c], tmp, out=t[:, c])
+            np.multiply(t[:, c], 2.0, out=t[:, c])
+
+        # v' = v + w t + u x t, one component at a time, each only reading its own component of v so out may be v
+        for c, (j, k) in enumerate(_CROSS):
+            np.multiply(q[:, 1 + j], t[:, k], out=tmp)
+            np.multiply(q[:, 1 + k], t[:, j], out=term)
+            np.subtract(tmp, term, out=tmp)
+            np.multiply(q[:, 0], t[:, c], out=term)
+            np.add(tmp, term, out=tmp)
+            np.add(tmp, v[..., c], out=out[:, c])
+        return out
+
+    def slerp(self, other: 'QuaternionArray', t: float | np.ndarray) -> 'QuaternionArray':
+        """Spherically interpolates between unit quaternions along the shortest arc.
+
+        Args:
+            other (QuaternionArray): the end quaternions, N or 1.
+            t (float | np.ndarray): the interpolation fractions, scalar or (N,), 0 at self and 1 at other.
+
+        Returns:
+            QuaternionArray: the interpolated quaternions.
+        """
+        p = self._q
+        q = other._q.copy()
+        t = np.asarray(t, dtype=float).reshape(-1, 1)
+
+        # Take the shortest arc
+        dot = np.sum(p * q, axis=1, keepdims=True)
+        q = np.where(dot < 0, -q, q)
+        dot = np.abs(dot)
+
+        # Fall back to normalized linear interpolation for nearly parallel quaternions
+        theta = np.arccos(np.clip(dot, -1, 1))
+        sin = np.sin(theta)
+        small = sin < 1e-10
+        sin = np.where(small, 1, sin)
+        a = np.where(small, 1 - t, np.sin((1 - t) * theta)/sin)
+        b = np.where(small, t, np.sin(t * theta)/sin)
+        return QuaternionArray(a * p + b * q, copy=False).normalize(out=None)
+
+    def to_dcm(self, out: np.ndarray | None = None) -> np.ndarray:
+        """Converts unit quaternions to direction cosine matrices.
+
+        Args:
+            out (np.ndarray | None): where to store the matrices (N, 3, 3). Defaults to None, a new array.
+
+        Returns:
+            np.ndarray: the rotation matrices (N, 3, 3), where v' = R v.
+        """
+        if out is None:
+            out = np.empty((len(self), 3, 3))
+        w, x, y, z = self._q.T
+        out[:, 0, 0] = 1 - 2 * (y * y + z * z)
+        out[:, 0, 1] = 2 * (x * y - w * z)
+        out[:, 0, 2] = 2 * (x * z + w * y)
+        out[:, 1, 0] = 2 * (x * y + w * z)
+        out[:, 1, 1] = 1 - 2 * (x * x + z * z)
+        out[:, 1, 2] = 2 * (y * z - w * x)
+        out[:, 2, 0] = 2 * (x * z - w * y)
+        out[:, 2, 1] = 2 * (y * z + w * x)
+        out[:, 2, 2] = 1 - 2 * (x * x + y * y)
+        return out
+
+    def to_euler(self, seq: str = "xyz", degrees: bool = False) -> np.ndarray:
+        """Converts unit quaternions to Tait-Bryan angles.
+
+        Args:
+            seq (str): the axis sequence, lowercase for extrinsic or uppercase for intrinsic, as in scipy. Defaults to
+                "xyz".
+            degrees (bool): whether to return degrees. Defaults to False.
+
+        Returns:
+            np.ndarray: the angles (N, 3), the middle one within ±90°.
+        """
+        intrinsic, axes = _sequence(seq)
+        if not intrinsic:
+            axes = axes[::-1]
+        i, j, k = axes
+        sign = 1 if (j - i) % 3 == 1 else -1
+        R = self.to_dcm()
+
+        # Angles of the intrinsic sequence R = R_i(a) R_j(b) R_k(c)
+        angles = np.stack((np.arctan2(-sign * R[:, j, k], R[:, k, k]),
+                           np.arcsin(np.clip(sign * R[:, i, k], -1, 1)),
+                           np.arctan2(-sign * R[:, i, j], R[:, i, i])), axis=1)
+        if not intrinsic:
+            angles = angles[:, ::-1]
+        return np.degrees(angles) if degrees else angles
+
+    # Properties
+    @property
+    def array(self) -> np.ndarray:
+        """Quaternion buffer (N, 4), scalar first"""
+        return self._q
+
+    @property
+    def w(self) -> np.ndarray:
+        """Scalar parts (N,)"""
+        return self._q[:, 0]
+
+    @property
+    def xyz(self) -> np.ndarray:
+        """Vector parts (N, 3)"""
+        return self._q[:, 1:]
+
+
+def _sequence(seq: str) -> Tuple[bool, Tuple[int, int, int]]:
+    """Parses a Tait-Bryan sequence into whether it is intrinsic and its axis indices."""
+    if len(seq) != 3 or not (seq.islower() or seq.isupper()) or len(set(seq.lower())) != 3 or \
+            not set(seq.lower()) <= set(_AXES):
+        raise ValueError(f"Expected a Tait-Bryan sequence of three distinct axes, got \"{seq}\"")
+    return seq.isupper(), tuple(_AXES[c] for c in seq.lower())
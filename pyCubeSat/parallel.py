@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""Process-pool helpers that return results through shared memory.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Tuple
+import numpy as np
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat')
+
+
+class SharedArray():
+    """NumPy array backed by shared memory, which worker processes attach to by name instead of pickling"""
+    def __init__(self, shape: Tuple[int, ...], dtype: np.dtype = np.float64, name: str | None = None):
+        """Creates a zeroed shared array, or attaches to an existing one.
+
+        Args:
+            shape (Tuple[int, ...]): the array shape.
+            dtype (np.dtype): the array type. Defaults to np.float64.
+            name (str | None): the name of an existing block to attach to. Defaults to None, creating a new one.
+        """
+        self._shape = tuple(shape)
+        self._dtype = np.dtype(dtype)
+        size = max(int(np.prod(self._shape)) * self._dtype.itemsize, 1)
+        self._owner = name is None
+        self._shm = SharedMemory(name=name, create=self._owner, size=size)
+
+        # Only the creating process cleans the block up, so keep the attaching processes' trackers out of it
+        if not self._owner:
+            try:
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+            except Exception:
+                pass
+
+        self._array = np.ndarray(self._shape, dtype=self._dtype, buffer=self._shm.buf)
+        if self._owner:
+            self._array.fill(0)
+
+    def __reduce__(self):
+        # Pickle as a reference to the block
+        return (SharedArray, (self._shape, self._dtype, self._shm.name))
+
+    def __enter__(self) -> 'SharedArray':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Detaches from the block, and frees it if this process created it."""
+        self._array = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    # Properties
+    @property
+    def array(self) -> np.ndarray:
+        """The shared array"""
+        return self._array
+
+    @property
+    def name(self) -> str:
+        """The shared memory block name"""
+        return self._shm.name
+
+
+def map_shards(func: Callable[[int, int], None],
+               n: int,
+               shard_size: int,
+               workers: int | None = None,
+               initializer: Callable | None = None,
+               initargs: tuple = (),
+               progress: Callable[[int, int], None] | None = None):
+    """Runs func(start, stop) over contiguous shards of range(n), across a process pool.
+
+    func should write its results into shared memory, e.g. a SharedArray passed through initargs. Results therefore
+    land in place regardless of the order the shards finish in.
+
+    Args:
+        func (Callable[[int, int], None]): the shard function, must be importable by the worker processes.
+        n (int): the number of items.
+        shard_size (int): the number of items per shard.
+        workers (int | None): the number of processes. Defaults to None, one per core. 1 runs in this process.
+        initializer (Callable | None): called once in each worker before any shard. Defaults to None.
+        initargs (tuple): arguments for the initializer. Defaults to ().
+        progress (Callable[[int, int], None] | None): called with the number of items done and the total as shards
+            finish. Defaults to None.
+    """
+    shards = [(start, min(start + shard_size, n)) for start in range(0, n, shard_size)]
+    workers = min(workers or os.cpu_count() or 1, max(len(shards), 1))
+    done = 0
+
+    # Run in this process
+    if workers == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for start, stop in shards:
+            func(start, stop)
+            done += stop - start
+            if progress is not None:
+                progress(done, n)
+        return
+
+    # Run across a pool
+    log.info(f"Running {len(shards)} shards on {workers} processes")
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        futures = {pool.submit(func, start, stop): stop - start for start, stop in shards}
+        for future in as_completed(futures):
+            future.result()
+            done += futures[future]
+            if progress is not None:
+                progress(done, n)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""Orbital trade-study sweeps across a process pool.
+"""
+__author__ = "Justin Panchula"
+__copyright__ = "Copyright 2024 UC CubeCats"
+__credits__ = ["Justin Panchula"]
+__license__ = "MIT"
+__version__ = "0.1.0"
+__status__ = "Production"
+__maintainer__ = None
+__contact__ = None
+
+# Imports
+from datetime import datetime
+from typing import Callable, Dict
+import numpy as np
+
+# Custom packages
+from pyCubeSat.Orbit import EarthOrbit
+from pyCubeSat.PMACS.IGRF import igrf_iter
+from pyCubeSat.PMACS.IGRF.coefficients import rate_tables
+from pyCubeSat.parallel import SharedArray, map_shards
+
+# Logging
+import logging
+log = logging.getLogger('pyCubeSat')
+
+# Metrics computed for every grid point
+METRICS = ("T", "lat_max", "B_min", "B_mean", "B_max")
+
+# Worker state, set once per process by _init
+_state = {}
+
+
+def _init(points: np.ndarray, results: SharedArray, t: float | datetime, days: float, step: float):
+    """Initializes a worker: loads the IGRF coefficients and attaches to the results.
+
+    Args:
+        points (np.ndarray): the (altitude, inclination, eccentricity) of every grid point (P, 3).
+        results (SharedArray): the shared results (P, len(METRICS)).
+        t (float | datetime): the decimal year or date at the start of the tracks.
+        days (float): the number of days to evaluate.
+        step (float): the time between samples (sec).
+    """
+    rate_tables()
+    _state.update(points=points, results=results, t=t, days=days, step=step)
+
+
+def _evaluate(start: int, stop: int):
+    """Evaluates a shard of grid points, writing their metrics into the shared results.
+
+    Args:
+        start (int): the first grid point.
+        stop (int): one past the last grid point.
+    """
+    results = _state['results'].array
+    for k in range(start, stop):
+        Ap, i, e = _state['points'][k]
+        orbit = EarthOrbit(Ap=Ap, e=e, i=i)
+
+        # Stream the track, accumulating field magnitude statistics
+        count = 0
+        total = 0.0
+        lat_max = 0.0
+        B_min = np.inf
+        B_max = -np.inf
+        chunks = orbit.iter_ground_track(_state['days'], step=_state['step'])
+        for chunk in igrf_iter(chunks, _state['t']):
+            B = np.sqrt(chunk['Br']**2 + chunk['Btheta']**2 + chunk['Bphi']**2)
+            count += len(B)
+            total += np.sum(B)
+            B_min = min(B_min, np.min(B))
+            B_max = max(B_max, np.max(B))
+            lat_max = max(lat_max, np.max(np.abs(chunk['lat'])))
+
+        results[k] = (orbit.T, lat_max, B_min, total/count, B_max)
+
+
+def sweep(altitudes: np.ndarray,
+          inclinations: np.ndarray,
+          eccentricities: np.ndarray = (0.0,),
+          t: float | datetime = 2024.0,
+          days: float = 1.0,
+          step: float = 60.0,
+          workers: int | None = None,
+          shard_size: int = 4,
+          progress: Callable[[int, int], None] | None = None) -> Dict[str, np.ndarray]:
+    """Evaluates the ground track and geomagnetic field exposure over an altitude x inclination x eccentricity grid.
+
+    Grid points are sharded across a process pool. Every worker loads the IGRF coefficients once, and writes its
+    metrics directly into shared memory at the point's grid position, so the results do not depend on the order that
+    shards finish in.
+
+    Args:
+        altitudes (np.ndarray): altitudes of periapsis (km).
+        inclinations (np.ndarray): inclinations (deg).
+        eccentricities (np.ndarray): eccentricities. Defaults to circular orbits only.
+        t (float | datetime): the decimal year or date at the start of the tracks. Defaults to 2024.0.
+        days (float): the number of days to evaluate. Defaults to 1.
+        step (float): the time between samples (sec). Defaults to 60.
+        workers (int | None): the number of processes. Defaults to None, one per core.
+        shard_size (int): the number of grid points per task. Defaults to 4.
+        progress (Callable[[int, int], None] | None): called with the number of grid points done and the total.
+            Defaults to None, logging progress.
+
+    Returns:
+        Dict[str, np.ndarray]: the grid coordinates "Ap", "i", and "e", and the metrics "T" (sec), "lat_max" (deg),
+            "B_min", "B_mean", and "B_max" (nT), each shaped (altitudes, inclinations, eccentricities).
+    """
+    # Build grid
+    grid = np.meshgrid(altitudes, inclinations, eccentricities, indexing='ij')
+    shape = grid[0].shape
+    points = np.stack([g.ravel() for g in grid], axis=1).astype(float)
+    log.info(f"Sweeping {len(points)} orbits")
+
+    # Default progress report
+    if progress is None:
+        def progress(done: int, total: int):
+            log.info(f"Sweep {done}/{total} orbits")
+
+    # Evaluate into shared memory
+    with SharedArray((len(points), len(METRICS))) as results:
+        map_shards(_evaluate, len(points), shard_size, workers,
+                   initializer=_init, initargs=(points, results, t, days, step), progress=progress)
+        out = {key: results.array[:, k].reshape(shape).copy() for k, key in enumerate(METRICS)}
+
+    return {'Ap': grid[0], 'i': grid[1], 'e': grid[2], **out}
@@ -26,7 +26,9 @@ with open("requirements.txt", 'r', encoding='utf-16') as f:
 extras_require = {}
 
 # Package Data
-package_data = {}
+package_data = {
+    "pyCubeSat.PMACS.IGRF": ["IGRF13.csv"],
+}
 
 # Get README
 with open("requirements.txt", 'r') as f:
@@ -50,6 +52,7 @@ setuptools.setup(
     long_description=readme,
     long_description_content_type='text/x-rst',
     include_package_data=True,
+    package_data=package_data,
     install_requires=requirements,
     extras_require=extras_require,
     python_requires='>=3.12.0',
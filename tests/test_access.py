@@ -0,0 +1,53 @@
+# Imports
+import numpy as np
+import pytest
+from pyCubeSat.Orbit import EarthOrbit, access_windows
+from pyCubeSat.Orbit.access import _sin_elevation
+
+# Stations spread over the globe
+rng = np.random.default_rng(0)
+LAT = rng.uniform(-70, 70, 12)
+LON = rng.uniform(-180, 180, 12)
+MASK = rng.uniform(0, 15, 12)
+
+
+def test_access_windows():
+    orbit = EarthOrbit()
+    passes = access_windows(orbit, 0.5, LAT, LON, MASK)
+    assert len(passes) > 0 and np.all(np.diff(passes['rise']) >= 0)
+    assert np.all(passes['set'] > passes['rise']) and np.all(passes['elevation'] > MASK[passes['station']])
+
+    # Matches the elevation sampled densely at every station
+    t = np.arange(0, 0.5 * 86400, 1.0)
+    for j in range(len(LAT)):
+        up = np.array([np.cos(np.radians(LAT[j])) * np.cos(np.radians(LON[j])),
+                       np.cos(np.radians(LAT[j])) * np.sin(np.radians(LON[j])), np.sin(np.radians(LAT[j]))])
+        visible = _sin_elevation(orbit, t, np.tile(orbit.R * up, (len(t), 1)), np.tile(up, (len(t), 1)))
+        visible = visible > np.sin(np.radians(MASK[j]))
+        windows = passes[passes['station'] == j]
+        found = np.zeros(len(t), dtype=bool)
+        for rise, set in zip(windows['rise'], windows['set']):
+            found |= (t >= rise) & (t < set)
+        assert np.array_equal(found, visible)
+
+
+def test_short_passes():
+    # Passes shorter than the bracketing step are still found, at the same times
+    orbit = EarthOrbit()
+    fine = access_windows(orbit, 1, LAT, LON, 30, step=10)
+    coarse = access_windows(orbit, 1, LAT, LON, 30, step=600)
+    assert np.min(fine['set'] - fine['rise']) < 600
+    assert np.array_equal(fine['station'], coarse['station'])
+    assert np.allclose(fine['rise'], coarse['rise'], atol=0.01) and np.allclose(fine['set'], coarse['set'], atol=0.01)
+
+    # Unreachable stations and bad masks
+    assert len(access_windows(EarthOrbit(i=10), 1, [80.0], [0.0])) == 0
+    with pytest.raises(ValueError):
+        access_windows(orbit, 1, LAT, LON, 90)
+    with pytest.raises(ValueError):
+        access_windows(orbit, 1, LAT, LON[:3])
+
+
+# Test
+if __name__ == '__main__':
+    print(access_windows(EarthOrbit(), 1, LAT, LON, MASK))
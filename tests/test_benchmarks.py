@@ -0,0 +1,27 @@
+# Imports
+import json
+from benchmarks.bench import compare, main, run, table
+
+
+def test_run(tmp_path):
+    results = run("frames.ecef_to_ned", quick=True, repeat=1, min_time=0.001)
+    assert [r['size'] for r in results] == [1000, 10000]
+    assert results[0]['slope'] is None and results[1]['slope'] is not None
+    assert all(0 < r['best'] <= r['median'] for r in results)
+    assert "frames.ecef_to_ned" in table(results)
+
+    # Slower cases are flagged against a baseline
+    baseline = [{**r, 'median': r['median']/2} for r in results]
+    assert compare(results, baseline).count("REGRESSION") == 2
+    assert "REGRESSION" not in compare(results, results)
+
+    # Results are saved for later comparisons
+    path = tmp_path / "results.json"
+    main(["-k", "quaternion.to_dcm", "--quick", "--repeat", "1", "--json", str(path)])
+    saved = json.loads(path.read_text())
+    assert saved['metadata']['numpy'] and len(saved['results']) == 2
+
+
+# Test
+if __name__ == '__main__':
+    print(table(run(quick=True)))
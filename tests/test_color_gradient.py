@@ -0,0 +1,24 @@
+# Imports
+import numpy as np
+from pyCubeSat.math.color_gradient import color_gradient, color_map
+
+
+def test_color_gradient():
+    gradient = color_gradient(np.array([10.0, 50.0, 90.0]))
+    assert gradient.shape == (3, 1)
+    assert list(gradient[:, 0]) == ["rgb(255, 0, 0)", "rgb(128, 0, 128)", "rgb(0, 0, 255)"]
+
+    # Colors follow the values, not their order
+    assert list(color_gradient(np.array([90.0, 10.0]))[:, 0]) == ["rgb(0, 0, 255)", "rgb(255, 0, 0)"]
+    assert list(color_gradient(np.full(2, 5.0))[:, 0]) == ["rgb(255, 0, 0)"] * 2
+
+
+def test_color_map():
+    scale = [(0, (0, 0, 0)), (0.5, (255, 0, 0)), (1, (255, 255, 255))]
+    rgb = color_map(np.array([-1.0, 0.0, 0.25, 1.0, 2.0]), scale, cmin=0, cmax=1)
+    assert np.allclose(rgb, [[0, 0, 0], [0, 0, 0], [127.5, 0, 0], [255, 255, 255], [255, 255, 255]])
+
+
+# Test
+if __name__ == '__main__':
+    print(color_gradient(np.linspace(10, 90, 100)))
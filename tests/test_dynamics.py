@@ -0,0 +1,103 @@
+# Imports
+from datetime import datetime
+import numpy as np
+import pytest
+from scipy.spatial.transform import Rotation
+from pyCubeSat.Orbit import EarthOrbit
+from pyCubeSat.PMACS.Dynamics import Dynamics, Ensemble, OrbitField
+from pyCubeSat.PMACS.IGRF import igrf_field
+
+# Shared field table
+FIELD = OrbitField(EarthOrbit(), datetime(2024, 1, 1), 0.25)
+
+
+def test_orbit_field():
+    # Interpolated field matches IGRF-13 between the samples
+    orbit = EarthOrbit()
+    t = np.linspace(0, 6 * 3600, 97) + 3.7
+    pos, _ = orbit.propagate(t)
+    r = np.linalg.norm(pos, axis=1)
+    _, Br, Bt, Bp = igrf_field(r, np.arccos(pos[:, 2]/r), np.arctan2(pos[:, 1], pos[:, 0]) - orbit.W * t, t,
+                               epoch=datetime(2024, 1, 1))
+    b, db = FIELD(t)
+    assert np.allclose(np.linalg.norm(b, axis=1), 1e-9 * np.sqrt(Br**2 + Bt**2 + Bp**2), rtol=1e-4)
+    assert np.allclose(FIELD.lookup(t[5]), np.concatenate((b[5], db[5])))
+
+    # The radial component is unchanged by the rotation into the inertial frame
+    assert np.allclose(np.einsum('ij,ij->i', b, pos/r[:, None]), 1e-9 * Br, rtol=1e-3, atol=1e-10)
+
+
+def test_torque_free():
+    dynamics = Dynamics(FIELD, magnet=(0, 0, 0), rods=())
+    y0 = dynamics.initial_state(w=(0.05, 0.3, 0.02))
+    fixed = dynamics.simulate(300, y0, dt=0.1, output_step=10)
+    adaptive = dynamics.simulate(300, y0, output_step=10, method="rk45", rtol=1e-9, atol=1e-12)
+    assert fixed['q'].shape == (31, 4) and fixed['B'].shape == (31, 0)
+    assert np.allclose(fixed['w'], adaptive['w'], atol=1e-10)
+    assert np.allclose(fixed['q'], adaptive['q'], atol=1e-6)
+
+    # Inertial angular momentum is conserved
+    for states in (fixed, adaptive):
+        h = Rotation.from_quat(states['q'][:, [1, 2, 3, 0]]).apply(states['w'] * dynamics.inertia)
+        assert np.allclose(h, h[0], atol=1e-11)
+
+
+def test_detumble():
+    # Oversized rods damp the rotational energy
+    dynamics = Dynamics(FIELD, rod_volume=2e-6)
+    states = dynamics.simulate(2 * 3600, output_step=60, method="rk45")
+    energy = 0.5 * np.sum(states['w']**2 * dynamics.inertia, axis=1)
+    assert energy[-1] < 0.5 * energy[0]
+    assert np.allclose(np.linalg.norm(states['q'], axis=1), 1)
+    with pytest.raises(ValueError):
+        dynamics.simulate(60, method="euler")
+    with pytest.raises(ValueError):
+        dynamics.simulate(86400)
+
+
+def _pointing_error(states: dict, magnet: np.ndarray) -> np.ndarray:
+    """Angle between the magnet and the field along a trajectory (deg)"""
+    m = Rotation.from_quat(states['q'][:, [1, 2, 3, 0]]).apply(magnet/np.linalg.norm(magnet))
+    b = np.array([FIELD.lookup(t)[:3] for t in states['t']])
+    return np.degrees(np.arccos(np.clip(np.sum(m * b, axis=1)/np.linalg.norm(b, axis=1), -1, 1)))
+
+
+def test_ensemble():
+    # Members aligned with the field, 30° off it, spinning, and without a magnet
+    dynamics = Dynamics(FIELD)
+    u = np.asarray(dynamics.magnet)/np.linalg.norm(dynamics.magnet)
+    b = FIELD.lookup(0.0)[:3]/np.linalg.norm(FIELD.lookup(0.0)[:3])
+    axis = np.cross(u, b)/np.linalg.norm(np.cross(u, b))
+    q = [np.roll(Rotation.from_rotvec(axis * (np.arccos(u @ b) - np.radians(off))).as_quat(), 1) for off in (0, 30, 0)]
+    ensemble = Ensemble(dynamics, magnet=np.outer([1, 1, 1, 0], dynamics.magnet))
+    y0 = ensemble.initial_state(q + [(1, 0, 0, 0)], [[0, 0, 0], [0, 0, 0], [0.05, 0, 0], [0.02, 0, 0]])
+    stats = ensemble.run(y0, 60, output_step=1, threshold=10, percentiles=(0, 50, 100))
+    assert stats['pointing'].shape == (4, 3)
+    assert (np.diff(stats['pointing'][:3], axis=1) >= 0).all()
+
+    # Settle times and rates match separate simulations, never settling or without a magnet giving NaN
+    for k in range(4):
+        states = Dynamics(FIELD, magnet=ensemble.magnet[k]).simulate(60, y0[k], output_step=1)
+        assert np.isclose(np.linalg.norm(states['w'][-1]), stats['rate'][k])
+        if k == 3:
+            assert np.isnan(stats['settle_time'][k]) and np.isnan(stats['pointing'][k]).all()
+            continue
+        error = _pointing_error(states, ensemble.magnet[k])
+        above = np.flatnonzero(error > 10)
+        settle = 0.0 if len(above) == 0 else np.nan if above[-1] == len(error) - 1 else states['t'][above[-1] + 1]
+        assert np.isclose(stats['settle_time'][k], settle, equal_nan=True)
+        assert np.isclose(stats['pointing'][k, 2], np.ceil(error.max()/0.1) * 0.1, atol=0.1)
+    assert stats['settle_time'][0] == 0 and 0 < stats['settle_time'][1] < 60 and np.isnan(stats['settle_time'][2])
+
+    # Members advance the same in or out of process
+    pooled = ensemble.run(y0, 60, output_step=1, threshold=10, percentiles=(0, 50, 100), workers=2, block_size=2)
+    for key in stats:
+        assert np.allclose(stats[key], pooled[key], equal_nan=True)
+    with pytest.raises(ValueError):
+        ensemble.run(y0[:2], 600)
+
+
+# Test
+if __name__ == '__main__':
+    states = Dynamics(FIELD).simulate(3600, output_step=1)
+    print(states['w'][::600])
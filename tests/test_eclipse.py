@@ -0,0 +1,69 @@
+# Imports
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from pyCubeSat.Orbit import EarthOrbit, EarthTLE, eclipses
+from pyCubeSat.Orbit.eclipse import AU, PENUMBRA, SUNLIT, UMBRA, illumination, shadow_functions, sun_position
+from pyCubeSat.math.frames import julian_date
+
+ISS = ("1 25544U 98067A   08264.51782528 -.00002182  00000-0 -11606-4 0  2927",
+       "2 25544  51.6416 247.4627 0006703 130.5360 325.0288 15.72125391563537")
+
+
+def test_sun_position():
+    # Near the equinox and solstice, the Sun crosses the equator and reaches the tropic
+    sun = sun_position(julian_date(np.array(['2024-03-20T03:06', '2024-06-20T20:51'], dtype='datetime64[m]')))
+    dec = np.degrees(np.arcsin(sun[:, 2]/np.linalg.norm(sun, axis=1)))
+    assert np.allclose(dec, [0, 23.44], atol=0.01)
+    assert np.allclose(np.linalg.norm(sun, axis=1)/AU, [0.996, 1.016], atol=0.001)
+
+    # Behind the Earth is umbra, beside it is sunlit
+    penumbra, umbra = shadow_functions(np.array([[-7000.0, 0, 0], [0, 7000.0, 0]]), np.array([[AU, 0, 0]] * 2), 6371)
+    assert umbra[0] < 0 and penumbra[1] > 0
+
+
+def test_eclipses():
+    orbit = EarthOrbit()
+    epoch = datetime(2024, 3, 1)
+    intervals = eclipses(orbit, 1, epoch=epoch)
+
+    # The intervals cover the span in order, alternating through the penumbra
+    assert intervals['start'][0] == 0 and intervals['stop'][-1] == 86400
+    assert np.array_equal(intervals['start'][1:], intervals['stop'][:-1])
+    assert np.all(intervals['state'][1:] != intervals['state'][:-1])
+    assert set(np.abs(np.diff(intervals['state']))) == {1}
+
+    # About a third of each low orbit is in shadow, with short penumbra transitions
+    duration = intervals['stop'] - intervals['start']
+    umbra = duration[intervals['state'] == UMBRA]
+    assert len(umbra) in (15, 16) and np.all((umbra > 0.25 * orbit.T) & (umbra < 0.4 * orbit.T))
+    assert np.all(duration[intervals['state'] == PENUMBRA] < 30)
+
+    # Dense sampling agrees everywhere
+    t = np.arange(0, 86400, 1.0)
+    index = np.searchsorted(intervals['stop'], t, side='right')
+    assert np.array_equal(intervals['state'][index], illumination(orbit, t, epoch))
+
+    # Timezone-aware epochs are the same instant in UTC
+    aware = eclipses(orbit, 1, epoch=datetime(2024, 2, 29, 19, tzinfo=timezone(timedelta(hours=-5))))
+    assert np.array_equal(aware, intervals)
+
+    # Orbits without an epoch need one
+    with pytest.raises(ValueError):
+        eclipses(orbit, 1)
+
+
+def test_eclipses_tle():
+    orbit = EarthTLE(*ISS)
+    intervals = eclipses(orbit, 0.5, step=30, tol=1e-4)
+    entries = intervals['start'][(intervals['state'] == UMBRA) & (intervals['start'] > 0)]
+    penumbra, umbra = shadow_functions(orbit.propagate(entries)[0], sun_position(julian_date(entries, orbit.epoch)),
+                                       orbit.R)
+    assert np.allclose(umbra, 0, atol=1e-6) and np.all(penumbra < 0)
+    assert set(intervals['state']) == {SUNLIT, PENUMBRA, UMBRA}
+
+
+# Test
+if __name__ == '__main__':
+    intervals = eclipses(EarthOrbit(), 90, epoch=datetime(2024, 3, 1))
+    print(len(intervals), intervals[:5])
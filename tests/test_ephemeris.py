@@ -0,0 +1,102 @@
+# Imports
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from pyCubeSat.ephemeris import COLUMNS, EphemerisStore, Interpolator, _samples
+from pyCubeSat.Orbit import EarthOrbit, EarthTLE
+from pyCubeSat.PMACS.IGRF import igrf
+
+
+def test_store(tmp_path):
+    store = EphemerisStore(tmp_path, chunk_seconds=3600)
+    orbit = EarthOrbit()
+    key = store.generate(orbit, 0.1, epoch=datetime(2023, 1, 1))
+    assert key in store and store.keys() == [key]
+    assert store.info(key)['chunks'] == [60, 60, 24]
+
+    # Samples match a direct evaluation
+    B = igrf(orbit, datetime(2023, 1, 1), 0.1)
+    samples = store.query(key)
+    assert np.allclose(samples['sec'], np.arange(144) * 60.0)
+    assert np.allclose(samples['Br'], np.interp(samples['sec'], B['sec'], B['Br']), rtol=1e-2, atol=20)
+    assert np.allclose(samples['alt'], np.linalg.norm(np.stack((samples['x'], samples['y'], samples['z'])), axis=0)
+                       - orbit.R)
+
+    # Ranges within one chunk are memory-mapped views, ranges across chunks are joined
+    field = store.query(key, 3600, 7200, columns=('Br', 'Bphi'))
+    assert isinstance(field['Br'], np.memmap) and len(field['Br']) == 60
+    assert np.array_equal(field['Bphi'], samples['Bphi'][60:120])
+    joined = store.query(key, datetime(2023, 1, 1, 0, 30), datetime(2023, 1, 1, 2, 10), columns=['sec'])
+    assert np.array_equal(joined['sec'], samples['sec'][30:130])
+
+    # Timezone-aware dates are converted to UTC
+    eastern = timezone(timedelta(hours=-5))
+    start, stop = datetime(2022, 12, 31, 19, 30, tzinfo=eastern), datetime(2023, 1, 1, 2, 10, tzinfo=timezone.utc)
+    aware = store.query(key, start, stop, columns=['sec'])
+    assert np.array_equal(aware['sec'], samples['sec'][30:130])
+    assert store.key(orbit, datetime(2022, 12, 31, 19, tzinfo=eastern)) == key
+    with pytest.raises(ValueError):
+        store.query(key, 0, 86400)
+    with pytest.raises(ValueError):
+        store.query(key, columns=['B'])
+
+
+def test_extend(tmp_path):
+    store = EphemerisStore(tmp_path, chunk_seconds=3600)
+    tle = EarthTLE()
+    key = store.generate(tle, 0.05)
+    first = (tmp_path / key / "00000.npy").stat().st_mtime_ns
+
+    # Stored chunks are reused, and the partial one is finished
+    assert store.generate(tle, 0.02) == key
+    assert store.generate(tle, 0.1, epoch=tle.epoch) == key
+    assert store.info(key)['chunks'] == [60, 60, 24]
+    assert (tmp_path / key / "00000.npy").stat().st_mtime_ns == first
+    longer = EphemerisStore(tmp_path / "other", chunk_seconds=3600)
+    assert np.array_equal(store.query(key)['lat'], longer.query(longer.generate(tle, 0.1))['lat'])
+
+    # Anything the samples depend on changes the key
+    assert store.key(tle, tle.epoch + timedelta(seconds=1)) != key
+    assert store.key(tle, step=30) != key
+    assert store.key(EarthOrbit(), tle.epoch) != store.key(EarthOrbit(j2=False), tle.epoch)
+    with pytest.raises(ValueError):
+        store.generate(EarthOrbit(), 0.1)
+
+
+def test_interpolator(tmp_path):
+    # Errors relative to direct propagation stay within the estimates, on fine and coarse steps
+    tle = EarthTLE()
+    t = np.random.default_rng(0).uniform(0, 0.25 * 86400, 2000)
+    direct = dict(zip(COLUMNS, _samples(tle, t, tle.epoch)))
+    for step in (60, 300, 600):
+        ephemeris = Interpolator.from_orbit(tle, 0.25, step=step)
+        interpolated = ephemeris(t)
+        estimate = ephemeris.estimate(t)
+        for key, columns in (('pos', ('x', 'y', 'z')), ('vel', ('vx', 'vy', 'vz')),
+                             ('field', ('Br', 'Btheta', 'Bphi'))):
+            error = np.linalg.norm(interpolated[key] - np.column_stack([direct[c] for c in columns]), axis=1)
+            assert (error <= estimate[key]).all() and estimate[key].max() <= ephemeris.error[key]
+
+            # Estimates track the errors instead of only covering them
+            assert np.median(error/estimate[key]) > 0.01
+    ephemeris = Interpolator.from_orbit(tle, 0.25, step=60)
+    interpolated = ephemeris(t)
+    assert ephemeris.error['pos'] < 0.01
+
+    # Samples are reproduced exactly, and stored datasets interpolate the same
+    store = EphemerisStore(tmp_path, chunk_seconds=3600)
+    stored = Interpolator.from_store(store, store.generate(tle, 0.3))
+    grid = np.arange(10) * 60.0
+    assert np.allclose(stored(grid)['pos'], tle.propagate(grid)[0])
+    assert np.allclose(stored(t[:50])['field'], interpolated['field'][:50], atol=ephemeris.error['field'])
+    with pytest.raises(ValueError):
+        ephemeris(-1.0)
+    with pytest.raises(ValueError):
+        Interpolator(grid[:4], np.zeros((4, 3)), np.zeros((4, 3)))
+
+
+# Test
+if __name__ == '__main__':
+    store = EphemerisStore("ephemeris")
+    key = store.generate(EarthOrbit(), 90, epoch=datetime(2024, 1, 1))
+    print(store.query(key, 12 * 86400, 13 * 86400, columns=('Br', 'Btheta', 'Bphi')))
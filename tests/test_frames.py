@@ -0,0 +1,63 @@
+# Imports
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from pyCubeSat.math import Rotation
+from pyCubeSat.math.frames import gmst, julian_date
+from pyCubeSat.Orbit import EarthTLE
+
+
+def test_gmst():
+    # J2000 reference value, and every way of giving times agrees
+    assert np.isclose(np.degrees(gmst(2451545.0)), 280.46061837)
+    t = np.arange(0, 86400, 3600.0)
+    dates = np.datetime64('2024-03-01T06:00') + (t * 1e6).astype('timedelta64[us]')
+    assert np.allclose(julian_date(dates), julian_date(t, datetime(2024, 3, 1, 6)))
+    assert np.allclose(Rotation(dates).gmst, gmst(julian_date(t, datetime(2024, 3, 1, 6))))
+
+    # Timezone-aware epochs are converted to UTC, naive ones taken as UTC
+    eastern = timezone(timedelta(hours=-5))
+    assert np.allclose(julian_date(t, datetime(2024, 3, 1, 1, tzinfo=eastern)), julian_date(dates))
+    assert np.allclose(julian_date(t, datetime(2024, 3, 1, 6, tzinfo=timezone.utc)), julian_date(dates))
+
+
+def test_eci_ecef():
+    tle = EarthTLE()
+    t = np.arange(100) * 60.0
+    pos, vel = tle.propagate(t)
+    frames = Rotation(t, tle.epoch)
+
+    # Matrices are orthonormal, cached, and shared by every vector set on the grid
+    R = frames.eci_to_ecef
+    assert R.shape == (100, 3, 3) and frames.eci_to_ecef is R
+    assert np.allclose(R @ frames.ecef_to_eci, np.eye(3))
+    ecef = Rotation.apply(R, pos)
+    assert np.allclose(Rotation.apply(frames.ecef_to_eci, ecef), pos)
+    assert np.allclose(ecef[:, 2], pos[:, 2])
+
+    # Longitudes match the ground track
+    track = tle.getGroundTrack(6000/86400, step=60)
+    lon = np.arctan2(ecef[:, 1], ecef[:, 0])
+    assert np.allclose(np.angle(np.exp(1j * (lon - np.radians(track.lon)))), 0, atol=1e-3)
+
+
+def test_ned_lvlh():
+    # The radial direction is up in NED
+    lat, lon = np.array([0, 45, -60, 89]), np.array([0, 120, -30, 10])
+    up = np.stack((np.cos(np.radians(lat)) * np.cos(np.radians(lon)),
+                   np.cos(np.radians(lat)) * np.sin(np.radians(lon)),
+                   np.sin(np.radians(lat))), axis=1)
+    assert np.allclose(Rotation.apply(Rotation.ecef_to_ned(lat, lon), up), [0, 0, -1])
+    assert np.allclose(Rotation.apply(Rotation.ned_to_ecef(lat, lon), [1, 0, 0])[0], [0, 0, 1])
+
+    # Circular orbits fly along x with nadir along z
+    pos, vel = EarthTLE().propagate(np.linspace(0, 3000, 11))
+    R = Rotation.eci_to_lvlh(pos, vel)
+    assert np.allclose(Rotation.apply(R, pos/np.linalg.norm(pos, axis=1, keepdims=True)), [0, 0, -1])
+    v = Rotation.apply(R, vel)/np.linalg.norm(vel, axis=1, keepdims=True)
+    assert np.allclose(v, [1, 0, 0], atol=2e-3)
+    assert np.allclose(Rotation.lvlh_to_eci(pos, vel) @ R, np.eye(3))
+
+
+# Test
+if __name__ == '__main__':
+    test_eci_ecef()
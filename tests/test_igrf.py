@@ -1,7 +1,111 @@
 # Import
-from pyCubeSat.PMACS.IGRF import igrf
+import shutil
+from pathlib import Path
+import numpy as np
+from pyCubeSat.PMACS.IGRF import igrf, igrf_iter
+from datetime import datetime
+from pyCubeSat.PMACS.IGRF.igrf import field, igrf_field
+from pyCubeSat.PMACS.IGRF.grid import FieldGrid
+from pyCubeSat.PMACS.IGRF.coefficients import load_coefficients, coefficients, decimal_year, SECONDS_PER_YEAR
 from pyCubeSat.Orbit import EarthOrbit
 
+
+def test_coefficient_tensor():
+    epochs, g, h, sv_g, sv_h = load_coefficients()
+    assert epochs[0] == 1900 and epochs[-1] == 2020
+    assert g.shape == h.shape == (len(epochs), 14, 14)
+    assert g[-1, 1, 0] == -29404.8
+    assert h[-1, 1, 1] == 4652.5
+    assert sv_g[1, 0] == 5.7
+    assert np.all(h[:, :, 0] == 0)
+
+
+def test_coefficient_snapshot(tmp_path):
+    path = tmp_path / "IGRF13.csv"
+    shutil.copy(Path(__file__).parents[1] / "pyCubeSat/PMACS/IGRF/IGRF13.csv", path)
+    parsed = load_coefficients.__wrapped__(path)
+    assert path.with_suffix(".npz").exists()
+    loaded = load_coefficients.__wrapped__(path)
+    for a, b in zip(parsed, loaded):
+        assert np.array_equal(a, b)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["IGRF13.csv", "IGRF13.npz"]
+
+    # A truncated snapshot, e.g. one still being written, falls back to the table
+    snapshot = path.with_suffix(".npz")
+    snapshot.write_bytes(snapshot.read_bytes()[:100])
+    for a, b in zip(parsed, load_coefficients.__wrapped__(path)):
+        assert np.array_equal(a, b)
+
+
+def test_coefficient_cache():
+    g, h = coefficients(2021.5)
+    assert coefficients(2021.5)[0] is g
+    assert not g.flags.writeable
+
+
+def test_field():
+    # Reference values at the DGRF-2015 epoch
+    g, h = coefficients(2015)
+    r = np.array([6371.2, 6871.2, 7000.0])
+    colat = np.radians([90, 30, 150])
+    lon = np.radians([0, 45, -120])
+    V, Br, Bt, Bp = field(r, colat, lon, g, h)
+    assert np.allclose(Br, [15882.60486736, -41789.35387693, 33662.78783544])
+    assert np.allclose(Bt, [-27645.85073278, -11549.56870307, -11851.55978838])
+    assert np.allclose(Bp, [-2628.96867739, 2368.50392905, 8970.92655893])
+
+
+def test_time_varying_field():
+    # Each sample matches a single-time evaluation, across epoch boundaries and past the last epoch
+    rng = np.random.default_rng(0)
+    r = 6371.2 + rng.uniform(0, 1000, 50)
+    colat = rng.uniform(0.1, 3, 50)
+    lon = rng.uniform(-np.pi, np.pi, 50)
+    t = rng.uniform(1950, 2024, 50)
+    B = np.array(igrf_field(r, colat, lon, t))
+    for k in range(50):
+        ref = field(r[k], colat[k], lon[k], *coefficients(t[k]))
+        assert np.allclose(B[:, k], np.ravel(ref))
+
+
+def test_time_varying_epoch():
+    # Seconds since an epoch and datetime64 samples agree with decimal years
+    t = np.array([0, 1, 3]) * SECONDS_PER_YEAR
+    B = igrf_field(7000, 1, 1, t, epoch=1993.0)
+    assert np.allclose(B, igrf_field(7000, 1, 1, 1993.0 + np.array([0, 1, 3])))
+    dates = np.array(['1997-03-01', '2012-11-20'], dtype='datetime64[s]')
+    assert np.allclose(igrf_field(7000, 1, 1, dates), igrf_field(7000, 1, 1, decimal_year(dates)))
+    assert decimal_year(datetime(2021, 1, 1)) == 2021
+
+
+def test_field_grid(tmp_path):
+    grid = FieldGrid(alt=(400, 500), lat=(-60, 60), step=(50, 4, 4), t=2022.0)
+    assert grid.values.shape == (3, 3, 31, 91)
+    linear = grid.max_error(2000)
+    cubic = grid.max_error(2000, "cubic")
+    assert cubic < linear < 500
+
+    # Round trip through a memory-mapped file
+    grid.save(tmp_path / "grid")
+    loaded = FieldGrid.load(tmp_path / "grid")
+    assert isinstance(loaded.values, np.memmap)
+    assert np.allclose(loaded(450, 10, [-179.9, 0, 179.9]), grid(450, 10, [180.1, 0, -180.1]))
+
+
+def test_igrf():
+    B = igrf(EarthOrbit(), 2023, 0.1)
+    assert np.all(np.isfinite(B[['V', 'Br', 'Btheta', 'Bphi']].to_numpy()))
+
+
+def test_igrf_iter():
+    orbit = EarthOrbit()
+    B = igrf(orbit, 2023, 0.1)
+    chunks = list(igrf_iter(orbit.iter_ground_track(0.1, chunk_seconds=3600), 2023))
+    assert len(chunks) == 3
+    for key in ('V', 'Br', 'Btheta', 'Bphi'):
+        assert np.allclose(np.concatenate([chunk[key] for chunk in chunks]), B[key])
+
+
 # Test
 if __name__ == '__main__':
-    V = igrf(EarthOrbit(), 2023)
\ No newline at end of file
+    V = igrf(EarthOrbit(), 2023)
@@ -0,0 +1,53 @@
+# Imports
+from pathlib import Path
+import json
+import os
+import subprocess
+import sys
+
+ROOT = Path(__file__).parents[1]
+
+
+def loaded(code: str, cwd: Path) -> dict:
+    """Runs code in a fresh interpreter, from outside the repository, and reports what it imported"""
+    env = {**os.environ, 'PYTHONPATH': str(ROOT)}
+    report = "import json, sys; print(json.dumps({'modules': sorted(sys.modules), 'result': result}))"
+    out = subprocess.run([sys.executable, "-c", f"{code}\n{report}"], cwd=cwd, env=env, capture_output=True,
+                         text=True, check=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def heavy(modules: list) -> set:
+    return {name for name in ("plotly", "pandas", "scipy") if name in modules}
+
+
+def test_headless(tmp_path):
+    # Importing the package loads none of the plotting or dataframe stacks, from any working directory
+    run = loaded("import pyCubeSat\nresult = sorted(pyCubeSat.__all__)", tmp_path)
+    assert heavy(run['modules']) == set() and run['result'] == ["Orbit", "PMACS"]
+    assert (tmp_path / "pyCubeSat.log").exists()
+
+    # Nor does propagating an orbit
+    run = loaded("from pyCubeSat.Orbit import EarthOrbit, EarthTLE\nresult = EarthOrbit().propagate([0, 60])[0].tolist()",
+                 tmp_path)
+    assert heavy(run['modules']) == set() and len(run['result']) == 2
+
+
+def test_exports(tmp_path):
+    # Exports resolve on first use, and are listed before then
+    run = loaded("import sys\nimport pyCubeSat.Orbit as O\nnames = dir(O)\n"
+                 "result = ['EarthOrbit' in names, 'pandas' in sys.modules, O.get_orbital_states.__name__,\n"
+                 "          'pandas' in sys.modules]", tmp_path)
+    assert run['result'] == [True, False, "get_orbital_states", False]
+
+    # The field function, not its submodule
+    run = loaded("from pyCubeSat.PMACS.IGRF import igrf\nimport pyCubeSat.math as m\n"
+                 "result = [callable(igrf), m.Quaternion.__name__, hasattr(m, 'missing')]", tmp_path)
+    assert run['result'] == [True, "Quaternion", False]
+
+
+# Test
+if __name__ == '__main__':
+    from tempfile import TemporaryDirectory
+    with TemporaryDirectory() as directory:
+        print(heavy(loaded("import pyCubeSat.Orbit\nresult = None", Path(directory))['modules']))
@@ -0,0 +1,57 @@
+# Imports
+from datetime import datetime
+import json
+import timeit
+import numpy as np
+from pyCubeSat import instrumentation
+from pyCubeSat.Orbit import EarthOrbit
+from pyCubeSat.PMACS.Dynamics import Dynamics, OrbitField
+from pyCubeSat.PMACS.IGRF import igrf_field
+
+
+def test_disabled():
+    instrumentation.reset()
+    EarthOrbit().getGroundTrack(0.1)
+    stats = instrumentation.report()
+    assert not instrumentation.is_enabled()
+    assert stats['stages'] == {} and stats['counters'] == {} and stats['allocations'] == {}
+
+    # Hooks cost about a function call
+    noop = instrumentation.timed("noop")(lambda: None)
+    assert timeit.timeit(noop, number=100000) < 0.2
+
+
+def test_profile(tmp_path):
+    with instrumentation.profile() as run:
+        field = OrbitField(EarthOrbit(), datetime(2024, 1, 1), 0.01)
+        Dynamics(field).simulate(60, dt=0.5)
+        with instrumentation.stage("test.block"):
+            instrumentation.count("test.items", 3)
+    assert not instrumentation.is_enabled()
+
+    # Stages nest, with counters and allocations alongside
+    stats = run.report
+    assert {"dynamics.field_table", "orbit.propagate", "igrf.field", "dynamics.rk4", "test.block"} <= set(stats['stages'])
+    assert stats['stages']['dynamics.field_table']['total'] >= stats['stages']['igrf.field']['total']
+    assert stats['counters']['dynamics.steps'] == 120 and stats['counters']['test.items'] == 3
+    assert stats['counters']['igrf.points'] == len(np.arange(-1, 87 + 2))
+    assert stats['allocations']['dynamics.states']['bytes'] == 121 * 9 * 8
+    assert "dynamics.rk4" in run.text()
+    run.save(tmp_path / "profile.json")
+    assert json.loads((tmp_path / "profile.json").read_text())['counters'] == stats['counters']
+
+
+def test_memory():
+    with instrumentation.profile(memory=True) as run:
+        with instrumentation.stage("outer"):
+            igrf_field(np.full(20000, 6800.0), np.full(20000, 1.0), np.zeros(20000), np.zeros(20000), epoch=2024.0)
+    stages = run.report['stages']
+    assert stages['igrf.field']['peak'] >= 4 * 20000 * 8
+    assert stages['outer']['peak'] >= stages['igrf.field']['peak']
+
+
+# Test
+if __name__ == '__main__':
+    with instrumentation.profile() as run:
+        Dynamics(OrbitField(EarthOrbit(), datetime(2024, 1, 1), 1)).simulate(3600)
+    print(run.text())
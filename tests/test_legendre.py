@@ -0,0 +1,34 @@
+# Imports
+import numpy as np
+from scipy.special import lpmv
+from pyCubeSat.math import Legendre
+
+
+def test_unnormalized():
+    theta = np.linspace(0.05, 3.1, 7)
+    P, _ = Legendre(6, theta, "")
+    for n in range(7):
+        for m in range(n + 1):
+            assert np.allclose(P[n, m], (-1)**m * lpmv(m, n, np.cos(theta)))
+
+
+def test_schmidt_derivative():
+    theta = np.linspace(0.05, 3.1, 7)
+    P, dP = Legendre(13, theta)
+    assert P.shape == dP.shape == (14, 14, 7)
+    dtheta = 1e-6
+    Pp, _ = Legendre(13, theta + dtheta)
+    Pm, _ = Legendre(13, theta - dtheta)
+    assert np.allclose((Pp - Pm)/(2 * dtheta), dP, atol=1e-7)
+
+
+def test_schmidt_sectoral():
+    # P(n, n) = sqrt(2 (2n)!)/(2^n n!) sin^n(θ) for Schmidt semi-normalized functions
+    theta = np.array([0.3, 1.2])
+    P, _ = Legendre(3, theta)
+    assert np.allclose(P[3, 3], np.sqrt(2 * 720)/(8 * 6) * np.sin(theta)**3)
+
+
+# Test
+if __name__ == '__main__':
+    print(Legendre(2, np.linspace(0, np.pi, 5)))
@@ -1,8 +1,216 @@
 # Imports
-from pyCubeSat.Orbit import EarthOrbit
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from pyCubeSat.Orbit import (EarthOrbit, EarthOrbitBatch, EarthTLE, GroundTrack, TLECatalog, get_orbital_states,
+                             parse_tle)
+from pyCubeSat.Orbit.propagation import solve_kepler
+
+# Spacetrack Report #3 test element set
+TLE = ("1 88888U          80275.98708465  .00073094  13844-3  66816-4 0    87",
+       "2 88888  72.8435 115.9689 0086731  52.6988 110.5714 16.05824518  1058")
+ISS = ("1 25544U 98067A   08264.51782528 -.00002182  00000-0 -11606-4 0  2927",
+       "2 25544  51.6416 247.4627 0006703 130.5360 325.0288 15.72125391563537")
+
+
+def test_solve_kepler():
+    M = np.linspace(-20, 20, 1001)
+    for e in (0, 0.1, 0.9):
+        E = solve_kepler(M, e)
+        assert np.allclose(E - e * np.sin(E), M, atol=1e-12, rtol=0)
+
+
+def test_propagate():
+    orbit = EarthOrbit(Ap=500, e=0.05, i=60, j2=False)
+    t = np.linspace(0, orbit.T, 50)
+    pos, vel = orbit.propagate(t)
+    r = np.linalg.norm(pos, axis=1)
+    v = np.linalg.norm(vel, axis=1)
+
+    # Energy and angular momentum are conserved, and the orbit closes after one period
+    assert np.allclose(v**2/2 - orbit.MU/r, -orbit.MU/(2 * orbit.a))
+    assert np.allclose(np.linalg.norm(np.cross(pos, vel), axis=1), orbit.h)
+    assert np.allclose(pos[0], pos[-1])
+    assert np.isclose(r.min(), orbit.R + 500)
+
+
+def test_j2():
+    # The ISS node regresses about 5° per day
+    orbit = EarthOrbit()
+    pos, vel = orbit.propagate(np.array([0, 86400]))
+    h = np.cross(pos, vel)
+    node = np.degrees(np.arctan2(h[:, 0], -h[:, 1]))
+    assert np.isclose(node[1] - node[0], -4.97, atol=0.01)
+    assert np.isclose(node[0], 289.5972 - 360, atol=0.05)  # osculating, so offset by the node's drift
+    assert not EarthOrbit(j2=False).j2
+
+    # Velocity includes the drift of the node and periapsis
+    pos, vel = orbit.propagate(np.array([999.0, 1000, 1001]))
+    assert np.allclose((pos[2] - pos[0])/2, vel[1], atol=1e-5)
+
+
+def test_ground_track():
+    orbit = EarthOrbit()
+    ground_track = orbit.getGroundTrack(1.5, step=10)
+    assert len(ground_track) == 1.5 * 24 * 60 * 6
+    assert np.isclose(np.abs(ground_track.lat).max(), np.degrees(orbit.i), atol=0.01)
+    assert ((ground_track.lon >= -180) & (ground_track.lon <= 180)).all()
+
+    # Fields are contiguous arrays, also available as a dataframe
+    assert all(ground_track[key].flags.c_contiguous for key in ground_track)
+    frame = ground_track.to_pandas(alt=ground_track.r - orbit.R)
+    assert list(frame.columns) == ['sec', 'r', 'lat', 'lon', 'alt']
+    assert np.array_equal(frame['lat'].to_numpy(), ground_track.lat)
+
+
+def test_iter_ground_track():
+    orbit = EarthOrbit()
+    chunks = list(orbit.iter_ground_track(0.5, step=6, chunk_seconds=3600))
+    assert len(chunks) == 12
+    assert all(len(chunk['sec']) == 600 for chunk in chunks)
+    ground_track = orbit.getGroundTrack(0.5, step=6)
+    joined = GroundTrack.concatenate(chunks)
+    for key in ('sec', 'r', 'lat', 'lon'):
+        assert np.array_equal(joined[key], ground_track[key])
+
+
+def test_decimate():
+    orbit = EarthOrbit()
+    ground_track = orbit.getGroundTrack(2, step=10)
+    decimated = ground_track.decimate(2000)
+    assert len(decimated) <= 2000 and np.all(np.diff(decimated.sec) > 0)
+
+    # Every antimeridian crossing keeps the samples on both sides
+    crossings = np.flatnonzero(np.abs(np.diff(ground_track.lon)) > 180)
+    assert len(crossings) > 0 and np.isin(ground_track.sec[crossings], decimated.sec).all()
+    assert np.isin(ground_track.sec[crossings + 1], decimated.sec).all()
+
+    # The kept samples trace the full track, to within a fraction of a degree between them
+    lat = np.interp(ground_track.sec, decimated.sec, decimated.lat)
+    assert np.abs(lat - ground_track.lat).max() < 1
+    assert ground_track.decimate(len(ground_track)) is ground_track
+
+    # Streamed chunks are decimated as they come
+    fig1 = orbit.plot_ground_track(2, orbit.iter_ground_track(2, step=10, chunk_seconds=3600), max_points=2000)
+    assert len(fig1.data[0].lat) <= 2000 + 2 * 48
+
+    # Chunks spanning more or fewer days than given still share about max_points, colored by their own altitudes
+    for days, span in ((1, 30), (30, 1)):
+        fig1 = orbit.plot_ground_track(days, orbit.iter_ground_track(span, step=60), max_points=2000)
+        track = orbit.getGroundTrack(span, step=60)
+        passes = len(np.flatnonzero(np.abs(np.diff(track.lon)) > 180)) + 1
+        assert 1000 <= len(fig1.data[0].lat) <= 2000 + 2 * passes
+        assert np.isclose(fig1.data[0].marker.cmin, np.min(fig1.data[0].marker.color))
+        assert np.isclose(fig1.data[0].marker.cmax, np.max(fig1.data[0].marker.color))
+
+
+def test_batch():
+    rng = np.random.default_rng(0)
+    elements = (rng.uniform(400, 800, 20), rng.uniform(0, 0.1, 20), rng.uniform(0, 98, 20),
+                rng.uniform(0, 360, 20), rng.uniform(0, 360, 20))
+    batch = EarthOrbitBatch(*elements)
+    t = np.arange(0, 86400, 60.0)
+    pos, vel = batch.propagate(t)
+    r, lat, lon = batch.getGroundTrack(t)
+    assert pos.shape == vel.shape == (20, len(t), 3)
+    assert r.shape == lat.shape == lon.shape == (20, len(t))
+
+    # Each satellite matches the single orbit propagator
+    for k in (0, 7, 19):
+        single = batch[k]
+        assert np.allclose(single.propagate(t)[0], pos[k], rtol=0, atol=1e-8)
+        assert np.allclose(single.propagate(t)[1], vel[k], rtol=0, atol=1e-11)
+        assert np.allclose(single.getGroundTrack(1, step=60)['lat'], lat[k])
+
+    # Grids longer than a block are tiled over time
+    long = np.arange(0, 30 * 86400, 60.0)
+    assert np.allclose(batch[3].propagate(long)[0], batch.propagate(long)[0][3], rtol=0, atol=1e-7)
+
+    # Single precision math stays within a few meters
+    single = EarthOrbitBatch(*elements, dtype=np.float32)
+    pos32, vel32 = single.propagate(t)
+    assert pos32.dtype == vel32.dtype == np.float32
+    assert np.abs(pos32 - pos).max() < 1e-2 and np.abs(vel32 - vel).max() < 1e-5
+    r, lat, lon = single.getGroundTrack(t)
+    assert r.dtype == np.float32 and len(single) == 20
+
+
+def test_parse_tle():
+    elements = parse_tle(*ISS)
+    assert elements['satnum'] == 25544
+    assert np.isclose(np.degrees(elements['i']), 51.6416)
+    assert np.isclose(elements['e'], 0.0006703)
+    assert np.isclose(elements['bstar'], -0.11606e-4)
+    assert EarthTLE(*ISS).epoch == datetime(2008, 9, 20, 12, 25, 40, 104179)
+    with pytest.raises(ValueError):
+        parse_tle(ISS[0][:-1] + "0", ISS[1])
+
+
+def test_sgp4():
+    # Reference TEME states from Spacetrack Report #3, at 0, 360, and 720 minutes
+    orbit = EarthTLE(*TLE)
+    pos, vel = orbit.propagate(np.array([0, 360, 720]) * 60)
+    assert np.allclose(pos, [[2328.97048951, -5995.22076416, 1719.97067261],
+                             [2456.10705566, -6071.93853760, 1222.89727783],
+                             [2567.56195068, -6112.50384522, 713.96397400]], atol=2e-3)
+    assert np.allclose(vel[0], [2.91207230, -0.98341546, -7.09081703], atol=1e-5)
+
+    # The same Orbit interface as EarthOrbit
+    ground_track = orbit.getGroundTrack(0.5, step=60)
+    assert len(ground_track) == 720
+    assert np.isclose(np.abs(ground_track.lat).max(), 72.8435, atol=0.5)
+
+
+def test_tle_catalog(tmp_path):
+    path = tmp_path / "catalog.txt"
+    path.write_text("\n".join(["TEST", *TLE, "ISS (ZARYA)", *ISS, "BAD", ISS[0][:-1] + "0", ISS[1]]) + "\n")
+    catalog = TLECatalog.load(path)
+    assert len(catalog) == 2
+    assert catalog.names == ["TEST", "ISS (ZARYA)"]
+    assert catalog.satnum.tolist() == [88888, 25544]
+
+    # Each element set matches the single satellite propagator
+    t = np.arange(0, 86400, 60.0)
+    pos, vel = catalog.propagate(t)
+    r, lat, lon = catalog.getGroundTrack(t)
+    for k in range(2):
+        single = catalog[k]
+        assert np.allclose(single.propagate(t)[0], pos[k])
+        assert np.allclose(single.getGroundTrack(1, step=60)['lon'], lon[k])
+
+    # Propagating from a shared start date
+    start = datetime(2008, 9, 21)
+    pos, vel = catalog.propagate(t, start=start)
+    offset = (start - catalog[1].epoch).total_seconds()
+    assert np.allclose(catalog[1].propagate(t + offset)[0], pos[1])
+
+
+def test_get_orbital_states():
+    start = datetime(2024, 3, 1)
+    states = get_orbital_states(start, start + timedelta(hours=2), step=30, Aa=500, Ap=400, i=97.5)
+    assert len(states) == 241
+    assert states['time'].iloc[-1] == start + timedelta(hours=2)
+
+    # Altitudes bound the radius, and the states match the equivalent EarthOrbit
+    r = np.linalg.norm(states[['x', 'y', 'z']].to_numpy(), axis=1)
+    assert np.isclose(r.min(), EarthOrbit.R + 400) and r.max() <= EarthOrbit.R + 500 + 1e-6
+    orbit = EarthOrbit(Ap=400, e=100/(2 * EarthOrbit.R + 900), i=97.5, omega=115.2267, w=223.6999)
+    assert np.allclose(orbit.propagate(states['sec'].to_numpy())[1], states[['vx', 'vy', 'vz']].to_numpy())
+    with pytest.raises(ValueError):
+        get_orbital_states(start, start - timedelta(hours=1))
+
+    # Legacy positional calls keep the STK order, with an eccentricity that must match the altitudes
+    legacy = get_orbital_states(start, start + timedelta(hours=2), 500, 400, 0.00733, 97.5, step=30)
+    assert np.allclose(legacy[['x', 'y', 'z']].to_numpy(), states[['x', 'y', 'z']].to_numpy())
+    assert len(get_orbital_states(start, start + timedelta(minutes=10), 419, 418, 0.0001, 51.6)) == 11
+    with pytest.raises(ValueError):
+        get_orbital_states(start, start + timedelta(hours=1), 419, 418, 0.01)
+    with pytest.raises(TypeError):
+        get_orbital_states(start, start + timedelta(hours=1), 419, 418, 0.0001, 51.6, 115, 223, 60)
+
 
 # Test
 if __name__ == '__main__':
     orbit = EarthOrbit()
     fig1 = orbit.plot_ground_track(0.1)
-    fig1.show()
\ No newline at end of file
+    fig1.show()
@@ -0,0 +1,91 @@
+# Imports
+import tracemalloc
+import numpy as np
+import pytest
+from scipy.spatial.transform import Rotation
+from pyCubeSat.math import Quaternion, QuaternionArray
+
+# Random unit quaternions, scalar first
+RNG = np.random.default_rng(0)
+Q = Rotation.random(50, random_state=1)
+
+
+def _wrap(r: Rotation) -> QuaternionArray:
+    return QuaternionArray(r.as_quat()[:, [3, 0, 1, 2]])
+
+
+def _same(q: QuaternionArray, r: Rotation) -> bool:
+    # q and -q are the same rotation
+    expected = r.as_quat()[:, [3, 0, 1, 2]]
+    return np.allclose(np.abs(np.sum(q.array * expected, axis=1)), 1)
+
+
+def test_multiply():
+    P = Rotation.random(50, random_state=2)
+    assert _same(_wrap(Q) * _wrap(P), Q * P)
+    assert _same(_wrap(Q) * _wrap(P[[0]]), Q * P[0])
+
+    # In place, without reallocating the buffer
+    q = _wrap(Q)
+    buffer = q.array
+    q *= _wrap(P)
+    assert q.array is buffer and _same(q, Q * P)
+    assert _same(q.conjugate(out=q), (Q * P).inv())
+    assert np.allclose((_wrap(Q) * _wrap(Q).conjugate()).array, [1, 0, 0, 0])
+
+
+def test_normalize_rotate():
+    q = QuaternionArray(_wrap(Q).array * RNG.uniform(0.5, 2, (50, 1)))
+    assert not np.allclose(q.norm(), 1)
+    q.normalize(out=q)
+    assert np.allclose(q.norm(), 1)
+
+    v = RNG.normal(size=(50, 3))
+    assert np.allclose(q.rotate(v), Q.apply(v))
+    assert np.allclose(q.rotate([1, 0, 0]), Q.apply([1, 0, 0]))
+    assert np.allclose(QuaternionArray(q.array[:1]).rotate(v), Q[0].apply(v))
+    assert np.allclose(np.einsum('nij,nj->ni', q.to_dcm(), v), Q.apply(v))
+    assert _same(QuaternionArray.from_dcm(Q.as_matrix()), Q)
+    assert _same(QuaternionArray.from_axis_angle(Q.as_rotvec(), np.linalg.norm(Q.as_rotvec(), axis=1)), Q)
+
+    # In place, reusing the work buffer without new arrays
+    rotated = v.copy()
+    q.rotate(rotated, out=rotated)
+    assert np.allclose(rotated, Q.apply(v))
+    big, x = QuaternionArray.from_axis_angle(RNG.normal(size=(10000, 3)), 1.0), RNG.normal(size=(10000, 3))
+    big.rotate(x, out=x)
+    tracemalloc.start()
+    big.rotate(x, out=x)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < x.nbytes/10
+
+
+def test_euler():
+    for seq in ("xyz", "zyx", "yxz", "XYZ", "ZYX", "ZXY"):
+        angles = Q.as_euler(seq)
+        assert _same(QuaternionArray.from_euler(angles, seq), Q)
+        assert np.allclose(_wrap(Q).to_euler(seq), angles)
+    assert np.allclose(_wrap(Q).to_euler("ZYX", degrees=True), Q.as_euler("ZYX", degrees=True))
+    with pytest.raises(ValueError):
+        QuaternionArray.from_euler([0, 0, 0], "zxz")
+
+    # Legacy scalar helpers
+    assert np.allclose(Quaternion.Euler_to_Quat(0.1, 0.2, 0.3), Rotation.from_euler('xyz', [0.1, 0.2, 0.3]).as_quat())
+
+
+def test_slerp():
+    p, q = _wrap(Q[:10]), _wrap(Rotation.random(10, random_state=3))
+    assert np.allclose(np.abs(np.sum(p.slerp(q, 0).array * p.array, axis=1)), 1)
+    assert np.allclose(np.abs(np.sum(p.slerp(q, 1).array * q.array, axis=1)), 1)
+
+    # Halfway rotates by half the relative angle
+    relative = (p.conjugate() * q).array
+    angle = 2 * np.arccos(np.clip(np.abs(relative[:, 0]), 0, 1))
+    half = (p.conjugate() * p.slerp(q, 0.5)).array
+    assert np.allclose(2 * np.arccos(np.clip(np.abs(half[:, 0]), 0, 1)), angle/2)
+
+
+# Test
+if __name__ == '__main__':
+    print(QuaternionArray.from_euler([[0.1, 0.2, 0.3]]).to_euler())
@@ -0,0 +1,34 @@
+# Imports
+import pickle
+import numpy as np
+from pyCubeSat.parallel import SharedArray
+from pyCubeSat.sweep import sweep
+
+
+def test_shared_array():
+    with SharedArray((4, 3)) as shared:
+        attached = pickle.loads(pickle.dumps(shared))
+        attached.array[2] = (1, 2, 3)
+        assert shared.array[2].tolist() == [1, 2, 3]
+        attached.close()
+
+
+def test_sweep():
+    kwargs = dict(altitudes=[400, 600], inclinations=[0, 51.6, 98], eccentricities=[0, 0.01], days=0.2)
+    done = []
+    inline = sweep(**kwargs, workers=1)
+    pooled = sweep(**kwargs, workers=2, shard_size=5, progress=lambda d, n: done.append((d, n)))
+    assert done[-1] == (12, 12)
+
+    # Results land on the grid regardless of which process computed them
+    for key in inline:
+        assert inline[key].shape == (2, 3, 2)
+        assert np.array_equal(inline[key], pooled[key])
+    assert np.allclose(inline['lat_max'][:, 1], 51.6, atol=0.1)
+    assert (inline['B_min'] <= inline['B_mean']).all() and (inline['B_mean'] <= inline['B_max']).all()
+    assert (inline['B_mean'][0] > inline['B_mean'][1]).all()
+
+
+# Test
+if __name__ == '__main__':
+    print(sweep([400, 500, 600], [0, 45, 90], workers=2)['B_mean'])